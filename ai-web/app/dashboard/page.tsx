@@ -267,7 +267,7 @@ export default function DashboardPage() {
     setIsLoading(true);
 
     try {
-      const res = await analyzeSymptoms(trimmedContent);
+      const res = await analyzeSymptoms(trimmedContent, activeConversationId);
       
       // Extract confidence score from response if available
       const confidenceMatch = res.message.match(/confidence[:\s]+(\d+)%/i);
@@ -1,5 +1,9 @@
-export async function analyzeSymptoms(symptoms: string) {
-  const res = await fetch("/api/analyze", {
+export async function analyzeSymptoms(symptoms: string, sessionId?: string | null) {
+  // With a session the backend keeps the symptoms of earlier messages
+  const url = sessionId
+    ? `/api/sessions/${encodeURIComponent(sessionId)}/symptoms`
+    : "/api/analyze";
+  const res = await fetch(url, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ symptoms }),
@@ -1,11 +1,60 @@
-from flask import Flask, request, jsonify
-from app.predictor import SymptomPredictor, GreetingsResponder, login, signup
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+from app.predictor import SymptomPredictor, GreetingsResponder, login, login_async, signup, signup_async
+from app.cache import LRUCache
+from app.singleflight import SingleFlight
+from app.reloader import KnowledgeBaseReloader
+from app.sessions import SymptomSession, build_store
+from app.users import UserStoreBusy
+from app.serialization import dumps, json_default
+from app import metrics
 from flask_cors import CORS
+import hmac
+import logging
+import os
+import re
+import time
 import traceback
 
+
+class ResultJSONProvider(DefaultJSONProvider):
+    """jsonify support for app/results.py objects (only used in debug mode, see respond)"""
+    @staticmethod
+    def default(o):
+        try:
+            return json_default(o)
+        except TypeError:
+            return DefaultJSONProvider.default(o)
+
+
 app = Flask(__name__)
+app.json = ResultJSONProvider(app)
 CORS(app)
 
+# Per-request details are logged at DEBUG so the hot path doesn't write to stdout
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(), format='%(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger('symptomai.api')
+
+# Add a Server-Timing header with per-stage durations to every response
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# Maximum number of cases accepted by /api/analyze/batch
+BATCH_MAX_CASES = int(os.environ.get('BATCH_MAX_CASES', 10000))
+
+# Optional whole-response cache for /api/analyze, keyed on canonical symptom sets
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+result_cache = LRUCache(
+    int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 10000)),
+    ttl=float(os.environ.get('RESULT_CACHE_TTL_SECONDS', 300))
+) if RESULT_CACHE_ENABLED else None
+
+# Identical /api/analyze inputs arriving while the first is still being analyzed
+# wait for its response instead of repeating the work (app/singleflight.py)
+SINGLE_FLIGHT_ENABLED = os.environ.get('SINGLE_FLIGHT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+single_flight = SingleFlight(
+    timeout=float(os.environ.get('SINGLE_FLIGHT_TIMEOUT_SECONDS', 1.0))
+) if SINGLE_FLIGHT_ENABLED else None
+
 # Initialize components with error handling
 try:
     predictor = SymptomPredictor()
@@ -17,15 +66,72 @@ except Exception as e:
     predictor = None
     greeter = None
 
+# Conversational sessions (app/sessions.py); shared between workers through SQLite when there are several
+try:
+    session_store = build_store()
+except Exception as e:
+    print(f"❌ Error initializing session store: {e}")
+    traceback.print_exc()
+    session_store = None
+
+# Largest top_k accepted for the differential diagnosis in /api/analyze
+DIFFERENTIAL_MAX_K = int(os.environ.get('DIFFERENTIAL_MAX_K', 50))
+
+# ?format= values accepted by the analysis endpoints; compact leaves out the formatted message
+RESPONSE_FORMATS = ('full', 'compact')
+
+SESSION_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+# Token required by POST /api/admin/reload; the endpoint is disabled without one
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+def install_predictor(new_predictor):
+    """
+    Swap in a reloaded predictor (see app/reloader.py). Handlers read the
+    global once per request, so requests in flight finish on the old one.
+    """
+    global predictor
+    predictor = new_predictor
+    if result_cache is not None:
+        result_cache.clear()
+
+reloader = KnowledgeBaseReloader(predictor, on_swap=install_predictor) if predictor else None
+# When gunicorn preloads this module the master never serves requests, and a
+# watcher thread there could fork workers while holding the reload lock:
+# gunicorn.conf.py sets KB_WATCH_AFTER_FORK and starts it in each worker instead
+if reloader is not None and os.environ.get('KB_WATCH_AFTER_FORK', 'false').lower() not in ('1', 'true', 'yes'):
+    reloader.watch()
+    metrics.REGISTRY.register_collector(lambda: [
+        ('symptomai_kb_version', 'gauge', 'Knowledge base snapshot in use (1 at startup, +1 per reload).',
+         [({}, reloader.version)]),
+        ('symptomai_kb_reload_failures_total', 'counter', 'Knowledge base reloads that failed.',
+         [({}, reloader.failures)]),
+    ])
+
+metrics.REGISTRY.register_collector(metrics.cache_collector(lambda: {
+    'symptom_resolution': predictor.resolution_cache if predictor else None,
+    'greeting_prefixes': greeter.detector.prefix_cache if greeter else None,
+    'analysis_results': result_cache
+}))
+
+def single_flight_collector():
+    stats = single_flight.stats()
+    return [
+        ('symptomai_single_flight_in_flight', 'gauge', 'Distinct /api/analyze inputs being analyzed.',
+         [({}, stats['in_flight'])]),
+        ('symptomai_single_flight_requests_total', 'counter',
+         '/api/analyze requests by single-flight outcome: leader (analyzed), coalesced (shared the '
+         'response of an identical request in flight), timeout or leader_failed (analyzed after waiting).',
+         [({'outcome': outcome}, stats[key]) for outcome, key in (
+             (SingleFlight.LEADER, 'leaders'), (SingleFlight.COALESCED, 'coalesced'),
+             (SingleFlight.TIMEOUT, 'timeouts'), (SingleFlight.LEADER_FAILED, 'leader_failures'))]),
+    ]
+
+if single_flight is not None:
+    metrics.REGISTRY.register_collector(single_flight_collector)
+
 def format_cli_response(result):
     """Format prediction result for display"""
-    def safe_join(val):
-        if isinstance(val, list):
-            return ', '.join([str(v).strip() for v in val if v and str(v).strip()])
-        if isinstance(val, str):
-            return val.strip() if val.strip() else '-'
-        return '-'
-    
     # Check if this is an error response
     if 'error' in result:
         error_type = result['error']
@@ -46,6 +152,21 @@ def format_cli_response(result):
         return response
     
     # Format successful prediction
+    return (
+        format_prediction_summary(result)
+        + format_symptom_matching(result)
+        + format_alternatives(result)
+    )
+
+def format_prediction_summary(result):
+    """Format the condition, confidence and treatment part of a prediction"""
+    def safe_join(val):
+        if isinstance(val, list):
+            return ', '.join([str(v).strip() for v in val if v and str(v).strip()])
+        if isinstance(val, str):
+            return val.strip() if val.strip() else '-'
+        return '-'
+    
     confidence = result.get('confidence', 0)
     accuracy_level = result.get('accuracy_level', 'unknown')
     
@@ -57,7 +178,7 @@ def format_cli_response(result):
     else:
         confidence_emoji = "🟠"
     
-    response = (
+    return (
         f"✅ Possible Condition: {result.get('disease', '-').title()}\n"
         f"{confidence_emoji} Confidence: {confidence}% ({result.get('accuracy_message', 'N/A')})\n"
         f"📊 Analysis: {result.get('recognized_symptoms', 0)}/{result.get('total_symptoms_provided', 0)} symptoms recognized\n"
@@ -67,6 +188,10 @@ def format_cli_response(result):
         f"🧼 Precautions: {safe_join(result.get('precautions', []))}\n"
         f"👨‍⚕️ Specialist to Consult: {result.get('specialist', 'General Practitioner')}"
     )
+
+def format_symptom_matching(result):
+    """Format the per-request symptom matching and unknown symptom sections"""
+    response = ""
     
     # Add matched symptoms info
     if result.get('symptom_match_info'):
@@ -78,181 +203,742 @@ def format_cli_response(result):
     if result.get('unknown_symptoms'):
         response += f"\n\n❓ I didn't recognize these: {', '.join(result['unknown_symptoms'])}"
     
+    return response
+
+def format_alternatives(result):
+    """Format the alternative diagnoses section"""
     # Add alternative diagnoses
     if result.get('alternative_diagnoses'):
         alts = [f"{alt['disease']} ({alt['confidence']}%)" 
                 for alt in result['alternative_diagnoses']]
-        response += f"\n\n🔄 Other possibilities to consider:\n  " + "\n  ".join(alts)
+        return f"\n\n🔄 Other possibilities to consider:\n  " + "\n  ".join(alts)
+    return ""
+
+def parse_symptoms(snapshot, symptoms):
+    """
+    Split raw symptom text into a list of symptoms.
+    Handles comma-separated lists and free text ("sore throat and high fever")
+    alike: known symptom phrases are extracted whole and only the leftover
+    words are fuzzy matched (see app/phrases.py).
+    """
+    return snapshot.extract_symptoms(symptoms)
+
+def precheck_symptoms(symptoms):
+    """
+    Handle inputs that never reach the predictor (empty text, greetings).
+    Returns (body, status_code) or None if the input should be analyzed.
+    """
+    if not isinstance(symptoms, str) or not symptoms.strip():
+        return {
+            'error': 'No symptoms provided',
+            'message': 'Please provide at least one symptom to analyze.'
+        }, 400
+        
+    # Check for greeting
+    greeting_response = greeter.get_response(symptoms)
+    if greeting_response:
+        return {'message': greeting_response}, 200
     
-    return response
+    return None
 
-@app.route('/api/analyze', methods=['POST'])
-def analyze():
+def build_analysis_response(result, compact=False):
+    """
+    Turn a match_disease result into the /api/analyze body and status code.
+    With compact the formatted message is left out.
+    """
+    if not result:
+        return {
+            'error': 'No matching disease found',
+            'message': 'Unable to diagnose based on provided symptoms. Please try different or more specific symptoms.'
+        }, 404
+    
+    # Check if result contains an error
+    if 'error' in result:
+        error_type = result['error']
+        
+        # Return appropriate status code based on error type
+        if error_type == 'no_symptoms':
+            status_code = 400
+        elif error_type == 'unknown_symptoms':
+            status_code = 422  # Unprocessable Entity
+        elif error_type == 'insufficient_symptoms':
+            status_code = 422
+        elif error_type == 'low_confidence':
+            status_code = 200  # Still return 200 but with warning
+        else:
+            status_code = 404
+        
+        body = {'error_type': error_type, 'details': result}
+        if not compact:
+            body['message'] = format_cli_response(result)
+        return body, status_code
+    
+    # Successful prediction
+    if compact:
+        return {'details': result}, 200
+    return {
+        'message': format_cli_response(result),
+        'details': result
+    }, 200
+
+def analyze_symptom_list(snapshot, symptom_list, min_symptoms=3, min_confidence=30, compact=False,
+                         differential=None):
+    """
+    Run the predictor snapshot on parsed symptoms and build the response body
+    (without the formatted message when compact). With differential, a
+    (k, rank_by, blend) tuple, the body also lists the top-k diseases
+    (SymptomPredictor.rank_diseases) under 'differential'.
+    """
+    with metrics.stage('preprocess_input'):
+        canonical = snapshot.canonicalize(symptom_list)
+    body, status_code = analyze_canonical(snapshot, canonical, min_symptoms, min_confidence, compact)
+    if differential is not None:
+        with metrics.stage('ranking'):
+            body['differential'] = snapshot.rank_canonical(canonical, *differential)
+    return body, status_code
+
+def analyze_canonical(snapshot, canonical, min_symptoms, min_confidence, compact):
+    """
+    Build the analysis body for a canonicalized case.
+    
+    When the result cache is enabled, successful predictions are cached under
+    SymptomPredictor.result_key. An entry holds the details and formatted
+    message sections that only depend on the canonical symptoms; the
+    per-request fields (symptom matching, unknown symptoms, symptom order)
+    are filled in from the current request.
+    """
+    if result_cache is None:
+        with metrics.stage('scoring'):
+            result = snapshot.match_canonical(canonical, min_symptoms, min_confidence)
+        with metrics.stage('format_response'):
+            return build_analysis_response(result, compact)
+    
+    # Keyed on the knowledge base too: a request still running on the old
+    # snapshot may store its result after a reload cleared the cache
+    key = (snapshot.kb.source_digest,) + snapshot.result_key(canonical, min_symptoms, min_confidence)
+    entry = result_cache.get(key)
+    if entry is None:
+        with metrics.stage('scoring'):
+            result = snapshot.match_canonical(canonical, min_symptoms, min_confidence)
+        if not result or 'error' in result:
+            with metrics.stage('format_response'):
+                return build_analysis_response(result, compact)
+    
+    with metrics.stage('format_response'):
+        if entry is None:
+            entry = {
+                'details': result,
+                'summary': format_prediction_summary(result),
+                'alternatives': format_alternatives(result)
+            }
+            result_cache.put(key, entry)
+        
+        _, processed_symptoms, unknown_symptoms, matched_info = canonical
+        matched = set(entry['details'].matched_symptoms)
+        details = entry['details'].replace(
+            matched_symptoms=[sym for sym in processed_symptoms if sym in matched],
+            symptom_match_info=matched_info,
+            unknown_symptoms=unknown_symptoms if unknown_symptoms else None
+        )
+        if compact:
+            return {'details': details}, 200
+        message = entry['summary'] + format_symptom_matching(details) + entry['alternatives']
+        return {'message': message, 'details': details}, 200
+
+def format_error(response_format):
+    """Error body for an unsupported ?format= value, or None"""
+    if response_format not in RESPONSE_FORMATS:
+        return {
+            'error': 'Invalid format',
+            'message': f"format must be one of: {', '.join(RESPONSE_FORMATS)}."
+        }, 400
+    return None
+
+def differential_params(data):
+    """
+    Read the differential diagnosis fields of an /api/analyze body: top_k,
+    rank_by ('score', 'coverage' or 'blend') and blend (0-1).
+    Returns ((k, rank_by, blend) or None without top_k, error body or None).
+    """
+    k = data.get('top_k')
+    if k is None:
+        return None, None
+    rank_by = data.get('rank_by', 'score')
+    blend = data.get('blend', 0.5)
+    if isinstance(k, bool) or not isinstance(k, int) or not 1 <= k <= DIFFERENTIAL_MAX_K:
+        return None, ({
+            'error': 'Invalid top_k',
+            'message': f'top_k must be an integer from 1 to {DIFFERENTIAL_MAX_K}.'
+        }, 400)
+    if rank_by not in SymptomPredictor.RANK_BY:
+        return None, ({
+            'error': 'Invalid rank_by',
+            'message': f"rank_by must be one of: {', '.join(SymptomPredictor.RANK_BY)}."
+        }, 400)
+    if isinstance(blend, bool) or not isinstance(blend, (int, float)) or not 0 <= blend <= 1:
+        return None, ({
+            'error': 'Invalid blend',
+            'message': 'blend must be a number from 0 to 1.'
+        }, 400)
+    return (k, rank_by, float(blend)), None
+
+def analysis_error_type(body, status_code):
+    """Error type of an analysis that didn't produce a prediction, or None"""
+    if 'error_type' in body:
+        return body['error_type']
+    if status_code >= 500:
+        return 'internal_error'
+    if status_code == 404:
+        return 'no_result'
+    if status_code != 200:
+        return 'invalid_input'
+    return None
+
+def record_analysis(body, status_code):
+    """Count analyses that didn't produce a prediction by their error type"""
+    error_type = analysis_error_type(body, status_code)
+    if error_type:
+        metrics.ANALYSIS_ERRORS.inc(error_type)
+
+def analyze_text(snapshot, symptoms, compact=False, differential=None):
+    """
+    Analyze raw symptom text: greeting check, symptom extraction and scoring.
+    Returns (body, status_code, error_type) where error_type is the
+    ANALYSIS_ERRORS label of an analysis without a prediction, or None.
+    """
+    with metrics.stage('greeting_check'):
+        early = precheck_symptoms(symptoms)
+    if early:
+        logger.debug("Early response: %s", early[0])
+        return early + (analysis_error_type(*early),)
+    
+    with metrics.stage('tokenize'):
+        symptom_list = parse_symptoms(snapshot, symptoms)
+    logger.debug("Symptom list: %s", symptom_list)
+    
+    if not symptom_list:
+        return {
+            'error': 'No valid symptoms provided',
+            'message': 'Please provide symptoms separated by commas.'
+        }, 400, 'no_valid_symptoms'
+        
+    # Get prediction with validation (require at least 3 symptoms for accurate diagnosis)
+    body, status_code = analyze_symptom_list(
+        snapshot, symptom_list, min_symptoms=3, min_confidence=30,
+        compact=compact, differential=differential
+    )
+    logger.debug("Result: %s", body.get('details'))
+    logger.debug("Formatted: %s", body.get('message'))
+    return body, status_code, analysis_error_type(body, status_code)
+
+def coalesce_key(snapshot, symptoms, response_format, differential):
+    """
+    single_flight key of an /api/analyze request, or None when it isn't coalesced.
+    
+    The text is lowercased and stripped, as greeting detection and symptom
+    extraction do first, so requests differing only in case or surrounding
+    whitespace get the same response. Inner whitespace is kept: it can change
+    fuzzy scores. Keyed on the snapshot object rather than its source digest
+    since a reload can change the alias table without touching the CSVs.
+    """
+    if single_flight is None or not isinstance(symptoms, str):
+        return None
+    return (snapshot, response_format, symptoms.lower().strip(), differential)
+
+# Request handlers shared by the Flask app and the ASGI server (asgi_server.py).
+# Each takes a callable returning the parsed JSON body and returns (body, status).
+# Session handlers take the values captured from the URL path first. The
+# analysis handlers also take the ?format= query value (RESPONSE_FORMATS).
+
+def analyze_request(get_json, response_format='full'):
     try:
-        if not predictor or not greeter:
-            return jsonify({'error': 'Backend components not initialized properly'}), 500
+        snapshot = predictor
+        if not snapshot or not greeter:
+            return {'error': 'Backend components not initialized properly'}, 500
+        error = format_error(response_format)
+        if error:
+            return error
             
-        data = request.get_json()
-        print("Received data:", data, flush=True)
+        data = get_json()
+        logger.debug("Received data: %s", data)
         symptoms = data.get('symptoms', '')
-        print("Parsed symptoms:", symptoms, flush=True)
+        differential, error = differential_params(data)
+        if error:
+            record_analysis(*error)
+            return error
         
-        if not symptoms or not symptoms.strip():
-            return jsonify({
-                'error': 'No symptoms provided',
-                'message': 'Please provide at least one symptom to analyze.'
-            }), 400
+        compact = response_format == 'compact'
+        key = coalesce_key(snapshot, symptoms, response_format, differential)
+        if key is None:
+            body, status_code, error_type = analyze_text(snapshot, symptoms, compact, differential)
+        else:
+            # Concurrent duplicates share the leader's body; nothing below mutates it
+            (body, status_code, error_type), outcome = single_flight.do(
+                key, lambda: analyze_text(snapshot, symptoms, compact, differential)
+            )
+            logger.debug("Single flight: %s", outcome)
+        if error_type:
+            metrics.ANALYSIS_ERRORS.inc(error_type)
+        return body, status_code
             
-        # Check for greeting
-        greeting_response = greeter.get_response(symptoms)
-        if greeting_response:
-            print("Greeting detected. Responding:", greeting_response, flush=True)
-            return jsonify({'message': greeting_response})
+    except Exception as e:
+        logger.error("Exception occurred: %s", e)
+        traceback.print_exc()
+        metrics.ANALYSIS_ERRORS.inc('internal_error')
+        return {
+            'error': 'Internal server error',
+            'message': f'An error occurred while processing your request: {str(e)}'
+        }, 500
+
+def analyze_batch_request(get_json, response_format='full'):
+    """
+    Analyze many symptom inputs in one call.
+    Accepts a JSON array whose items are symptom strings (or objects with a
+    'symptoms' field) and returns an array of /api/analyze response bodies,
+    each with the status code the single call would have returned.
+    """
+    try:
+        snapshot = predictor
+        if not snapshot or not greeter:
+            return {'error': 'Backend components not initialized properly'}, 500
+        error = format_error(response_format)
+        if error:
+            return error
         
-        # Parse symptoms - handle both comma-separated and space-separated
-        if ',' in symptoms:
-            # User used commas, split by comma
-            symptom_list = [s.strip() for s in symptoms.split(',') if s.strip()]
-        else:
-            # No commas, split by spaces/newlines
-            symptom_list = [s.strip() for s in symptoms.split() if s.strip()]
+        data = get_json()
+        if isinstance(data, dict):
+            data = data.get('cases')
+        if not isinstance(data, list):
+            return {
+                'error': 'Invalid batch',
+                'message': 'Please provide a JSON array of symptom inputs.'
+            }, 400
+        if len(data) > BATCH_MAX_CASES:
+            return {
+                'error': 'Batch too large',
+                'message': f'A batch may contain at most {BATCH_MAX_CASES} cases.'
+            }, 413
+        
+        responses = [None] * len(data)
+        pending, symptom_lists = [], []
+        for i, item in enumerate(data):
+            symptoms = item.get('symptoms', '') if isinstance(item, dict) else item
+            early = precheck_symptoms(symptoms)
+            if early:
+                responses[i] = early
+                continue
+            
+            symptom_list = parse_symptoms(snapshot, symptoms)
+            if not symptom_list:
+                responses[i] = ({
+                    'error': 'No valid symptoms provided',
+                    'message': 'Please provide symptoms separated by commas.'
+                }, 400)
+                continue
+            
+            pending.append(i)
+            symptom_lists.append(symptom_list)
+        
+        with metrics.stage('scoring'):
+            results = snapshot.match_disease_batch(symptom_lists, min_symptoms=3, min_confidence=30)
+        with metrics.stage('format_response'):
+            for i, result in zip(pending, results):
+                responses[i] = build_analysis_response(result, response_format == 'compact')
+        
+        for body, status_code in responses:
+            record_analysis(body, status_code)
+        logger.debug("Batch analyzed: %d cases, %d scored", len(data), len(pending))
+        return [dict(body, status=status_code) for body, status_code in responses], 200
+    
+    except Exception as e:
+        logger.error("Exception occurred: %s", e)
+        traceback.print_exc()
+        return {
+            'error': 'Internal server error',
+            'message': f'An error occurred while processing your request: {str(e)}'
+        }, 500
+
+def session_error(session_id):
+    """Error body for a request that can't use the given session, or None"""
+    if not predictor or not greeter or session_store is None:
+        return {'error': 'Backend components not initialized properly'}, 500
+    if not SESSION_ID_PATTERN.fullmatch(session_id):
+        return {
+            'error': 'Invalid session id',
+            'message': 'Session ids are 1-64 letters, digits, dashes or underscores.'
+        }, 400
+    return None
+
+def load_session(snapshot, session_id):
+    """The stored session with its sums synced to the snapshot's knowledge base, or None"""
+    session = session_store.get(session_id)
+    if session is not None:
+        session.sync(snapshot.kb)
+    return session
+
+def session_not_found(session_id):
+    return {'error': 'Session not found', 'message': f"No active session '{session_id}'."}, 404
+
+def session_symptoms_request(session_id, get_json, response_format='full'):
+    """
+    Add the symptoms of one chat message to a session (created on first use)
+    and analyze everything the session holds. Only diseases affected by the
+    new symptoms are updated; greetings leave the session untouched.
+    """
+    try:
+        snapshot = predictor
+        error = session_error(session_id) or format_error(response_format)
+        if error:
+            return error
+        
+        data = get_json()
+        symptoms = data.get('symptoms', '')
         
-        print("Symptom list:", symptom_list, flush=True)
+        with metrics.stage('greeting_check'):
+            early = precheck_symptoms(symptoms)
+        if early:
+            record_analysis(*early)
+            return early
         
+        with metrics.stage('tokenize'):
+            symptom_list = parse_symptoms(snapshot, symptoms)
         if not symptom_list:
-            return jsonify({
+            metrics.ANALYSIS_ERRORS.inc('no_valid_symptoms')
+            return {
                 'error': 'No valid symptoms provided',
                 'message': 'Please provide symptoms separated by commas.'
-            }), 400
-            
-        # Get prediction with validation (require at least 3 symptoms for accurate diagnosis)
-        result = predictor.match_disease(symptom_list, min_symptoms=3, min_confidence=30)
-        print("Result:", result, flush=True)
+            }, 400
         
-        if result:
-            # Check if result contains an error
-            if 'error' in result:
-                error_type = result['error']
-                formatted = format_cli_response(result)
-                
-                # Return appropriate status code based on error type
-                if error_type == 'no_symptoms':
-                    status_code = 400
-                elif error_type == 'unknown_symptoms':
-                    status_code = 422  # Unprocessable Entity
-                elif error_type == 'insufficient_symptoms':
-                    status_code = 422
-                elif error_type == 'low_confidence':
-                    status_code = 200  # Still return 200 but with warning
-                else:
-                    status_code = 404
-                
-                return jsonify({
-                    'message': formatted,
-                    'error_type': error_type,
-                    'details': result
-                }), status_code
-            else:
-                # Successful prediction
-                formatted = format_cli_response(result)
-                print("Formatted:", formatted, flush=True)
-                return jsonify({
-                    'message': formatted,
-                    'details': result
-                }), 200
-        else:
-            print("No result returned", flush=True)
-            return jsonify({
-                'error': 'No matching disease found',
-                'message': 'Unable to diagnose based on provided symptoms. Please try different or more specific symptoms.'
-            }), 404
-            
+        with metrics.stage('preprocess_input'):
+            _, _, unknown_symptoms, matched_info = snapshot.canonicalize(symptom_list)
+        with metrics.stage('session'):
+            session = load_session(snapshot, session_id) or SymptomSession(session_id, snapshot.kb.source_digest)
+            added = session.add(snapshot.kb, matched_info)
+            session_store.save(session)
+        with metrics.stage('scoring'):
+            result = snapshot.match_session(session, unknown_symptoms, min_symptoms=3, min_confidence=30)
+        with metrics.stage('format_response'):
+            body, status_code = build_analysis_response(result, response_format == 'compact')
+        body['session'] = dict(session.summary(), added=added)
+        logger.debug("Session %s: added %s, now %s", session_id, added, session.symptoms)
+        record_analysis(body, status_code)
+        return body, status_code
+    
     except Exception as e:
-        print("Exception occurred:", e, flush=True)
+        logger.error("Exception occurred: %s", e)
         traceback.print_exc()
-        return jsonify({
+        metrics.ANALYSIS_ERRORS.inc('internal_error')
+        return {
             'error': 'Internal server error',
             'message': f'An error occurred while processing your request: {str(e)}'
-        }), 500
+        }, 500
 
-@app.route('/api/login', methods=['POST'])
-def handle_login():
+def remove_session_symptom_request(session_id, symptom, get_json=None):
+    """
+    Remove a symptom from a session. The symptom may be given as the
+    canonical name or as text resolving to it ("sore throat").
+    """
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'message': 'No data provided'}), 400
-            
-        email = data.get('username')  # frontend sends 'username' but it's actually email
-        password = data.get('password')
+        snapshot = predictor
+        error = session_error(session_id)
+        if error:
+            return error
+        session = load_session(snapshot, session_id)
+        if session is None:
+            return session_not_found(session_id)
         
-        if not email or not password:
-            return jsonify({'message': 'Email and password are required'}), 400
-            
-        user = login(email, password)
-        if user:
-            return jsonify({'message': 'Login successful', 'user': user}), 200
+        if symptom in session.symptoms:
+            targets = [symptom]
         else:
-            return jsonify({'message': 'Invalid email or password'}), 401
+            targets = snapshot.canonicalize(snapshot.extract_symptoms(symptom))[1]
+        removed = [sym for sym in dict.fromkeys(targets) if session.remove(snapshot.kb, sym)]
+        if not removed:
+            return {
+                'error': 'Symptom not in session',
+                'message': f"The session has no symptom matching '{symptom}'."
+            }, 404
+        session_store.save(session)
+        return {'session': dict(session.summary(), removed=removed)}, 200
+    
     except Exception as e:
-        print(f"Login error: {e}")
-        return jsonify({'message': 'Login failed due to server error'}), 500
+        logger.error("Exception occurred: %s", e)
+        traceback.print_exc()
+        return {'error': 'Internal server error'}, 500
 
-@app.route('/api/signup', methods=['POST'])
-def handle_signup():
+def session_request(session_id, get_json=None):
+    """Symptoms currently held by a session"""
+    error = session_error(session_id)
+    if error:
+        return error
+    session = load_session(predictor, session_id)
+    if session is None:
+        return session_not_found(session_id)
+    return {'session': session.summary()}, 200
+
+def delete_session_request(session_id, get_json=None):
+    error = session_error(session_id)
+    if error:
+        return error
+    if not session_store.delete(session_id):
+        return session_not_found(session_id)
+    return {'message': 'Session deleted'}, 200
+
+def reload_request(get_json):
+    """
+    Reload the knowledge base in the background (see app/reloader.py).
+    Expects {"token": ADMIN_TOKEN}; with {"wait": true} the response is sent
+    once the new snapshot is in use.
+    """
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'message': 'No data provided'}), 400
-            
-        username = data.get('username')
-        email = data.get('email')
-        password = data.get('password')
+        if reloader is None:
+            return {'error': 'Backend components not initialized properly'}, 500
+        if not ADMIN_TOKEN:
+            return {'error': 'Reload endpoint disabled', 'message': 'Set ADMIN_TOKEN to enable it.'}, 403
         
-        if not username or not email or not password:
-            return jsonify({'message': 'Username, email, and password are required'}), 400
-            
-        signup(username, email, password)
-        return jsonify({'message': 'Signup successful'}), 201
-    except ValueError as e:
-        return jsonify({'message': str(e)}), 400
+        data = get_json() or {}
+        if not hmac.compare_digest(str(data.get('token', '')), ADMIN_TOKEN):
+            return {'error': 'Invalid admin token'}, 403
+        
+        if data.get('wait'):
+            if not reloader.reload():
+                return {'error': 'Reload failed', 'knowledge_base': reloader.status()}, 500
+            return {'message': 'Knowledge base reloaded', 'knowledge_base': reloader.status()}, 200
+        if not reloader.reload_in_background():
+            return {'message': 'A reload is already running', 'knowledge_base': reloader.status()}, 409
+        return {'message': 'Reload started', 'knowledge_base': reloader.status()}, 202
     except Exception as e:
-        print(f"Signup error: {e}")
-        return jsonify({'message': 'Signup failed due to server error'}), 500
+        logger.error("Reload error: %s", e)
+        traceback.print_exc()
+        return {'error': 'Internal server error'}, 500
 
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
+def login_params(get_json):
+    """((email, password), None) from a /api/login body, or (None, error response)"""
+    data = get_json()
+    if not data:
+        return None, ({'message': 'No data provided'}, 400)
+        
+    email = data.get('username')  # frontend sends 'username' but it's actually email
+    password = data.get('password')
+    
+    if not email or not password:
+        return None, ({'message': 'Email and password are required'}, 400)
+    return (email, password), None
+
+def login_response(user):
+    if user:
+        return {'message': 'Login successful', 'user': user}, 200
+    return {'message': 'Invalid email or password'}, 401
+
+def signup_params(get_json):
+    """((username, email, password), None) from a /api/signup body, or (None, error response)"""
+    data = get_json()
+    if not data:
+        return None, ({'message': 'No data provided'}, 400)
+        
+    username = data.get('username')
+    email = data.get('email')
+    password = data.get('password')
+    
+    if not username or not email or not password:
+        return None, ({'message': 'Username, email, and password are required'}, 400)
+    return (username, email, password), None
+
+def account_error(action, e):
+    """Response for a login or signup that raised"""
+    if isinstance(e, ValueError) and action == 'Signup':
+        return {'message': str(e)}, 400
+    if isinstance(e, UserStoreBusy):
+        logger.warning("%s rejected: %s", action, e)
+        return {'message': 'Server busy, please try again'}, 503
+    logger.error("%s error: %s", action, e)
+    return {'message': f'{action} failed due to server error'}, 500
+
+def login_request(get_json):
+    try:
+        params, error = login_params(get_json)
+        if error:
+            return error
+        return login_response(login(*params))
+    except Exception as e:
+        return account_error('Login', e)
+
+def signup_request(get_json):
+    try:
+        params, error = signup_params(get_json)
+        if error:
+            return error
+        signup(*params)
+        return {'message': 'Signup successful'}, 201
+    except Exception as e:
+        return account_error('Signup', e)
+
+# The ASGI server awaits these instead of running login_request and
+# signup_request on its executor: password hashing then holds no thread that
+# /api/analyze needs while it runs (see app/users.py)
+
+async def login_request_async(get_json):
+    try:
+        params, error = login_params(get_json)
+        if error:
+            return error
+        return login_response(await login_async(*params))
+    except Exception as e:
+        return account_error('Login', e)
+
+async def signup_request_async(get_json):
+    try:
+        params, error = signup_params(get_json)
+        if error:
+            return error
+        await signup_async(*params)
+        return {'message': 'Signup successful'}, 201
+    except Exception as e:
+        return account_error('Signup', e)
+
+def health_status():
+    """Health check body"""
+    snapshot = predictor
     status = {
         'status': 'healthy',
-        'predictor': predictor is not None,
+        'predictor': snapshot is not None,
         'greeter': greeter is not None,
         'message': 'SymptomAI Backend is running'
     }
-    return jsonify(status), 200
+    if snapshot is not None:
+        status['knowledge_base'] = reloader.status()
+        status['caches'] = {
+            'symptom_resolution': snapshot.resolution_cache.stats()
+        }
+        if result_cache is not None:
+            status['caches']['analysis_results'] = result_cache.stats()
+        if single_flight is not None:
+            status['single_flight'] = single_flight.stats()
+        status['symptom_lookup'] = snapshot.lookup_stats()
+        if session_store is not None:
+            status['sessions'] = session_store.stats()
+        if snapshot.engine is not None:
+            status['engine'] = dict(snapshot.engine.stats, processes=snapshot.engine.processes)
+    return status, 200
 
-@app.route('/', methods=['GET'])
-def root():
-    """Root endpoint"""
-    return jsonify({
+def api_info():
+    """Root endpoint body"""
+    return {
         'message': 'SymptomAI Backend API',
         'version': '1.0.0',
         'endpoints': [
             '/api/health',
             '/api/analyze',
+            '/api/analyze/batch',
+            '/api/sessions/<id>',
+            '/api/sessions/<id>/symptoms',
             '/api/login',
-            '/api/signup'
+            '/api/signup',
+            '/api/metrics',
+            '/api/admin/reload'
         ]
-    }), 200
+    }, 200
+
+def run_handler(endpoint, handler, *args, **kwargs):
+    """
+    Run a request handler with request metrics.
+    Returns (body, status, server_timing) where server_timing is the
+    Server-Timing header value, or None when SERVER_TIMING_ENABLED is off.
+    """
+    metrics.start_request()
+    start = time.perf_counter()
+    body, status_code = handler(*args, **kwargs)
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+    metrics.REQUESTS.inc(endpoint, str(status_code))
+    timing = metrics.server_timing() if SERVER_TIMING_ENABLED else None
+    return body, status_code, timing
+
+async def run_handler_async(endpoint, handler, *args, **kwargs):
+    """run_handler for a coroutine handler"""
+    metrics.start_request()
+    start = time.perf_counter()
+    body, status_code = await handler(*args, **kwargs)
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+    metrics.REQUESTS.inc(endpoint, str(status_code))
+    timing = metrics.server_timing() if SERVER_TIMING_ENABLED else None
+    return body, status_code, timing
+
+def respond(endpoint, handler, *args, **kwargs):
+    body, status_code, timing = run_handler(endpoint, handler, *args, **kwargs)
+    if app.debug:
+        response = jsonify(body)  # pretty-printed
+    else:
+        response = app.response_class(dumps(body) + '\n', mimetype=app.json.mimetype)
+    if timing:
+        response.headers['Server-Timing'] = timing
+    return response, status_code
+
+@app.route('/api/analyze', methods=['POST'])
+def analyze():
+    return respond('/api/analyze', analyze_request, request.get_json,
+                   response_format=request.args.get('format', 'full'))
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    return respond('/api/analyze/batch', analyze_batch_request, request.get_json,
+                   response_format=request.args.get('format', 'full'))
+
+@app.route('/api/sessions/<session_id>/symptoms', methods=['POST'])
+def add_session_symptoms(session_id):
+    return respond('/api/sessions/{id}/symptoms', session_symptoms_request, session_id, request.get_json,
+                   response_format=request.args.get('format', 'full'))
+
+@app.route('/api/sessions/<session_id>/symptoms/<path:symptom>', methods=['DELETE'])
+def remove_session_symptom(session_id, symptom):
+    return respond('/api/sessions/{id}/symptoms/{symptom}', remove_session_symptom_request, session_id, symptom)
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    return respond('/api/sessions/{id}', session_request, session_id)
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    return respond('/api/sessions/{id}', delete_session_request, session_id)
+
+@app.route('/api/admin/reload', methods=['POST'])
+def admin_reload():
+    return respond('/api/admin/reload', reload_request, request.get_json)
+
+@app.route('/api/login', methods=['POST'])
+def handle_login():
+    return respond('/api/login', login_request, request.get_json)
+
+@app.route('/api/signup', methods=['POST'])
+def handle_signup():
+    return respond('/api/signup', signup_request, request.get_json)
+
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    return respond('/api/health', health_status)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of request, stage, error and cache metrics"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/', methods=['GET'])
+def root():
+    """Root endpoint"""
+    return respond('/', api_info)
 
 if __name__ == '__main__':
-    import os
     port = int(os.environ.get('PORT', 5000))
     print("🚀 Starting SymptomAI Backend Server...")
     print("📊 Available endpoints:")
     print("  - GET  /           : API information")
     print("  - GET  /api/health : Health check")
     print("  - POST /api/analyze: Symptom analysis")
+    print("  - POST /api/analyze/batch: Batch symptom analysis")
+    print("  - POST /api/sessions/<id>/symptoms: Add symptoms to a conversation and analyze it")
+    print("  - GET|DELETE /api/sessions/<id>: Show or end a conversation")
     print("  - POST /api/login  : User login")
     print("  - POST /api/signup : User signup")
+    print("  - GET  /api/metrics: Prometheus metrics")
+    print("  - POST /api/admin/reload: Reload the knowledge base (needs ADMIN_TOKEN)")
     print(f"🌐 Server will be available at: http://0.0.0.0:{port}")
     app.run(host="0.0.0.0", port=port, debug=False) 
\ No newline at end of file
@@ -0,0 +1,55 @@
+"""
+Symptom alias table.
+
+Maps the words people actually type ("tummy ache", "throwing up") to
+vocabulary symptoms (stomach_pain, vomiting). The table is a CSV with
+`alias,symptom` columns (data/symptom_aliases.csv by default, or
+SYMPTOM_ALIASES_PATH) compiled into a dict, so a listed alias resolves with
+one hash lookup and never reaches RapidFuzz.
+"""
+import csv
+import os
+
+DEFAULT_ALIASES_PATH = os.path.join(os.path.dirname(__file__), '../data/symptom_aliases.csv')
+
+
+def normalize_alias(text):
+    """Lowercase and collapse whitespace, as aliases are looked up"""
+    return ' '.join(text.lower().split())
+
+
+def load_aliases(path, vocab):
+    """
+    Compile the alias table for a vocabulary.
+
+    Rows pointing at symptoms missing from the vocabulary, aliases that are
+    vocabulary symptoms themselves and repeated aliases are skipped with a
+    warning.
+
+    Args:
+        path: Alias CSV path (None or a missing file gives an empty table)
+        vocab: Vocabulary symptoms
+
+    Returns:
+        Dict of normalized alias -> vocabulary symptom
+    """
+    if not path or not os.path.exists(path):
+        print(f"⚠️ Symptom alias file not found: {path}, resolving symptoms by fuzzy matching only")
+        return {}
+
+    vocab = set(vocab)
+    aliases = {}
+    skipped = 0
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            alias = normalize_alias(row.get('alias') or '')
+            symptom = (row.get('symptom') or '').strip()
+            if not alias or symptom not in vocab or alias in vocab or alias in aliases:
+                skipped += 1
+                continue
+            aliases[alias] = symptom
+
+    if skipped:
+        print(f"⚠️ Skipped {skipped} symptom alias rows (unknown symptom, duplicate or vocabulary term)")
+    print(f"✅ Loaded {len(aliases)} symptom aliases from {path}")
+    return aliases
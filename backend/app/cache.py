@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class _Counters:
+    """Hit/miss/eviction counters, shared by a cache and its fresh() successors"""
+    __slots__ = ('hits', 'misses', 'evictions', 'expirations')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded least-recently-used cache.
+    Keeps hit/miss/eviction counters so the size can be tuned from real traffic.
+    A max_size of 0 disables storage (every lookup is a miss). With a ttl (in
+    seconds) entries also expire; an expired entry counts as a miss.
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max(0, int(max_size))
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._counters = _Counters()
+
+    def fresh(self):
+        """
+        An empty cache with the same settings whose counters continue this
+        one's (e.g. a reloaded predictor's), so metrics don't drop to zero.
+        Both keep counting into the same totals, under one lock.
+        """
+        cache = LRUCache(self.max_size, self.ttl)
+        cache._counters = self._counters
+        cache._lock = self._lock
+        return cache
+
+    @property
+    def hits(self):
+        return self._counters.hits
+
+    @property
+    def misses(self):
+        return self._counters.misses
+
+    @property
+    def evictions(self):
+        return self._counters.evictions
+
+    @property
+    def expirations(self):
+        return self._counters.expirations
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """Return the cached value for key (marking it recently used) or default"""
+        with self._lock:
+            value = self._lookup(key)
+            return default if value is _MISSING else value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries if full"""
+        with self._lock:
+            self._store(key, value)
+
+    def pop(self, key, default=None):
+        """Remove key and return its value (default if missing or expired)"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._counters.expirations += 1
+                return default
+            return value
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss.
+        compute() runs outside the lock; its result is dropped if the cache was
+        cleared meanwhile, so stale values never survive an invalidation.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+            generation = self._generation
+
+        value = compute()
+
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, value)
+        return value
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def stats(self):
+        """Return size and hit-rate counters"""
+        with self._lock:
+            counters = self._counters
+            lookups = counters.hits + counters.misses
+            stats = {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': counters.hits,
+                'misses': counters.misses,
+                'evictions': counters.evictions,
+                'hit_rate': round(counters.hits / lookups, 4) if lookups else 0.0
+            }
+            if self.ttl is not None:
+                stats['ttl'] = self.ttl
+                stats['expirations'] = counters.expirations
+            return stats
+
+    def _lookup(self, key):
+        # Caller holds the lock
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self._counters.hits += 1
+                return value
+            del self._data[key]
+            self._counters.expirations += 1
+        self._counters.misses += 1
+        return _MISSING
+
+    def _store(self, key, value):
+        # Caller holds the lock
+        if self.max_size == 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self._counters.evictions += 1
@@ -0,0 +1,195 @@
+"""
+Process-pool engine for heavy SymptomPredictor work.
+
+RapidFuzz matching and the NumPy scoring loop run in the calling thread, so
+one request can use at most one core. ScoringEngine keeps a persistent pool
+of worker processes, each holding its own copy of the knowledge base (loaded
+once, memory-mapped from the compiled bundle when available), and shards:
+
+  - symptom resolution: distinct uncached symptom strings are split into
+    contiguous chunks and fuzzy matched in parallel
+  - disease scoring: candidate disease rows are split into contiguous shards;
+    every row is scored independently, so concatenating the shards in order
+    gives exactly the arrays a single process would compute
+
+Small inputs stay serial: the pool is only used when the estimated work is
+above PARALLEL_MIN_SYMPTOMS uncached symptoms or PARALLEL_MIN_CELLS scoring
+cells (cases x diseases x symptoms), since inter-process transfer costs more
+than it saves below that. The pool is started on first use.
+
+An engine serves one knowledge base. A reloaded snapshot gets its own engine
+(for_knowledge_base), so requests still running on the old snapshot keep
+scoring in the old pool; that pool is shut down once no snapshot refers to
+its engine any more.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.knowledge_base import BundleError, build_from_csv, load_bundle
+
+# Predictor owned by each pool process (set by _init_worker)
+_worker_predictor = None
+
+
+class StaleEngineError(RuntimeError):
+    """A pool process holds a different knowledge base than the caller"""
+
+
+def _init_worker(data_dir, bundle_path, digest):
+    global _worker_predictor
+    from app.predictor import SymptomPredictor
+
+    kb = None
+    if bundle_path and os.path.exists(bundle_path):
+        try:
+            kb = load_bundle(bundle_path, expected_digest=digest, use_mmap=True)
+        except BundleError:
+            kb = None
+    if kb is None:
+        kb = build_from_csv(data_dir)
+    _worker_predictor = SymptomPredictor(kb=kb, processes=0)
+
+
+def _check_digest(digest):
+    if _worker_predictor.kb.source_digest != digest:
+        raise StaleEngineError('pool process knowledge base does not match the caller')
+
+
+def _worker_pid(digest):
+    _check_digest(digest)
+    # Hold the task briefly so the other processes pick up the rest
+    time.sleep(0.01)
+    return os.getpid()
+
+
+def _resolve_chunk(digest, symptoms, threshold):
+    _check_digest(digest)
+    return [_worker_predictor._fuzzy_resolve(sym, threshold) for sym in symptoms]
+
+
+def _score_shard(digest, processed_cases, rows):
+    _check_digest(digest)
+    scores, coverage, matched = _worker_predictor._score_diseases(processed_cases, rows)
+    return scores, coverage, matched
+
+
+def _contiguous_chunks(n, parts):
+    """Split range(n) into at most `parts` contiguous, non-empty (start, stop) slices"""
+    parts = max(1, min(parts, n))
+    bounds = np.linspace(0, n, parts + 1).astype(int)
+    return [(bounds[i], bounds[i + 1]) for i in range(parts) if bounds[i] < bounds[i + 1]]
+
+
+class ScoringEngine:
+    """
+    Persistent process pool that shards symptom resolution and disease
+    scoring for a SymptomPredictor.
+
+    Args:
+        kb: The caller's KnowledgeBase; pool processes load the same one
+        data_dir: CSV source directory (used when there is no fresh bundle)
+        bundle_path: Compiled bundle for the pool processes to memory-map
+        processes: Number of pool processes
+        min_symptoms: Uncached symptoms needed before resolution is sharded
+        min_cells: Scoring cells needed before scoring is sharded
+        start_method: multiprocessing start method ('spawn' by default, which
+            is safe to use from threaded servers)
+    """
+    def __init__(self, kb, data_dir, bundle_path=None, processes=None,
+                 min_symptoms=None, min_cells=None, start_method=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.min_symptoms = min_symptoms if min_symptoms is not None else int(os.environ.get('PARALLEL_MIN_SYMPTOMS', 256))
+        self.min_cells = min_cells if min_cells is not None else int(os.environ.get('PARALLEL_MIN_CELLS', 2000000))
+        self.start_method = start_method or os.environ.get('SCORING_START_METHOD', 'spawn')
+        self.data_dir = data_dir
+        self.bundle_path = bundle_path
+        self.kb = kb
+        self._pool = None
+        self._finalizer = None
+        self._lock = threading.Lock()
+        self.stats = {'parallel_resolves': 0, 'parallel_scores': 0, 'fallbacks': 0}
+
+    def for_knowledge_base(self, kb):
+        """
+        Engine for a reloaded snapshot: this one if kb has the same source
+        digest (pool processes hold the same data), otherwise a new engine
+        with the same settings. This engine and its pool are left running
+        for the requests still using it.
+        """
+        if kb.source_digest == self.kb.source_digest:
+            return self
+        engine = ScoringEngine(kb, self.data_dir, self.bundle_path, self.processes,
+                               self.min_symptoms, self.min_cells, self.start_method)
+        # Counters continue across reloads
+        engine.stats = self.stats
+        return engine
+
+    def should_resolve(self, n_symptoms):
+        return self.processes > 1 and n_symptoms >= self.min_symptoms
+
+    def should_score(self, n_cases, n_rows, width):
+        return self.processes > 1 and n_rows > 1 and n_cases * n_rows * width >= self.min_cells
+
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(self.data_dir, self.bundle_path, self.kb.source_digest)
+                )
+                # Stop the pool processes once the engine is garbage collected
+                self._finalizer = weakref.finalize(self, self._pool.shutdown, wait=False)
+            return self._pool
+
+    def warm_up(self):
+        """
+        Start every pool process now instead of on the first heavy request.
+        Returns once each of them has loaded its knowledge base: one process
+        can finish every warm-up task while another is still starting.
+        """
+        pids = set()
+        while len(pids) < self.processes:
+            pids.update(self.pool().map(_worker_pid, [self.kb.source_digest] * self.processes))
+
+    def resolve(self, symptoms, threshold):
+        """Fuzzy resolve symptom strings in parallel; results are in input order"""
+        digest = self.kb.source_digest
+        futures = [
+            self.pool().submit(_resolve_chunk, digest, symptoms[start:stop], threshold)
+            for start, stop in _contiguous_chunks(len(symptoms), self.processes)
+        ]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        self.stats['parallel_resolves'] += 1
+        return results
+
+    def score(self, processed_cases, rows):
+        """Score disease rows in parallel shards; same arrays as SymptomPredictor._score_diseases"""
+        digest = self.kb.source_digest
+        futures = [
+            self.pool().submit(_score_shard, digest, processed_cases, rows[start:stop])
+            for start, stop in _contiguous_chunks(len(rows), self.processes)
+        ]
+        shards = [future.result() for future in futures]
+        self.stats['parallel_scores'] += 1
+        return (
+            np.concatenate([shard[0] for shard in shards], axis=1),
+            np.concatenate([shard[1] for shard in shards], axis=1),
+            np.concatenate([shard[2] for shard in shards], axis=1)
+        )
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._finalizer.detach()
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,183 @@
+"""
+Chunked ingestion of the disease CSV sources.
+
+The symptom files are wide tables (Disease, Symptom_1..Symptom_17) with one
+row per observed case, and the same symptom set repeats across many rows.
+They used to be read whole and collapsed with a Python lambda per row
+(DataFrame.apply(axis=1)) and a Python set per disease (groupby().apply),
+so time and memory grew with the number of rows. Here:
+
+  - sources are read in chunks of ETL_CHUNK_ROWS rows (read_chunks)
+  - repeated rows are dropped from each chunk first (distinct_rows, a
+    hash-based drop_duplicates); on symptom data that leaves a few thousand
+    rows out of every 100,000
+  - the Symptom_* / Precaution_* columns of the remaining rows are combined
+    with one vectorized string operation per column (join_columns) or
+    stacked into (disease, symptom) pairs (melt_symptoms) instead of row by
+    row
+  - the per-disease accumulators (DistinctValues, FirstValues) de-duplicate
+    each chunk's output again before it reaches Python dicts, so only values
+    not seen yet cost Python work
+
+Memory is bounded by one chunk plus the distinct values kept, independent
+of how many rows the sources have. merge_disease_data builds
+data/disease_data.csv (data/merge_datasets.py); build_from_csv uses the
+same helpers for the knowledge base.
+"""
+import os
+
+import pandas as pd
+
+DEFAULT_CHUNK_ROWS = int(os.environ.get('ETL_CHUNK_ROWS', 100000))
+
+TREATMENT_COLUMNS = ('medications', 'procedures', 'specialist')
+
+
+def read_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Read a CSV in DataFrames of up to chunk_rows rows, every column as text (NaN when empty)"""
+    with pd.read_csv(path, chunksize=chunk_rows, dtype=str) as reader:
+        yield from reader
+
+
+def prefixed_columns(frame, prefix):
+    """Columns of frame whose name starts with prefix, in order"""
+    return [column for column in frame.columns if column.startswith(prefix)]
+
+
+def normalize_names(values):
+    """Lowercase and strip disease names, as the sources are joined on them"""
+    return values.str.lower().str.strip()
+
+
+def distinct_rows(frame, columns):
+    """Rows of frame with a combination of values in columns not seen earlier in it, in order"""
+    return frame.drop_duplicates(subset=list(columns))
+
+
+def join_columns(frame, columns, sep, strip=False):
+    """
+    Join each row's non-empty values of some columns, in column order.
+
+    Args:
+        frame: DataFrame
+        columns: Columns to join
+        sep: Separator between values
+        strip: Strip values first (values left empty are skipped)
+
+    Returns:
+        Series of strings ('' for rows without values)
+    """
+    joined = pd.Series('', index=frame.index, dtype=object)
+    for column in columns:
+        values = frame[column].fillna('')
+        if strip:
+            values = values.str.strip()
+        present = values != ''
+        started = joined != ''
+        joined = joined.mask(present & started, joined + sep + values).mask(present & ~started, values)
+    return joined
+
+
+def melt_symptoms(frame, columns, key='Disease'):
+    """
+    Stack the symptom columns of a chunk into (key, symptom) pairs, row by
+    row in column order. Symptoms are stripped and lowercased; empty ones
+    and rows without a key are dropped.
+
+    Returns:
+        (keys, symptoms) numpy arrays
+    """
+    stacked = frame.set_index(key)[columns].stack()
+    symptoms = stacked.str.strip().str.lower()
+    keep = (symptoms != '').to_numpy() & stacked.index.get_level_values(0).notna()
+    return stacked.index.get_level_values(0)[keep].to_numpy(), symptoms[keep].to_numpy()
+
+
+class DistinctValues:
+    """Distinct values per key in first-seen order, accumulated chunk by chunk"""
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, keys, values):
+        pairs = pd.DataFrame({'key': keys, 'value': values}).dropna(subset=['key']).drop_duplicates()
+        for key, value in zip(pairs['key'].to_numpy(), pairs['value'].to_numpy()):
+            # dicts keep insertion order, so they double as ordered sets
+            self.groups.setdefault(key, {})[value] = None
+
+    def __len__(self):
+        return len(self.groups)
+
+    def items(self):
+        """(key, [values]) pairs, sorted by key"""
+        return [(key, list(self.groups[key])) for key in sorted(self.groups)]
+
+
+class FirstValues:
+    """First non-null value of some columns per key, accumulated chunk by chunk"""
+
+    def __init__(self, columns):
+        self.values = {column: {} for column in columns}
+
+    def add(self, keys, frame):
+        """Take values from the columns of frame that are tracked"""
+        for column, table in self.values.items():
+            if column not in frame:
+                continue
+            present = (keys.notna() & frame[column].notna()).to_numpy()
+            firsts = pd.DataFrame({'key': keys[present], 'value': frame[column][present]}).drop_duplicates('key')
+            for key, value in zip(firsts['key'].to_numpy(), firsts['value'].to_numpy()):
+                table.setdefault(key, value)
+
+    def column(self, column, keys):
+        """Values of one column for keys, None where a key has none"""
+        table = self.values[column]
+        return [table.get(key) for key in keys]
+
+
+def merge_disease_data(symptom_paths, description_paths=(), precaution_paths=(), treatment_paths=(),
+                       chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Merge the CSV sources into one row per disease (data/disease_data.csv).
+
+    Diseases are joined on their lowercased, stripped names. Each symptom
+    row is joined into a ', ' separated string and a disease gets its
+    distinct row strings in order of first appearance. Description, the
+    ', ' joined precautions and the treatment columns come from the first
+    row that has them.
+
+    Args:
+        symptom_paths: Disease/Symptom_* CSVs
+        description_paths: Disease/Description CSVs
+        precaution_paths: Disease/Precaution_* CSVs
+        treatment_paths: Disease/medications/procedures/specialist CSVs
+        chunk_rows: Rows read at a time
+
+    Returns:
+        DataFrame with columns Disease, symptoms, Description, precautions,
+        medications, procedures, specialist, sorted by Disease
+    """
+    symptoms = DistinctValues()
+    for path in symptom_paths:
+        for chunk in read_chunks(path, chunk_rows):
+            symptom_cols = prefixed_columns(chunk, 'Symptom_')
+            chunk = distinct_rows(chunk, ['Disease'] + symptom_cols)
+            rows = join_columns(chunk, symptom_cols, ', ')
+            symptoms.add(normalize_names(chunk['Disease']), rows.str.lower().str.strip())
+
+    details = FirstValues(('Description', 'precautions') + TREATMENT_COLUMNS)
+    for paths, columns in ((description_paths, ('Description',)),
+                           (precaution_paths, ('precautions',)),
+                           (treatment_paths, TREATMENT_COLUMNS)):
+        for path in paths:
+            for chunk in read_chunks(path, chunk_rows):
+                if 'precautions' in columns:
+                    chunk['precautions'] = join_columns(chunk, prefixed_columns(chunk, 'Precaution_'), ', ')
+                details.add(normalize_names(chunk['Disease']), chunk[list(columns)])
+
+    diseases = symptoms.items()
+    names = [name for name, _ in diseases]
+    merged = pd.DataFrame({'Disease': names, 'symptoms': [', '.join(rows) for _, rows in diseases]})
+    for column in details.values:
+        merged[column] = details.column(column, names)
+    return merged
@@ -0,0 +1,175 @@
+"""
+Fuzzy lookup indexes for resolving user symptoms against the vocabulary.
+
+SymptomPredictor resolves a symptom with process.extractOne (WRatio) over a
+list of vocabulary terms. An index decides which terms that list holds:
+
+  - BruteForceIndex: the whole vocabulary, so the best match is exact. Cost
+    is linear in the vocabulary size, which is fine for the 131 symptoms of
+    the bundled dataset
+  - TrigramIndex: a character-trigram inverted index returning the terms
+    sharing the most trigrams with the query, which RapidFuzz then rescores
+    exactly. Cost grows with the posting lists of the query's trigrams
+    instead of the vocabulary, for large merged ontologies
+
+The trigram index is a filter, not a proof: a term sharing few trigrams with
+the query can still have the best WRatio score (e.g. through partial
+matches, or "cmoa" against "coma", which share none), so results can differ
+from the brute-force path. Correctly spelled terms always resolve the same.
+For misspelled ones tests/test_fuzzy_index.py holds the index to at least
+98% of queries resolving to the same (match, score) and 99% to the same
+score; most differences are another term tied at that score.
+benchmarks/fuzzy_index.py measures agreement at larger sizes.
+FUZZY_INDEX=auto (the default) only uses the index from
+FUZZY_INDEX_MIN_VOCAB terms up.
+"""
+import os
+
+import numpy as np
+
+INDEX_KINDS = ('auto', 'brute', 'trigram')
+
+
+class BruteForceIndex:
+    """Every vocabulary term is a candidate"""
+    kind = 'brute'
+
+    def __init__(self, vocab):
+        self.vocab = list(vocab)
+
+    def candidates(self, query):
+        return self.vocab
+
+    def stats(self):
+        return {'kind': self.kind, 'terms': len(self.vocab)}
+
+
+def _normalize(text):
+    return ' '.join(text.lower().replace('_', ' ').split())
+
+
+def _trigrams(text, padded=True):
+    """
+    Distinct character trigrams of a term, with underscores read as spaces.
+    Padded trigrams include the term's edges; unpadded ones are only those
+    inside it, so a substring's unpadded trigrams are a subset of the string's.
+    """
+    text = f' {_normalize(text)} ' if padded else _normalize(text)
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _postings(term_grams, gram_ids):
+    """CSR inverted index: postings[indptr[g]:indptr[g + 1]] are the terms holding gram g"""
+    rows = np.repeat(np.arange(len(term_grams), dtype=np.int32), [len(grams) for grams in term_grams])
+    grams = np.fromiter((gram_ids[gram] for term_set in term_grams for gram in term_set),
+                        dtype=np.int64, count=len(rows))
+    order = np.argsort(grams, kind='stable')
+    return rows[order], np.searchsorted(grams[order], np.arange(len(gram_ids) + 1))
+
+
+class TrigramIndex:
+    """
+    Character-trigram inverted index.
+
+    Candidates for a query are the terms ranking in the top `limit` by
+    shared trigrams or by Dice coefficient (so short and long terms both get
+    through), plus the terms WRatio scores as substring matches: partial
+    scores give the same result to every term contained in the query, and
+    to every term containing it, and extractOne returns the first of them.
+
+    Args:
+        vocab: Vocabulary terms, in priority order (ties keep this order)
+        limit: Terms kept per ranking
+    """
+    kind = 'trigram'
+
+    def __init__(self, vocab, limit=32):
+        self.vocab = list(vocab)
+        self.limit = limit
+
+        padded = [_trigrams(term) for term in self.vocab]
+        inner = [_trigrams(term, padded=False) for term in self.vocab]
+        self.gram_ids = {}
+        for term_set in padded:
+            for gram in term_set:
+                self.gram_ids.setdefault(gram, len(self.gram_ids))
+
+        self.postings, self.indptr = _postings(padded, self.gram_ids)
+        self.inner_postings, self.inner_indptr = _postings(inner, self.gram_ids)
+        self.term_grams = np.array([len(grams) for grams in padded], dtype=np.int32)
+        self.inner_grams = np.array([len(grams) for grams in inner], dtype=np.int32)
+        self.lengths = np.array([len(term) for term in self.vocab], dtype=np.int32)
+        # Terms too short to have inner trigrams are checked as substrings directly
+        self.short_terms = np.flatnonzero(self.inner_grams == 0)
+
+    def _shared(self, grams, postings, indptr):
+        """(terms, shared gram counts) for the grams that are in the index"""
+        ids = [self.gram_ids[gram] for gram in grams if gram in self.gram_ids]
+        if not ids:
+            return ids, np.empty(0, dtype=np.int32), np.empty(0, dtype=np.intp)
+        hits = np.concatenate([postings[indptr[g]:indptr[g + 1]] for g in ids])
+        terms, shared = np.unique(hits, return_counts=True)
+        return ids, terms, shared
+
+    def candidates(self, query):
+        """Candidate terms for query, in vocabulary order"""
+        ids, terms, shared = self._shared(_trigrams(query), self.postings, self.indptr)
+        if len(terms) > self.limit:
+            dice = shared / (len(ids) + self.term_grams[terms])
+            terms = terms[np.union1d(np.argpartition(-shared, self.limit)[:self.limit],
+                                     np.argpartition(-dice, self.limit)[:self.limit])]
+
+            query_inner = _trigrams(query, padded=False)
+            inner_ids, inner_terms, inner_shared = self._shared(query_inner, self.inner_postings, self.inner_indptr)
+            # Terms whose inner trigrams all occur in the query
+            contained = inner_terms[(inner_shared == self.inner_grams[inner_terms])
+                                    & (self.inner_grams[inner_terms] > 0)]
+            short = [i for i in self.short_terms if self.vocab[i] in query]
+            # First term containing the query within WRatio's partial length ratio
+            containing = []
+            if query_inner and len(inner_ids) == len(query_inner):
+                for i in inner_terms[(inner_shared == len(inner_ids))
+                                     & (self.lengths[inner_terms] < 8 * len(query))]:
+                    if query in self.vocab[i]:
+                        containing.append(i)
+                        break
+            extra = np.array(short + containing, dtype=np.intp)
+            terms = np.union1d(terms, np.union1d(contained, extra))
+        return [self.vocab[i] for i in terms]
+
+    def stats(self):
+        return {
+            'kind': self.kind,
+            'terms': len(self.vocab),
+            'trigrams': len(self.gram_ids),
+            'limit': self.limit
+        }
+
+
+def build_index(vocab, kind=None, min_vocab=None, limit=None):
+    """
+    Build the fuzzy lookup index for a vocabulary.
+
+    Args:
+        vocab: Vocabulary terms
+        kind: 'brute', 'trigram' or 'auto' (default: FUZZY_INDEX or 'auto')
+        min_vocab: Vocabulary size from which 'auto' picks the trigram index
+            (default: FUZZY_INDEX_MIN_VOCAB or 5000)
+        limit: Candidates per ranking for the trigram index
+            (default: FUZZY_CANDIDATES or 32)
+
+    Returns:
+        BruteForceIndex or TrigramIndex
+    """
+    if kind is None:
+        kind = os.environ.get('FUZZY_INDEX', 'auto').lower()
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown fuzzy index '{kind}', expected one of {', '.join(INDEX_KINDS)}")
+    if min_vocab is None:
+        min_vocab = int(os.environ.get('FUZZY_INDEX_MIN_VOCAB', 5000))
+    if limit is None:
+        limit = int(os.environ.get('FUZZY_CANDIDATES', 32))
+
+    if kind == 'trigram' or (kind == 'auto' and len(vocab) >= min_vocab):
+        return TrigramIndex(vocab, limit)
+    return BruteForceIndex(vocab)
@@ -0,0 +1,114 @@
+"""
+Greeting detector for GreetingsResponder.
+
+GreetingsResponder used to run process.extractOne (WRatio) over every
+greeting for the whole input and again for up to three word prefixes, so
+every diagnostic request paid four full greeting scans. GreetingDetector
+returns the same greeting at the same thresholds with much less work:
+
+  1. exact lookup: a normalized text that is itself a greeting scores 100,
+     which only an identical string can, so the hash hit is the answer
+  2. length filter: when one string is at least 8x longer than the other,
+     WRatio is capped at 60 (ratio <= 200 / 9, partial scores are scaled by
+     0.6), so those greetings can never pass a threshold of 60 or more
+  3. score cutoff: the remaining candidates are scored by extractOne with
+     score_cutoff, which lets RapidFuzz abandon a pair as soon as it can't
+     reach the threshold. Candidates keep their original order, so the best
+     match and tie-breaking are unchanged
+  4. prefix cache: the verdict for the first 1-3 words is cached, since
+     requests keep starting with the same few words
+
+A Levenshtein automaton over the greetings was considered, but WRatio also
+scores sorted/deduplicated tokens and partial windows, so an edit-distance
+filter would change which inputs count as greetings.
+"""
+import bisect
+import os
+
+from rapidfuzz import fuzz, process
+
+from app.cache import LRUCache
+
+# WRatio never exceeds this when one string is >= MAX_LENGTH_RATIO x longer
+MAX_LENGTH_RATIO = 8
+LONG_PAIR_MAX_SCORE = 60
+
+
+class GreetingDetector:
+    """
+    Find the greeting process.extractOne(text, greetings) would return,
+    if it scores above a threshold.
+
+    Args:
+        greetings: Normalized (lowercase) greeting strings, in priority order
+        cache_size: Prefix verdicts to keep (GREETING_CACHE_SIZE, 0 disables)
+    """
+    def __init__(self, greetings, cache_size=None):
+        self.greetings = list(greetings)
+        self.exact = {}
+        for i, greeting in enumerate(self.greetings):
+            self.exact.setdefault(greeting, i)
+
+        # Greetings sorted by length, to slice out those within the length ratio
+        order = sorted(range(len(self.greetings)), key=lambda i: len(self.greetings[i]))
+        self._by_length = order
+        self._lengths = [len(self.greetings[i]) for i in order]
+
+        if cache_size is None:
+            cache_size = int(os.environ.get('GREETING_CACHE_SIZE', 4096))
+        self.prefix_cache = LRUCache(cache_size)
+
+    def candidates(self, text, threshold):
+        """Greetings that can score above threshold against text, in original order"""
+        if threshold < LONG_PAIR_MAX_SCORE:
+            return self.greetings
+        length = len(text)
+        lo = bisect.bisect_right(self._lengths, length // MAX_LENGTH_RATIO)
+        hi = bisect.bisect_left(self._lengths, length * MAX_LENGTH_RATIO)
+        if lo == 0 and hi == len(self._lengths):
+            return self.greetings
+        return [self.greetings[i] for i in sorted(self._by_length[lo:hi])]
+
+    def best_match(self, text, threshold):
+        """
+        Same (match, score) as process.extractOne(text, greetings) when its
+        score is above threshold, otherwise None.
+        """
+        if not text:
+            return None
+        if text in self.exact:
+            return text, 100.0
+        candidates = self.candidates(text, threshold)
+        if not candidates:
+            return None
+        result = process.extractOne(text, candidates, scorer=fuzz.WRatio, score_cutoff=threshold)
+        # score_cutoff keeps scores equal to the threshold; callers want strictly above
+        if result and result[1] > threshold:
+            return result[0], result[1]
+        return None
+
+    def detect(self, text, threshold, prefix_threshold, max_prefix_words=3):
+        """
+        Check the whole text, then its first max_prefix_words..1 words, like
+        GreetingsResponder always has.
+
+        Returns:
+            (match, score, prefix) where prefix is None for a whole-text
+            match, or None if nothing matched
+        """
+        if not text or not self.greetings:
+            return None
+
+        result = self.best_match(text, threshold)
+        if result:
+            return result + (None,)
+
+        words = text.split()
+        for word_count in range(min(max_prefix_words, len(words)), 0, -1):
+            prefix = ' '.join(words[:word_count])
+            result = self.prefix_cache.get_or_compute(
+                (prefix, prefix_threshold), lambda: self.best_match(prefix, prefix_threshold)
+            )
+            if result:
+                return result + (prefix,)
+        return None
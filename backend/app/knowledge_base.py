@@ -0,0 +1,456 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import numpy as np
+
+from app.metadata import DiseaseMetadata
+from app.neighbours import DISEASE_MATCH_THRESHOLD, NeighbourTable, vocab_digest
+
+# Bump whenever the compiled layout or the way it is derived from the CSVs changes
+FORMAT_VERSION = 3
+
+BUNDLE_MAGIC = b'SYMPTKB\x00'
+BUNDLE_ALIGNMENT = 64
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(__file__), '../data')
+
+
+class BundleError(ValueError):
+    """Raised when a compiled bundle is missing, stale or corrupt"""
+
+
+class KnowledgeBase:
+    """
+    Compiled disease data used for scoring.
+    
+    Holds the symptom vocabulary and ID index, severity weights, disease
+    names, the disease x symptom matrices, the per-disease metadata
+    (descriptions, precautions, treatments) as an offset-indexed store that
+    is only decoded for the records a prediction returns (app/metadata.py)
+    and the vocabulary's fuzzy neighbour table (app/neighbours.py).
+    Built from the CSV sources (build_from_csv) or loaded from a compiled
+    bundle (load_bundle), and treated as read-only afterwards.
+    """
+
+    ARRAYS = ('incidence', 'match_scores', 'weight_vector', 'metadata_offsets', 'metadata_blob',
+              'neighbour_indptr', 'neighbour_ids', 'neighbour_scores')
+
+    def __init__(self, symptom_vocab, symptom_weights, disease_metadata,
+                 incidence, match_scores, weight_vector, source_digest=None, origin='csv',
+                 disease_names=None, neighbours=None):
+        if not isinstance(disease_metadata, DiseaseMetadata):
+            disease_metadata = DiseaseMetadata.from_records(disease_metadata)
+        self.symptom_vocab = symptom_vocab
+        self.symptom_ids = {sym: i for i, sym in enumerate(symptom_vocab)}
+        self.symptom_weights = symptom_weights
+        self.disease_metadata = disease_metadata
+        if disease_names is None:
+            disease_names = [record['disease'] for record in disease_metadata]
+        self.disease_names = disease_names
+        self.incidence = incidence
+        self.match_scores = match_scores
+        self.weight_vector = weight_vector
+        self.disease_symptom_counts = incidence.sum(axis=1)
+        self.scorable = self.disease_symptom_counts > 0
+        
+        # Inverted index (CSR layout): the diseases in which symptom i earns
+        # credit are postings[postings_indptr[i]:postings_indptr[i + 1]]
+        symptom_idx, disease_idx = np.nonzero(match_scores.T > 0)
+        self.postings = disease_idx.astype(np.intp)
+        self.postings_indptr = np.searchsorted(symptom_idx, np.arange(len(symptom_vocab) + 1))
+        self.source_digest = source_digest
+        self.origin = origin
+        self._neighbours = neighbours
+
+    def meta(self):
+        """JSON-serializable (non-array) part of the knowledge base"""
+        return {
+            'symptom_vocab': self.symptom_vocab,
+            'symptom_weights': self.symptom_weights,
+            'disease_names': self.disease_names,
+            'vocab_digest': self.neighbours.digest
+        }
+    
+    @property
+    def neighbours(self):
+        """NeighbourTable of the vocabulary (built on first use if none was given)"""
+        if self._neighbours is None:
+            self._neighbours = NeighbourTable.build(self.symptom_vocab)
+        return self._neighbours
+    
+    @property
+    def neighbour_indptr(self):
+        return self.neighbours.indptr
+    
+    @property
+    def neighbour_ids(self):
+        return self.neighbours.ids
+    
+    @property
+    def neighbour_scores(self):
+        return self.neighbours.scores
+
+    @property
+    def metadata_offsets(self):
+        return self.disease_metadata.offsets
+
+    @property
+    def metadata_blob(self):
+        return self.disease_metadata.blob
+
+
+def source_files(data_dir=DEFAULT_DATA_DIR):
+    """Resolve the CSV source used for each role (some files have fallbacks)"""
+    def first_existing(*names):
+        paths = [os.path.join(data_dir, name) for name in names]
+        return next((path for path in paths if os.path.exists(path)), paths[0])
+    
+    return {
+        'symptoms': first_existing('dataset.csv', 'DiseaseAndSymptoms.csv'),
+        'descriptions': first_existing('symptom_Description.csv'),
+        'precautions': first_existing('symptom_precaution.csv', 'Disease precaution.csv'),
+        'treatments': first_existing('disease_treatments.csv'),
+        'severity': first_existing('Symptom-severity.csv')
+    }
+
+
+def source_digest(data_dir=DEFAULT_DATA_DIR):
+    """SHA-256 over the format version and the content of every CSV source"""
+    digest = hashlib.sha256(f'format:{FORMAT_VERSION}'.encode())
+    for role, path in sorted(source_files(data_dir).items()):
+        digest.update(f'\n{role}:{os.path.basename(path)}:'.encode())
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        else:
+            digest.update(b'<missing>')
+    return digest.hexdigest()
+
+
+def build_from_csv(data_dir=DEFAULT_DATA_DIR, digest=None, neighbours=None):
+    """
+    Load and merge the CSV sources and compile the scoring matrices.
+    
+    A NeighbourTable passed as neighbours is reused if it was built for the
+    resulting vocabulary.
+    """
+    import pandas as pd
+    from app.etl import DistinctValues, distinct_rows, join_columns, melt_symptoms, prefixed_columns, read_chunks
+    
+    # Load all CSV files
+    print("📂 Loading disease data from multiple sources...")
+    
+    sources = source_files(data_dir)
+    
+    # 1. Load symptom-disease mappings (dataset.csv or DiseaseAndSymptoms.csv)
+    # Read in chunks: each disease keeps its distinct symptoms in order of
+    # first appearance (app/etl.py)
+    symptoms_file = sources['symptoms']
+    symptom_groups = DistinctValues()
+    records_read = 0
+    for chunk in read_chunks(symptoms_file):
+        records_read += len(chunk)
+        symptom_cols = prefixed_columns(chunk, 'Symptom_')
+        chunk = distinct_rows(chunk, ['Disease'] + symptom_cols)
+        symptom_groups.add(*melt_symptoms(chunk, symptom_cols))
+    print(f"✅ Loaded symptoms data: {records_read} records")
+    
+    # 2. Load descriptions
+    descriptions_file = sources['descriptions']
+    df_descriptions = pd.read_csv(descriptions_file) if os.path.exists(descriptions_file) else pd.DataFrame()
+    print(f"✅ Loaded descriptions: {len(df_descriptions)} diseases")
+    
+    # 3. Load precautions
+    precautions_file = sources['precautions']
+    df_precautions = pd.read_csv(precautions_file) if os.path.exists(precautions_file) else pd.DataFrame()
+    print(f"✅ Loaded precautions: {len(df_precautions)} diseases")
+    
+    # 4. Load treatments (medications, procedures, specialists)
+    treatments_file = sources['treatments']
+    df_treatments = pd.read_csv(treatments_file) if os.path.exists(treatments_file) else pd.DataFrame()
+    print(f"✅ Loaded treatments: {len(df_treatments)} diseases")
+    
+    # 5. Load symptom severity weights
+    severity_file = sources['severity']
+    symptom_weights = {}
+    if os.path.exists(severity_file):
+        df_severity = pd.read_csv(severity_file)
+        symptom_weights = dict(zip(
+            df_severity['Symptom'].str.lower().str.strip(),
+            df_severity['weight']
+        ))
+        print(f"✅ Loaded symptom weights: {len(symptom_weights)} symptoms")
+    
+    # One row per disease (sorted by name) with its list of symptoms
+    disease_symptoms = symptom_groups.items()
+    
+    # Merge all data
+    df = pd.DataFrame({
+        'Disease': [disease for disease, _ in disease_symptoms],
+        'symptoms': [symptoms for _, symptoms in disease_symptoms]
+    })
+    df['disease'] = df['Disease']
+    
+    # Create normalized disease name for merging
+    df['disease_lower'] = df['Disease'].str.lower().str.strip()
+    
+    # Merge descriptions
+    if not df_descriptions.empty:
+        df_descriptions['disease_lower'] = df_descriptions['Disease'].str.lower().str.strip()
+        df = df.merge(
+            df_descriptions[['disease_lower', 'Description']].rename(columns={'Description': 'description'}),
+            on='disease_lower',
+            how='left'
+        )
+    else:
+        df['description'] = 'No description available'
+    
+    # Merge precautions
+    if not df_precautions.empty:
+        precaution_cols = prefixed_columns(df_precautions, 'Precaution_')
+        df_precautions['precautions'] = join_columns(df_precautions, precaution_cols, '|', strip=True)
+        df_precautions['disease_lower'] = df_precautions['Disease'].str.lower().str.strip()
+        df = df.merge(
+            df_precautions[['disease_lower', 'precautions']],
+            on='disease_lower',
+            how='left'
+        )
+    else:
+        df['precautions'] = ''
+    
+    # Merge treatments
+    if not df_treatments.empty:
+        df_treatments['disease_lower'] = df_treatments['Disease'].str.lower().str.strip()
+        df = df.merge(
+            df_treatments[['disease_lower', 'medications', 'procedures', 'specialist']],
+            on='disease_lower',
+            how='left'
+        )
+    else:
+        df['medications'] = ''
+        df['procedures'] = ''
+        df['specialist'] = ''
+    
+    # Drop the temporary column
+    df = df.drop('disease_lower', axis=1)
+    
+    # Fill NaN values
+    df = df.fillna('')
+    
+    # Build symptom vocabulary
+    symptom_vocab = sorted({sym for symptoms in df['symptoms'] for sym in symptoms})
+    
+    print(f"✅ Successfully merged data for {len(df)} unique diseases")
+    print(f"✅ Built vocabulary with {len(symptom_vocab)} unique symptoms")
+    
+    # Precompile the scoring structures
+    reused = neighbours is not None and neighbours.digest == vocab_digest(symptom_vocab)
+    neighbours = NeighbourTable.for_vocab(symptom_vocab, neighbours)
+    print(f"✅ {'Reused' if reused else 'Built'} symptom neighbour table: {neighbours.nnz} pairs above "
+          f"{DISEASE_MATCH_THRESHOLD}")
+    incidence, match_scores = build_matrices(symptom_vocab, df['symptoms'], neighbours)
+    weight_vector = np.array(
+        [symptom_weights.get(sym, 1) for sym in symptom_vocab],
+        dtype=np.float64
+    )
+    print(f"✅ Built {match_scores.shape[0]}x{match_scores.shape[1]} disease-symptom matrix")
+    
+    records = df[['disease', 'description', 'precautions', 'medications', 'procedures', 'specialist']].to_dict('records')
+    return KnowledgeBase(
+        symptom_vocab,
+        {sym: _to_python(weight) for sym, weight in symptom_weights.items()},
+        records,
+        incidence,
+        match_scores,
+        weight_vector,
+        source_digest=digest or source_digest(data_dir),
+        origin='csv',
+        neighbours=neighbours
+    )
+
+
+def build_matrices(symptom_vocab, disease_symptoms, neighbours=None):
+    """
+    Build the disease x symptom incidence and partial-credit matrices.
+    
+    Every disease symptom is part of the vocabulary, so the partial credit a
+    canonical symptom earns against a disease (its best fuzzy match above the
+    threshold among that disease's symptoms) only depends on the data and can
+    be computed once here instead of on every request. It is read from the
+    vocabulary's neighbour table (built here if not given) instead of fuzzy
+    matching the vocabulary against every disease.
+    """
+    neighbours = neighbours or NeighbourTable.build(symptom_vocab)
+    symptom_ids = {sym: i for i, sym in enumerate(symptom_vocab)}
+    n_diseases, n_symptoms = len(disease_symptoms), len(symptom_vocab)
+    incidence = np.zeros((n_diseases, n_symptoms), dtype=bool)
+    match_scores = np.zeros((n_diseases, n_symptoms), dtype=np.float64)
+    
+    for d, symptoms in enumerate(disease_symptoms):
+        if not symptoms:
+            continue
+        ids = [symptom_ids[sym] for sym in symptoms]
+        incidence[d, ids] = True
+        match_scores[d] = neighbours.row_scores(ids, n_symptoms)
+    
+    return incidence, match_scores
+
+
+def default_bundle_path(data_dir=DEFAULT_DATA_DIR):
+    """Location of the compiled bundle for a data directory"""
+    return os.path.join(data_dir, 'compiled', 'knowledge_base.bin')
+
+
+def save_bundle(kb, path):
+    """
+    Write a knowledge base as a versioned, checksummed binary bundle.
+    
+    Layout: magic, header length (uint64), JSON header, then each array's raw
+    bytes aligned to BUNDLE_ALIGNMENT. The header records the format version,
+    the digest of the CSV sources it was compiled from, array dtypes/shapes/
+    offsets, the non-array data and a SHA-256 checksum over all of it.
+    """
+    meta_bytes = json.dumps(kb.meta(), sort_keys=True).encode('utf-8')
+    arrays, blobs, offset = {}, [], 0
+    for name in KnowledgeBase.ARRAYS:
+        array = np.ascontiguousarray(getattr(kb, name))
+        offset = _align(offset)
+        arrays[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+            'nbytes': array.nbytes
+        }
+        blobs.append((offset, array.tobytes()))
+        offset += array.nbytes
+    
+    payload = bytearray(offset)
+    for start, blob in blobs:
+        payload[start:start + len(blob)] = blob
+    
+    header = json.dumps({
+        'format_version': FORMAT_VERSION,
+        'source_digest': kb.source_digest,
+        'checksum': hashlib.sha256(meta_bytes + bytes(payload)).hexdigest(),
+        'arrays': arrays,
+        'meta': json.loads(meta_bytes)
+    }).encode('utf-8')
+    
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        preamble = BUNDLE_MAGIC + struct.pack('<Q', len(header)) + header
+        f.write(preamble)
+        f.write(b'\x00' * (_align(len(preamble)) - len(preamble)))
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def load_bundle(path, expected_digest=None, use_mmap=False):
+    """
+    Load a compiled bundle.
+    
+    With use_mmap the arrays are read-only views over a shared memory mapping
+    of the file instead of private copies, so every process that loads the
+    same bundle (e.g. gunicorn workers) shares one set of physical pages.
+    
+    Raises BundleError if the file is not a bundle, was written by another
+    format version, is stale (source digest mismatch) or fails its checksum.
+    """
+    with open(path, 'rb') as f:
+        if use_mmap:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = f.read()
+    
+    if data[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+        raise BundleError('not a knowledge base bundle')
+    start = len(BUNDLE_MAGIC) + 8
+    (header_len,) = struct.unpack('<Q', data[len(BUNDLE_MAGIC):start])
+    header = json.loads(data[start:start + header_len])
+    
+    if header.get('format_version') != FORMAT_VERSION:
+        raise BundleError(f"format version {header.get('format_version')} != {FORMAT_VERSION}")
+    if expected_digest is not None and header.get('source_digest') != expected_digest:
+        raise BundleError('bundle is stale (CSV sources changed)')
+    
+    payload = memoryview(data)[_align(start + header_len):]
+    meta = header['meta']
+    meta_bytes = json.dumps(meta, sort_keys=True).encode('utf-8')
+    checksum = hashlib.sha256(meta_bytes)
+    checksum.update(payload)
+    if checksum.hexdigest() != header.get('checksum'):
+        raise BundleError('checksum mismatch')
+    
+    arrays = {
+        name: np.frombuffer(payload, dtype=np.dtype(spec['dtype']),
+                            count=int(np.prod(spec['shape'])), offset=spec['offset']).reshape(spec['shape'])
+        for name, spec in header['arrays'].items()
+    }
+    return KnowledgeBase(
+        meta['symptom_vocab'],
+        meta['symptom_weights'],
+        DiseaseMetadata(arrays['metadata_offsets'], arrays['metadata_blob']),
+        arrays['incidence'],
+        arrays['match_scores'],
+        arrays['weight_vector'],
+        source_digest=header['source_digest'],
+        origin='mmap' if use_mmap else 'bundle',
+        disease_names=meta['disease_names'],
+        neighbours=NeighbourTable(arrays['neighbour_indptr'], arrays['neighbour_ids'],
+                                  arrays['neighbour_scores'], meta['vocab_digest'])
+    )
+
+
+def previous_neighbours(path):
+    """
+    The neighbour table of an existing bundle, stale or not, or None if the
+    bundle can't be read (missing, other format version, corrupt).
+    """
+    try:
+        return load_bundle(path).neighbours
+    except (BundleError, OSError, ValueError, KeyError):
+        return None
+
+
+def compile_bundle(data_dir=DEFAULT_DATA_DIR, path=None):
+    """
+    Build the knowledge base from the CSV sources and write it as a bundle,
+    reusing the previous bundle's neighbour table if the vocabulary is unchanged.
+    """
+    path = path or default_bundle_path(data_dir)
+    kb = build_from_csv(data_dir, neighbours=previous_neighbours(path))
+    save_bundle(kb, path)
+    return path
+
+
+def load_knowledge_base(data_dir=DEFAULT_DATA_DIR, bundle_path=None, use_mmap=False, neighbours=None):
+    """
+    Load the knowledge base from the compiled bundle when it is fresh,
+    falling back to the CSV sources otherwise. The CSV build reuses the
+    neighbour table given (e.g. the running knowledge base's) or the stale
+    bundle's when the vocabulary is unchanged.
+    """
+    digest = source_digest(data_dir)
+    if bundle_path and os.path.exists(bundle_path):
+        try:
+            kb = load_bundle(bundle_path, expected_digest=digest, use_mmap=use_mmap)
+            print(f"✅ Loaded compiled knowledge base: {len(kb.disease_names)} diseases, "
+                  f"{len(kb.symptom_vocab)} symptoms ({bundle_path})")
+            return kb
+        except (BundleError, OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Compiled knowledge base not used ({e}), loading CSV sources")
+            if neighbours is None:
+                neighbours = previous_neighbours(bundle_path)
+    return build_from_csv(data_dir, digest, neighbours)
+
+
+def _align(offset):
+    return -(-offset // BUNDLE_ALIGNMENT) * BUNDLE_ALIGNMENT
+
+
+def _to_python(value):
+    # numpy scalars (from pandas) are not JSON serializable
+    return value.item() if hasattr(value, 'item') else value
@@ -0,0 +1,55 @@
+"""
+Offset-indexed disease metadata.
+
+Scoring only needs disease names and the numeric matrices; the long text
+fields (description, precautions, medications, procedures, specialist) are
+read for the winning disease alone. DiseaseMetadata keeps every record as a
+UTF-8 JSON document in one byte buffer plus an offsets array, and decodes a
+record only when it is asked for:
+
+  - no per-disease Python dicts and strings stay alive, only two arrays
+  - in a compiled bundle both arrays are stored like the scoring matrices,
+    so with KB_MMAP=true they are views over the shared memory mapping and
+    a worker only pages in the records it actually returns
+"""
+import json
+
+import numpy as np
+
+
+class DiseaseMetadata:
+    """
+    Read-only sequence of disease records, decoded on access.
+
+    Args:
+        offsets: uint64 array of len(records) + 1; record i is
+            blob[offsets[i]:offsets[i + 1]]
+        blob: uint8 array holding the concatenated JSON records
+    """
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_records(cls, records):
+        """Pack a list of record dicts"""
+        chunks = [json.dumps(record, ensure_ascii=False).encode('utf-8') for record in records]
+        offsets = np.zeros(len(chunks) + 1, dtype=np.uint64)
+        np.cumsum([len(chunk) for chunk in chunks], out=offsets[1:])
+        blob = np.frombuffer(b''.join(chunks), dtype=np.uint8)
+        return cls(offsets, blob)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(self.blob[start:end].tobytes())
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.blob.nbytes
@@ -0,0 +1,230 @@
+"""
+In-process metrics with Prometheus text exposition output.
+
+A minimal, dependency-free registry: counters and histograms are updated
+under a lock on the hot path, while gauges for caches and queues are read
+from collector callbacks only when /api/metrics is scraped.
+
+Per-request stage timings are also kept in a context variable, so a request
+handler can turn them into a Server-Timing header:
+
+    metrics.start_request()
+    with metrics.stage('scoring'):
+        ...
+    header = metrics.server_timing()
+"""
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds (50 microseconds to 5 seconds)
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Stage timings of the current request: list of (stage, seconds) or None
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values (seconds for timings)"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        samples = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append((f'{self.name}_bucket',
+                                _format_labels(self.labelnames, labels, [('le', _format_value(float(bound)))]),
+                                cumulative))
+            label_text = _format_labels(self.labelnames, labels)
+            samples.append((f'{self.name}_sum', label_text, total))
+            samples.append((f'{self.name}_count', label_text, count))
+        return samples
+
+
+class Registry:
+    """Holds metrics and gauge collectors and renders the exposition text"""
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """
+        Add a callback run at scrape time. It returns a list of
+        (name, type, help, [(labels_dict, value), ...]) families.
+        """
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        for collect in list(self._collectors):
+            for name, kind, documentation, samples in collect():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    label_text = _format_labels(tuple(labels), tuple(labels.values()))
+                    lines.append(f'{name}{label_text} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'symptomai_stage_duration_seconds',
+    'Time spent in each /api/analyze processing stage.',
+    ('stage',)
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    'symptomai_request_duration_seconds',
+    'Time spent handling API requests.',
+    ('endpoint',)
+)
+REQUESTS = REGISTRY.counter(
+    'symptomai_requests_total',
+    'API requests by endpoint and HTTP status.',
+    ('endpoint', 'status')
+)
+ANALYSIS_ERRORS = REGISTRY.counter(
+    'symptomai_analysis_errors_total',
+    'Analyses that did not produce a prediction, by error type.',
+    ('error_type',)
+)
+SYMPTOM_LOOKUPS = REGISTRY.counter(
+    'symptomai_symptom_lookups_total',
+    'Symptom resolutions by method: alias table, exact vocabulary term or fuzzy matching.',
+    ('method',)
+)
+
+
+def start_request():
+    """Begin collecting stage timings for the current request (thread or task)"""
+    _request_timings.set([])
+
+
+@contextmanager
+def stage(name):
+    """Time a block into the stage histogram and the current request's timings"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def server_timing():
+    """Server-Timing header value for the current request's stages (durations in ms)"""
+    timings = _request_timings.get() or []
+    return ', '.join(f'{name};dur={elapsed * 1000:.3f}' for name, elapsed in timings)
+
+
+def cache_collector(caches):
+    """
+    Build a collector exposing LRUCache.stats() of named caches.
+    caches is a callable returning {name: LRUCache or None}.
+    """
+    fields = (
+        ('symptomai_cache_entries', 'gauge', 'Entries currently stored in the cache.', 'size'),
+        ('symptomai_cache_capacity', 'gauge', 'Maximum number of cache entries.', 'max_size'),
+        ('symptomai_cache_hits_total', 'counter', 'Cache lookups served from the cache.', 'hits'),
+        ('symptomai_cache_misses_total', 'counter', 'Cache lookups that had to compute the value.', 'misses'),
+        ('symptomai_cache_evictions_total', 'counter', 'Entries evicted to stay within capacity.', 'evictions'),
+    )
+
+    def collect():
+        stats = {name: cache.stats() for name, cache in caches().items() if cache is not None}
+        return [
+            (metric, kind, documentation, [({'cache': name}, s[key]) for name, s in stats.items()])
+            for metric, kind, documentation, key in fields
+        ]
+    return collect
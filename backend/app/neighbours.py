@@ -0,0 +1,107 @@
+"""
+Fuzzy neighbour table of the symptom vocabulary.
+
+A disease's partial-credit row (KnowledgeBase.match_scores) gives every
+vocabulary symptom its best WRatio score above DISEASE_MATCH_THRESHOLD
+against the disease's symptoms. Those are always vocabulary terms too, so
+build_matrices used to run the same vocabulary x vocabulary comparisons once
+per disease. NeighbourTable runs them once per vocabulary and keeps only the
+pairs above the threshold, as a sparse table in CSR layout by the disease
+symptom:
+
+    ids[indptr[s]:indptr[s + 1]]      vocabulary symptoms that earn credit
+                                      when a disease lists symptom s
+    scores[indptr[s]:indptr[s + 1]]   their WRatio scores (query = the
+                                      vocabulary symptom, as before)
+
+A disease's row is then the element-wise max of its symptoms' entries,
+with exactly the scores the per-disease cdist produced. The table only
+depends on the vocabulary (and scorer threshold), identified by
+vocab_digest; it is stored in the compiled bundle and reused whenever the
+vocabulary is unchanged, e.g. when only descriptions, treatments or the
+disease -> symptom lists change.
+"""
+import hashlib
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Minimum fuzzy score for a symptom to earn partial credit against a disease symptom
+DISEASE_MATCH_THRESHOLD = 70
+
+# Vocabulary symptoms compared per cdist call, bounding the dense block in memory
+BUILD_CHUNK = 1024
+
+
+def vocab_digest(symptom_vocab):
+    """SHA-256 identifying a vocabulary and the scoring it was compared with"""
+    digest = hashlib.sha256(f'WRatio>{DISEASE_MATCH_THRESHOLD}\n'.encode())
+    for symptom in symptom_vocab:
+        digest.update(symptom.encode('utf-8') + b'\n')
+    return digest.hexdigest()
+
+
+class NeighbourTable:
+    """
+    Symptom -> (neighbour ids, scores) pairs above DISEASE_MATCH_THRESHOLD.
+
+    Args:
+        indptr: int64 array, len(vocab) + 1 offsets into ids and scores
+        ids: int32 array of vocabulary ids
+        scores: float64 array of WRatio scores
+        digest: vocab_digest of the vocabulary the table was built for
+    """
+
+    def __init__(self, indptr, ids, scores, digest):
+        self.indptr = indptr
+        self.ids = ids
+        self.scores = scores
+        self.digest = digest
+
+    @classmethod
+    def build(cls, symptom_vocab):
+        """Compare every pair of vocabulary symptoms"""
+        n = len(symptom_vocab)
+        choices, queries, values = [], [], []
+        for start in range(0, n, BUILD_CHUNK):
+            block = process.cdist(symptom_vocab[start:start + BUILD_CHUNK], symptom_vocab,
+                                  scorer=fuzz.WRatio, dtype=np.float64, score_cutoff=DISEASE_MATCH_THRESHOLD)
+            query, choice = np.nonzero(block > DISEASE_MATCH_THRESHOLD)
+            queries.append(query + start)
+            choices.append(choice)
+            values.append(block[query, choice])
+        query = np.concatenate(queries) if queries else np.empty(0, dtype=np.intp)
+        choice = np.concatenate(choices) if choices else np.empty(0, dtype=np.intp)
+        order = np.lexsort((query, choice))
+        return cls(
+            np.searchsorted(choice[order], np.arange(n + 1)).astype(np.int64),
+            query[order].astype(np.int32),
+            (np.concatenate(values) if values else np.empty(0))[order],
+            vocab_digest(symptom_vocab)
+        )
+
+    @classmethod
+    def for_vocab(cls, symptom_vocab, previous=None):
+        """previous if it was built for this vocabulary, a new table otherwise"""
+        if previous is not None and previous.digest == vocab_digest(symptom_vocab):
+            return previous
+        return cls.build(symptom_vocab)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def nnz(self):
+        return len(self.ids)
+
+    def row_scores(self, symptom_ids, size):
+        """
+        Partial-credit row of a disease with these symptoms: every vocabulary
+        symptom's best score against them (0 below the threshold).
+        """
+        row = np.zeros(size, dtype=np.float64)
+        for s in symptom_ids:
+            # A symptom lists each neighbour once, so fancy assignment is safe
+            ids = self.ids[self.indptr[s]:self.indptr[s + 1]]
+            row[ids] = np.maximum(row[ids], self.scores[self.indptr[s]:self.indptr[s + 1]])
+        return row
@@ -0,0 +1,155 @@
+"""
+Symptom phrase extraction for free text.
+
+/api/analyze used to split input on commas, or on every space when there
+were none, so "sore throat and high fever" became five tokens that were each
+fuzzy matched. PhraseExtractor instead finds the longest known phrases in one
+left-to-right pass over the words:
+
+  - known phrases are the vocabulary symptoms (with underscores, spaces and
+    punctuation all reading as word breaks) and the alias table
+  - they are compiled into a word trie, so each position only walks as far
+    as some phrase continues
+  - words between phrases form leftover spans, split at connectors ("and",
+    "with") and trimmed of filler words ("i have a"); only those spans are
+    left for fuzzy matching
+
+Commas, semicolons, sentence punctuation and line breaks always end a span.
+Input with commas is a list the user already split, so its segments are kept
+whole (and fuzzy matched as before) unless they consist only of known
+phrases joined by connector or filler words: "feeling weird" stays one
+unknown symptom rather than losing "feeling" and fuzzy matching "weird".
+"""
+import re
+
+# Words or numbers; apostrophes inside a word are dropped ("can't" -> "cant")
+WORD_PATTERN = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+SEGMENT_PATTERN = re.compile(r"[,;.!?\n]+")
+
+# Leftover spans are split at these words
+CONNECTORS = frozenset(('and', 'or', 'with', 'plus', 'also', 'but', 'then', 'as', 'well', 'n'))
+# ... and these are trimmed from their edges
+FILLERS = frozenset((
+    'i', 'im', 'ive', 'me', 'my', 'we', 'you', 'it', 'its', 'this', 'that', 'there',
+    'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'have', 'has', 'had', 'having', 'got', 'get', 'getting', 'gotten',
+    'feel', 'feels', 'feeling', 'felt', 'experiencing', 'suffering', 'from', 'noticed', 'think',
+    'a', 'an', 'the', 'some', 'any', 'of', 'in', 'on', 'at', 'to', 'for', 'since', 'like',
+    'very', 'really', 'quite', 'so', 'too', 'just', 'bit', 'little', 'lot', 'lots', 'kind', 'sort',
+    'today', 'yesterday', 'now', 'still', 'lately', 'recently', 'day', 'days', 'week', 'weeks',
+    'hello', 'hi', 'hey', 'doctor', 'doc', 'please', 'help', 'thanks', 'thank'
+))
+
+
+def tokenize(text):
+    """[(word, start, end), ...] for the lowercase words of text"""
+    return [(match.group().replace("'", '').replace('’', ''), match.start(), match.end())
+            for match in WORD_PATTERN.finditer(text.lower())]
+
+
+def phrase_key(text):
+    """Lookup key of a phrase: its words joined by single spaces"""
+    return ' '.join(word for word, _, _ in tokenize(text))
+
+
+class PhraseExtractor:
+    """
+    Longest-match phrase extractor over the symptom vocabulary and aliases.
+
+    Args:
+        vocab: Vocabulary symptoms
+        aliases: Dict of alias -> vocabulary symptom (see app/aliases.py)
+    """
+    def __init__(self, vocab, aliases=None):
+        # phrase key -> (symptom, 'exact' or 'alias'); vocabulary spellings win
+        self.phrases = {}
+        for symptom in vocab:
+            self.phrases.setdefault(phrase_key(symptom), (symptom, 'exact'))
+        for alias, symptom in (aliases or {}).items():
+            self.phrases.setdefault(phrase_key(alias), (symptom, 'alias'))
+        self.phrases.pop('', None)
+
+        # Word trie; a node's None entry holds the phrase ending there
+        self.trie = {}
+        for key in self.phrases:
+            node = self.trie
+            for word in key.split(' '):
+                node = node.setdefault(word, {})
+            node[None] = key
+
+    def lookup(self, text):
+        """(symptom, method) for text that is a known phrase, or None"""
+        return self.phrases.get(phrase_key(text))
+
+    def _longest_match(self, words, start):
+        """End index (exclusive) of the longest phrase starting at words[start], or None"""
+        node, end = self.trie, None
+        for i in range(start, len(words)):
+            node = node.get(words[i][0])
+            if node is None:
+                break
+            if None in node:
+                end = i + 1
+        return end
+
+    def _leftover_spans(self, segment, words):
+        """Slices of segment for unmatched words, split at connectors, fillers trimmed"""
+        spans, current = [], []
+        for word in words + [(None, 0, 0)]:
+            if word[0] is not None and word[0] not in CONNECTORS:
+                current.append(word)
+                continue
+            while current and current[0][0] in FILLERS:
+                current.pop(0)
+            while current and current[-1][0] in FILLERS:
+                current.pop()
+            if current:
+                spans.append(segment[current[0][1]:current[-1][2]])
+            current = []
+        return spans
+
+    def _segment_phrases(self, segment, words):
+        """(known phrase slices of segment, leftover words between them)"""
+        phrases, leftover = [], []
+        i = 0
+        while i < len(words):
+            end = self._longest_match(words, i)
+            if end is None:
+                leftover.append(words[i])
+                i += 1
+                continue
+            leftover.append(None)
+            phrases.append(segment[words[i][1]:words[end - 1][2]])
+            i = end
+        return phrases, leftover
+
+    def extract(self, text):
+        """
+        Split free text into symptom phrases, in order of appearance.
+
+        Returns:
+            List of lowercase substrings of text: known phrases (resolvable
+            with lookup) and leftover spans for fuzzy matching
+        """
+        listed = ',' in text
+        results = []
+        for segment in SEGMENT_PATTERN.split(text.lower()):
+            words = tokenize(segment)
+            if not words:
+                continue
+            phrases, leftover = self._segment_phrases(segment, words)
+            if listed:
+                # A list item: whole unless it is only known phrases and glue words
+                glue = all(word is None or word[0] in CONNECTORS or word[0] in FILLERS for word in leftover)
+                results.extend(phrases if phrases and glue else [segment.strip()])
+                continue
+            pending, found = [], iter(phrases)
+            for word in leftover:
+                if word is not None:
+                    pending.append(word)
+                    continue
+                results.extend(self._leftover_spans(segment, pending))
+                pending = []
+                results.append(next(found))
+            results.extend(self._leftover_spans(segment, pending))
+        return results
@@ -1,121 +1,88 @@
+import asyncio
+import copy
+import heapq
+import logging
 import os
+import threading
+import numpy as np
 import pandas as pd
-from rapidfuzz import process, fuzz
+from rapidfuzz import process
+from app import metrics
+from app.aliases import DEFAULT_ALIASES_PATH, load_aliases
+from app.cache import LRUCache
+from app.engine import ScoringEngine
+from app.fuzzy_index import build_index
+from app.greetings import GreetingDetector
+from app.phrases import PhraseExtractor
+from app.users import UserStoreBusy, build_store as build_user_store
+from app.results import Alternative, Prediction, RankedDisease, accuracy_level
+from app.knowledge_base import DEFAULT_DATA_DIR, default_bundle_path, load_knowledge_base
+
+logger = logging.getLogger(__name__)
+
+# Marks a symptom missing from the resolution cache (None is a cached miss)
+_UNRESOLVED = object()
 
 class SymptomPredictor:
-    def __init__(self):
+    # Minimum fuzzy score for a user symptom to be accepted as a vocabulary symptom
+    SYMPTOM_MATCH_THRESHOLD = 60
+    
+    # Ranked diseases needed for a result: the best match plus 3 alternatives
+    TOP_K = 4
+    
+    # Orderings supported by rank_diseases
+    RANK_BY = ('score', 'coverage', 'blend')
+    
+    # Minimum number of candidates rank_diseases scores per step
+    RANK_CHUNK = 256
+
+    def __init__(self, data_dir=None, bundle_path=None, exhaustive=None, kb=None, processes=None):
+        """
+        Load the knowledge base from the compiled bundle when it is fresh
+        (see app/knowledge_base.py), otherwise from the CSVs in data_dir.
+        Set KB_USE_BUNDLE=false to always load the CSVs, or KB_MMAP=true to
+        share the bundle's arrays between processes through a memory mapping.
+        
+        Only diseases sharing a symptom with the input are scored (found via
+        the knowledge base's inverted index). Pass exhaustive=True or set
+        SCORING_EXHAUSTIVE=true to score every disease instead, e.g. to verify
+        that both paths return identical results.
+        
+        Pass kb to use an already loaded KnowledgeBase instead of loading one.
+        
+        Symptoms listed in the alias table (data/symptom_aliases.csv or
+        SYMPTOM_ALIASES_PATH) or spelled exactly like a vocabulary symptom are
+        resolved by a dict lookup. Everything else is fuzzy matched against
+        candidates from a lookup index
+        (app/fuzzy_index.py): the whole vocabulary, or a trigram index once
+        the vocabulary is large (FUZZY_INDEX, FUZZY_INDEX_MIN_VOCAB).
+        
+        With processes > 1 (or SCORING_PROCESSES) large batches and disease
+        tables are sharded across a persistent process pool (app/engine.py);
+        small inputs are always handled in the calling thread.
+        """
+        if exhaustive is None:
+            exhaustive = os.environ.get('SCORING_EXHAUSTIVE', 'false').lower() in ('1', 'true', 'yes')
+        self.exhaustive = exhaustive
+        # Bounded cache of raw symptom -> canonical symptom resolutions
+        self.resolution_cache = LRUCache(int(os.environ.get('SYMPTOM_CACHE_SIZE', 2048)))
+        
         try:
-            data_dir = os.path.join(os.path.dirname(__file__), '../data')
-            
-            # Load all CSV files
-            print("📂 Loading disease data from multiple sources...")
-            
-            # 1. Load symptom-disease mappings (dataset.csv or DiseaseAndSymptoms.csv)
-            symptoms_file = os.path.join(data_dir, 'dataset.csv')
-            if not os.path.exists(symptoms_file):
-                symptoms_file = os.path.join(data_dir, 'DiseaseAndSymptoms.csv')
-            
-            df_symptoms = pd.read_csv(symptoms_file)
-            print(f"✅ Loaded symptoms data: {len(df_symptoms)} records")
-            
-            # 2. Load descriptions
-            descriptions_file = os.path.join(data_dir, 'symptom_Description.csv')
-            df_descriptions = pd.read_csv(descriptions_file) if os.path.exists(descriptions_file) else pd.DataFrame()
-            print(f"✅ Loaded descriptions: {len(df_descriptions)} diseases")
-            
-            # 3. Load precautions
-            precautions_file = os.path.join(data_dir, 'symptom_precaution.csv')
-            if not os.path.exists(precautions_file):
-                precautions_file = os.path.join(data_dir, 'Disease precaution.csv')
-            df_precautions = pd.read_csv(precautions_file) if os.path.exists(precautions_file) else pd.DataFrame()
-            print(f"✅ Loaded precautions: {len(df_precautions)} diseases")
-            
-            # 4. Load treatments (medications, procedures, specialists)
-            treatments_file = os.path.join(data_dir, 'disease_treatments.csv')
-            df_treatments = pd.read_csv(treatments_file) if os.path.exists(treatments_file) else pd.DataFrame()
-            print(f"✅ Loaded treatments: {len(df_treatments)} diseases")
-            
-            # 5. Load symptom severity weights
-            severity_file = os.path.join(data_dir, 'Symptom-severity.csv')
-            self.symptom_weights = {}
-            if os.path.exists(severity_file):
-                df_severity = pd.read_csv(severity_file)
-                self.symptom_weights = dict(zip(
-                    df_severity['Symptom'].str.lower().str.strip(),
-                    df_severity['weight']
-                ))
-                print(f"✅ Loaded symptom weights: {len(self.symptom_weights)} symptoms")
-            
-            # Process symptoms data - convert columns to list of symptoms
-            symptom_cols = [col for col in df_symptoms.columns if col.startswith('Symptom_')]
-            df_symptoms['symptoms'] = df_symptoms[symptom_cols].apply(
-                lambda row: [str(s).strip().lower() for s in row if pd.notna(s) and str(s).strip()],
-                axis=1
-            )
-            
-            # Group by disease and aggregate symptoms
-            disease_symptoms = df_symptoms.groupby('Disease')['symptoms'].apply(
-                lambda x: list(set([sym for symptoms in x for sym in symptoms]))
-            ).reset_index()
-            
-            # Merge all data
-            self.df = disease_symptoms.copy()
-            self.df['disease'] = self.df['Disease']
-            
-            # Create normalized disease name for merging
-            self.df['disease_lower'] = self.df['Disease'].str.lower().str.strip()
-            
-            # Merge descriptions
-            if not df_descriptions.empty:
-                df_descriptions['disease_lower'] = df_descriptions['Disease'].str.lower().str.strip()
-                self.df = self.df.merge(
-                    df_descriptions[['disease_lower', 'Description']].rename(columns={'Description': 'description'}),
-                    on='disease_lower',
-                    how='left'
-                )
-            else:
-                self.df['description'] = 'No description available'
-            
-            # Merge precautions
-            if not df_precautions.empty:
-                precaution_cols = [col for col in df_precautions.columns if col.startswith('Precaution_')]
-                df_precautions['precautions'] = df_precautions[precaution_cols].apply(
-                    lambda row: '|'.join([str(s).strip() for s in row if pd.notna(s) and str(s).strip()]),
-                    axis=1
-                )
-                df_precautions['disease_lower'] = df_precautions['Disease'].str.lower().str.strip()
-                self.df = self.df.merge(
-                    df_precautions[['disease_lower', 'precautions']],
-                    on='disease_lower',
-                    how='left'
-                )
-            else:
-                self.df['precautions'] = ''
-            
-            # Merge treatments
-            if not df_treatments.empty:
-                df_treatments['disease_lower'] = df_treatments['Disease'].str.lower().str.strip()
-                self.df = self.df.merge(
-                    df_treatments[['disease_lower', 'medications', 'procedures', 'specialist']],
-                    on='disease_lower',
-                    how='left'
-                )
-            else:
-                self.df['medications'] = ''
-                self.df['procedures'] = ''
-                self.df['specialist'] = ''
-            
-            # Drop the temporary column
-            self.df = self.df.drop('disease_lower', axis=1)
-            
-            # Fill NaN values
-            self.df = self.df.fillna('')
-            
-            # Build symptom vocabulary
-            self.symptom_vocab = sorted({sym for symptoms in self.df['symptoms'] for sym in symptoms})
+            if data_dir is None:
+                data_dir = DEFAULT_DATA_DIR
+            if bundle_path is None and os.environ.get('KB_USE_BUNDLE', 'true').lower() in ('1', 'true', 'yes'):
+                bundle_path = os.environ.get('KB_BUNDLE_PATH') or default_bundle_path(data_dir)
+            self.data_dir = data_dir
+            self.bundle_path = bundle_path
+            self.aliases_path = os.environ.get('SYMPTOM_ALIASES_PATH') or DEFAULT_ALIASES_PATH
+            self.use_mmap = os.environ.get('KB_MMAP', 'false').lower() in ('1', 'true', 'yes')
+            if kb is None:
+                kb = self.load_knowledge_base()
             
-            print(f"✅ Successfully merged data for {len(self.df)} unique diseases")
-            print(f"✅ Built vocabulary with {len(self.symptom_vocab)} unique symptoms")
+            if processes is None:
+                processes = int(os.environ.get('SCORING_PROCESSES', 0))
+            self.engine = ScoringEngine(kb, data_dir, bundle_path, processes) if processes > 1 else None
+            self.set_knowledge_base(kb)
             
         except Exception as e:
             print(f"❌ Error initializing SymptomPredictor: {e}")
@@ -123,9 +90,237 @@ class SymptomPredictor:
             traceback.print_exc()
             raise e
 
-    def preprocess_input(self, user_symptoms):
+    def set_knowledge_base(self, kb):
+        """Use a compiled knowledge base and drop everything derived from the previous one"""
+        self.kb = kb
+        self.aliases = load_aliases(self.aliases_path, kb.symptom_vocab)
+        self.phrase_extractor = PhraseExtractor(kb.symptom_vocab, self.aliases)
+        self.fuzzy_index = build_index(kb.symptom_vocab)
+        if self.fuzzy_index.kind != 'brute':
+            print(f"✅ Built {self.fuzzy_index.kind} index over {len(kb.symptom_vocab)} symptoms")
+        self.resolution_cache.clear()
+        if self.engine is not None:
+            self.engine = self.engine.for_knowledge_base(kb)
+
+    def load_knowledge_base(self):
+        """
+        Load the knowledge base (again) from this predictor's bundle or CSV
+        sources. A CSV rebuild reuses the current neighbour table when the
+        vocabulary is unchanged.
+        """
+        current = getattr(self, 'kb', None)
+        return load_knowledge_base(self.data_dir, self.bundle_path, use_mmap=self.use_mmap,
+                                   neighbours=current.neighbours if current is not None else None)
+
+    def with_knowledge_base(self, kb):
+        """
+        A new predictor with this one's settings over kb. This predictor is
+        left untouched, so requests already using it can finish on the old
+        knowledge base (and its scoring engine's pool); see app/reloader.py.
+        """
+        clone = copy.copy(self)
+        clone.resolution_cache = self.resolution_cache.fresh()
+        clone.set_knowledge_base(kb)
+        return clone
+
+    @property
+    def symptom_vocab(self):
+        return self.kb.symptom_vocab
+
+    @property
+    def symptom_weights(self):
+        return self.kb.symptom_weights
+
+    def _candidate_rows(self, processed_cases, exhaustive=False):
+        """
+        Diseases worth scoring for the given cases: those listed in the inverted
+        index for at least one of their symptoms (every other disease scores 0),
+        or all scorable diseases when exhaustive.
+        """
+        kb = self.kb
+        if exhaustive:
+            return np.flatnonzero(kb.scorable)
+        ids = {kb.symptom_ids[sym] for case in processed_cases for sym in case}
+        if not ids:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate([
+            kb.postings[kb.postings_indptr[i]:kb.postings_indptr[i + 1]] for i in ids
+        ]))
+
+    def _score_diseases(self, processed_cases, rows):
+        """
+        Score diseases against one or more canonical symptom lists in a
+        single vectorized pass.
+        
+        Args:
+            processed_cases: List of canonical symptom lists (one per case)
+            rows: Indices of the diseases to score (see _candidate_rows)
+            
+        Returns:
+            Tuple (scores, coverage, matched) where scores and coverage have shape
+            (cases, rows) and matched[c, r, i] tells whether symptom i of
+            case c counted towards disease rows[r]
+        """
+        kb = self.kb
+        n_cases = len(processed_cases)
+        width = max((len(case) for case in processed_cases), default=0)
+        
+        # Pad cases to the same width; padding has weight 0 and never matches
+        ids = np.zeros((n_cases, width), dtype=np.intp)
+        valid = np.zeros((n_cases, width), dtype=bool)
+        for c, case in enumerate(processed_cases):
+            ids[c, :len(case)] = [kb.symptom_ids[sym] for sym in case]
+            valid[c, :len(case)] = True
+        
+        partial = kb.match_scores[rows[None, :, None], ids[:, None, :]]
+        weights = np.where(valid, kb.weight_vector[ids], 0.0)
+        
+        # Accumulate one symptom at a time so the floating point sums are
+        # identical to the per-disease loop (ties are broken on exact equality)
+        matched_weight = np.zeros((n_cases, len(rows)))
+        for i in range(width):
+            matched_weight += weights[:, i, None] * (partial[:, :, i] / 100)
+        
+        matched = (partial > 0) & valid[:, None, :]
+        scores = (matched_weight / weights.sum(axis=1)[:, None]) * 100
+        coverage = matched.sum(axis=2) / kb.disease_symptom_counts[rows] * 100
+        return scores, coverage, matched
+
+    def _score(self, processed_cases, rows):
+        """_score_diseases, sharded across the engine's pool when the work is large enough"""
+        engine = self.engine
+        width = max((len(case) for case in processed_cases), default=0)
+        if engine is not None and engine.should_score(len(processed_cases), len(rows), width):
+            try:
+                return engine.score(processed_cases, rows)
+            except Exception as e:
+                self._engine_failed(e)
+        return self._score_diseases(processed_cases, rows)
+
+    def _resolve_many(self, symptoms):
+        """
+        Resolve distinct normalized symptoms to {symptom: (match, score) or None}.
+        Uncached symptoms are fuzzy matched in the engine's pool when there are
+        enough of them; results are stored in the resolution cache either way.
+        """
+        engine = self.engine
+        if engine is None or not engine.should_resolve(len(symptoms)):
+            return {sym: self._resolve_symptom(sym) for sym in symptoms}
+        
+        threshold = self.SYMPTOM_MATCH_THRESHOLD
+        resolved, missing = {}, []
+        for sym in symptoms:
+            hit = self._lookup_symptom(sym)
+            if hit:
+                resolved[sym] = hit
+                continue
+            metrics.SYMPTOM_LOOKUPS.inc('fuzzy')
+            hit = self.resolution_cache.get((sym, threshold), _UNRESOLVED)
+            if hit is _UNRESOLVED:
+                missing.append(sym)
+            else:
+                resolved[sym] = hit
+        
+        if engine.should_resolve(len(missing)):
+            try:
+                for sym, result in zip(missing, engine.resolve(missing, threshold)):
+                    self.resolution_cache.put((sym, threshold), result)
+                    resolved[sym] = result
+                return resolved
+            except Exception as e:
+                self._engine_failed(e)
+        for sym in missing:
+            resolved[sym] = self._cached_fuzzy_resolve(sym)
+        return resolved
+
+    def _engine_failed(self, error):
+        """Drop a broken or stale pool; the work is redone serially"""
+        print(f"⚠️ Scoring engine failed, continuing serially: {error}")
+        self.engine.stats['fallbacks'] += 1
+        self.engine.shutdown()
+
+    def _rank(self, scores, rows, exhaustive=False):
+        """
+        Order scored diseases by score; ties keep table order. Returns positions
+        into rows: all of them when exhaustive, otherwise only the TOP_K best
+        (selected with a bounded heap instead of a full sort).
+        """
+        if exhaustive:
+            return list(np.argsort(-scores, kind='stable'))
+        return heapq.nlargest(self.TOP_K, range(len(rows)), key=lambda r: (scores[r], -rows[r]))
+
+    def _lookup_symptom(self, normalized_sym):
+        """
+        Resolve a symptom without fuzzy matching: a vocabulary symptom typed
+        exactly (the only string WRatio scores 100) or with spaces and
+        punctuation in place of underscores, or a listed alias.
+        Returns (match, 100.0) or None.
+        """
+        if normalized_sym in self.kb.symptom_ids:
+            metrics.SYMPTOM_LOOKUPS.inc('exact')
+            return normalized_sym, 100.0
+        hit = self.phrase_extractor.lookup(normalized_sym)
+        if hit is not None:
+            match, method = hit
+            metrics.SYMPTOM_LOOKUPS.inc(method)
+            return match, 100.0
+        return None
+
+    def extract_symptoms(self, text):
+        """
+        Split free-text input into symptom phrases (see app/phrases.py).
+        Known phrases are resolved by lookup; the rest are fuzzy matched.
+        """
+        return self.phrase_extractor.extract(text)
+
+    def lookup_stats(self):
+        """How symptoms have been resolved so far, to help grow the alias table"""
+        counts = {method: metrics.SYMPTOM_LOOKUPS.value(method) for method in ('alias', 'exact', 'fuzzy')}
+        total = sum(counts.values())
+        counts['aliases'] = len(self.aliases)
+        counts['alias_hit_rate'] = round(counts['alias'] / total, 4) if total else 0.0
+        return counts
+
+    def _resolve_symptom(self, normalized_sym):
+        """
+        Resolve a normalized symptom to its canonical vocabulary symptom.
+        Returns (match, score) or None when nothing scores above the threshold.
+        Exact symptoms and aliases are looked up directly; fuzzy results
+        (including misses) are served from the LRU resolution cache.
+        """
+        hit = self._lookup_symptom(normalized_sym)
+        if hit:
+            return hit
+        metrics.SYMPTOM_LOOKUPS.inc('fuzzy')
+        return self._cached_fuzzy_resolve(normalized_sym)
+
+    def _cached_fuzzy_resolve(self, normalized_sym):
+        """_fuzzy_resolve through the LRU resolution cache"""
+        threshold = self.SYMPTOM_MATCH_THRESHOLD
+        return self.resolution_cache.get_or_compute(
+            (normalized_sym, threshold),
+            lambda: self._fuzzy_resolve(normalized_sym, threshold)
+        )
+
+    def _fuzzy_resolve(self, normalized_sym, threshold):
+        """Fuzzy match a normalized symptom against the lookup index's candidates"""
+        candidates = self.fuzzy_index.candidates(normalized_sym)
+        if not candidates:
+            return None
+        result = process.extractOne(normalized_sym, candidates)
+        if result:
+            match, score, _ = result
+            if score > threshold:
+                # Candidates for the alias table when they show up often
+                logger.debug("Fuzzy resolved '%s' -> '%s' (%.1f)", normalized_sym, match, score)
+                return match, score
+        return None
+
+    def preprocess_input(self, user_symptoms, resolved=None):
         """
         Preprocess and validate user symptoms with fuzzy matching.
+        An optional dict of already resolved normalized symptoms
+        (see _resolve_symptom) can be passed to share work across a batch.
         Returns tuple: (cleaned_symptoms, unknown_symptoms, matched_info)
         """
         cleaned = []
@@ -139,24 +334,43 @@ class SymptomPredictor:
                 continue
                 
             # Use fuzzy matching to find the closest match
-            result = process.extractOne(normalized_sym, self.symptom_vocab)
+            if resolved is not None and normalized_sym in resolved:
+                result = resolved[normalized_sym]
+            else:
+                result = self._resolve_symptom(normalized_sym)
             if result:
-                match, score, _ = result
-                if score > 60:
-                    cleaned.append(match)
-                    matched_info.append({
-                        'original': sym,
-                        'matched': match,
-                        'confidence': round(score, 2)
-                    })
-                else:
-                    # Low confidence match - treat as unknown
-                    unknown.append(sym)
+                match, score = result
+                cleaned.append(match)
+                matched_info.append({
+                    'original': sym,
+                    'matched': match,
+                    'confidence': round(score, 2)
+                })
             else:
+                # No match or low confidence match - treat as unknown
                 unknown.append(sym)
                 
         return cleaned, unknown, matched_info
 
+    def canonicalize(self, user_symptoms):
+        """
+        Normalize user symptoms and resolve them against the vocabulary.
+        Returns tuple: (user_symptoms, cleaned_symptoms, unknown_symptoms, matched_info)
+        """
+        user_symptoms = [s.lower().strip() for s in user_symptoms if s.strip()]
+        return (user_symptoms,) + self.preprocess_input(user_symptoms)
+
+    @staticmethod
+    def result_key(canonical, min_symptoms=3, min_confidence=30):
+        """
+        Cache key for a canonicalized case: the sorted canonical symptoms, how
+        many symptoms were not recognized and the matching parameters. Cases
+        with the same key differ only in their per-request echo fields
+        (symptom_match_info, unknown_symptoms and symptom order).
+        """
+        _, processed_symptoms, unknown_symptoms, _ = canonical
+        return (tuple(sorted(processed_symptoms)), len(unknown_symptoms), min_symptoms, min_confidence)
+
     def match_disease(self, user_symptoms, min_symptoms=3, min_confidence=30):
         """
         Match disease based on symptoms with validation and accuracy reporting.
@@ -167,10 +381,200 @@ class SymptomPredictor:
             min_confidence: Minimum confidence threshold for prediction
             
         Returns:
-            Dictionary with prediction results or None if no match
+            Prediction (app/results.py), a dict describing why there is no
+            prediction (need_more_symptoms, no_match, ...) or None
         """
-        user_symptoms = [s.lower().strip() for s in user_symptoms if s.strip()]
+        return self.match_canonical(self.canonicalize(user_symptoms), min_symptoms, min_confidence)
+
+    def match_canonical(self, canonical, min_symptoms=3, min_confidence=30):
+        """Match disease for a case already passed through canonicalize()"""
+        user_symptoms, processed_symptoms, unknown_symptoms, matched_info = canonical
+        
+        error = self._validate_symptoms(user_symptoms, processed_symptoms, unknown_symptoms, matched_info, min_symptoms)
+        if error:
+            return error
+        
+        # Zero-score diseases can only be reported when min_confidence <= 0
+        exhaustive = self.exhaustive or min_confidence <= 0
+        rows = self._candidate_rows([processed_symptoms], exhaustive)
+        scores, coverage, matched = self._score([processed_symptoms], rows)
+        return self._build_prediction(
+            user_symptoms, processed_symptoms, unknown_symptoms, matched_info,
+            scores[0], matched[0], rows, exhaustive, min_confidence
+        )
+
+    def match_session(self, session, unknown_symptoms=(), min_symptoms=3, min_confidence=30):
+        """
+        Match disease for a conversational session (app/sessions.py) from its
+        running per-disease sums instead of rescoring its symptoms.
+
+        Args:
+            session: SymptomSession, already synced to this knowledge base
+            unknown_symptoms: Unrecognized symptoms of the current turn
+
+        Returns:
+            The match_canonical result for the session's symptoms
+        """
+        canonical = session.canonical(unknown_symptoms)
+        user_symptoms, processed_symptoms, unknown_symptoms, matched_info = canonical
+
+        error = self._validate_symptoms(user_symptoms, processed_symptoms, unknown_symptoms, matched_info, min_symptoms)
+        if error:
+            return error
+
+        # The sums only cover diseases sharing a symptom with the session
+        if self.exhaustive or min_confidence <= 0:
+            return self.match_canonical(canonical, min_symptoms, min_confidence)
+        rows, scores, matched = session.scores(self.kb)
+        return self._build_prediction(
+            user_symptoms, processed_symptoms, unknown_symptoms, matched_info,
+            scores, matched, rows, False, min_confidence
+        )
+
+    def match_disease_batch(self, symptom_lists, min_symptoms=3, min_confidence=30):
+        """
+        Match diseases for many cases at once.
+        
+        Each distinct symptom string is fuzzy matched only once across the batch
+        and all cases that pass validation are scored in one matrix pass.
+        
+        Args:
+            symptom_lists: List of symptom string lists (one per case)
+            min_symptoms: Minimum number of valid symptoms required
+            min_confidence: Minimum confidence threshold for prediction
+            
+        Returns:
+            List of result dictionaries in the same order as symptom_lists,
+            identical to what match_disease returns for each case
+        """
+        cases = [[s.lower().strip() for s in symptoms if s.strip()] for symptoms in symptom_lists]
+        
+        # Resolve each distinct symptom string once
+        resolved = self._resolve_many(list(dict.fromkeys(sym for case in cases for sym in case)))
+        
+        results = [None] * len(cases)
+        pending = []
+        for c, user_symptoms in enumerate(cases):
+            processed_symptoms, unknown_symptoms, matched_info = self.preprocess_input(user_symptoms, resolved)
+            error = self._validate_symptoms(user_symptoms, processed_symptoms, unknown_symptoms, matched_info, min_symptoms)
+            if error:
+                results[c] = error
+            else:
+                pending.append((c, user_symptoms, processed_symptoms, unknown_symptoms, matched_info))
+        
+        if pending:
+            exhaustive = self.exhaustive or min_confidence <= 0
+            processed_cases = [case[2] for case in pending]
+            rows = self._candidate_rows(processed_cases, exhaustive)
+            scores, coverage, matched = self._score(processed_cases, rows)
+            for i, (c, user_symptoms, processed_symptoms, unknown_symptoms, matched_info) in enumerate(pending):
+                results[c] = self._build_prediction(
+                    user_symptoms, processed_symptoms, unknown_symptoms, matched_info,
+                    scores[i], matched[i], rows, exhaustive, min_confidence
+                )
+        
+        return results
+
+    def rank_diseases(self, symptoms, k=10, rank_by='score', blend=0.5):
+        """
+        Differential diagnosis: the k best diseases for the symptoms.
+        
+        Args:
+            symptoms: List of symptom strings
+            k: Number of diseases to return
+            rank_by: 'score' (weighted symptom score, as match_disease),
+                'coverage' (share of the disease's symptoms present) or
+                'blend' (blend * score + (1 - blend) * coverage)
+            blend: Weight of the score when rank_by is 'blend' (0-1)
+            
+        Returns:
+            List of up to k RankedDisease (app/results.py), best first; ties
+            keep table order. Only diseases sharing a symptom with the input
+            are ranked.
+        """
+        return self.rank_canonical(self.canonicalize(symptoms), k, rank_by, blend)
+
+    def rank_canonical(self, canonical, k=10, rank_by='score', blend=0.5):
+        """
+        rank_diseases for a case already passed through canonicalize().
+        
+        Coverage and an upper bound of the score come from the inverted
+        index alone: a disease listed under a symptom covers it, and earns at
+        most that symptom's full weight. The RANK_CHUNK (at least 4k)
+        candidates with the highest bounds are scored exactly; the k-th best
+        value among them is a cutoff, and of the other candidates only those
+        whose bound reaches it are scored. On a large disease table most
+        candidates are never scored and nothing is fully sorted.
+        """
+        if rank_by not in self.RANK_BY:
+            raise ValueError(f"rank_by must be one of {', '.join(self.RANK_BY)}")
+        processed_symptoms = canonical[1]
+        kb = self.kb
+        if k <= 0 or not processed_symptoms:
+            return []
+        
+        rows = self._candidate_rows([processed_symptoms])
+        if not len(rows):
+            return []
+        
+        def rank_value(score, coverage):
+            if rank_by == 'score':
+                return score
+            if rank_by == 'coverage':
+                return coverage
+            return blend * score + (1 - blend) * coverage
         
+        # Score the candidates with the highest bounds first; the k-th best
+        # value among them is a cutoff every other disease's bound is checked
+        # against (ties go to the earlier disease, so only a strictly lower
+        # bound rules a disease out)
+        first = min(len(rows), max(self.RANK_CHUNK, 4 * k))
+        if first < len(rows):
+            ids = [kb.symptom_ids[sym] for sym in processed_symptoms]
+            postings = [kb.postings[kb.postings_indptr[i]:kb.postings_indptr[i + 1]] for i in ids]
+            listed = np.concatenate(postings)
+            weights = np.repeat(kb.weight_vector[ids], [len(p) for p in postings])
+            n_diseases = len(kb.disease_names)
+            coverage_bound = np.bincount(listed, minlength=n_diseases)[rows] / kb.disease_symptom_counts[rows] * 100
+            score_bound = np.bincount(listed, weights=weights, minlength=n_diseases)[rows] / kb.weight_vector[ids].sum() * 100
+            # Slightly inflated so float summation order can't push a score above it
+            bound = rank_value(score_bound * (1 + 1e-9), coverage_bound)
+            selected = np.argpartition(-bound, first - 1)[:first]
+        else:
+            selected = np.arange(len(rows))
+        scores, coverage, matched = self._score_diseases([processed_symptoms], rows[selected])
+        scores, coverage, matched = scores[0], coverage[0], matched[0]
+        values = rank_value(scores, coverage)
+        
+        if first < len(rows) and len(values) >= k:
+            cutoff = np.partition(values, len(values) - k)[len(values) - k]
+            remaining = bound >= cutoff
+            remaining[selected] = False
+            rest = np.flatnonzero(remaining)
+            if len(rest):
+                more = self._score_diseases([processed_symptoms], rows[rest])
+                selected = np.concatenate([selected, rest])
+                scores = np.concatenate([scores, more[0][0]])
+                coverage = np.concatenate([coverage, more[1][0]])
+                matched = np.concatenate([matched, more[2][0]])
+                values = rank_value(scores, coverage)
+        
+        selected_rows = rows[selected]
+        best = np.lexsort((selected_rows, -values))[:k]
+        rounded = np.round(np.stack([scores[best], coverage[best]], axis=1), 2).tolist()
+        return [
+            RankedDisease(
+                kb.disease_names[selected_rows[i]], score, cover,
+                [sym for sym, hit in zip(processed_symptoms, matched[i]) if hit]
+            )
+            for i, (score, cover) in zip(best, rounded)
+        ]
+
+    def _validate_symptoms(self, user_symptoms, processed_symptoms, unknown_symptoms, matched_info, min_symptoms):
+        """
+        Check that a case has enough recognized symptoms to be scored.
+        Returns an error dictionary, or None if the case can be scored.
+        """
         # Validate input
         if not user_symptoms:
             return {
@@ -178,9 +582,6 @@ class SymptomPredictor:
                 "message": "I'd love to help! Could you tell me what symptoms you're experiencing?"
             }
         
-        # Preprocess symptoms with validation
-        processed_symptoms, unknown_symptoms, matched_info = self.preprocess_input(user_symptoms)
-        
         # Check if we have enough valid symptoms
         if not processed_symptoms:
             return {
@@ -216,96 +617,47 @@ class SymptomPredictor:
                 "required_count": min_symptoms,
                 "suggestion": "The more details you share, the better I can help!"
             }
-
-        # Find best matching diseases (top 3)
-        disease_scores = []
-
-        for _, row in self.df.iterrows():
-            symptoms = row['symptoms']
-            if not symptoms:
-                continue
-                
-            # Calculate weighted match score
-            total_weight = 0
-            matched_weight = 0
-            matched_symptoms = []
-            
-            for sym in processed_symptoms:
-                # Get symptom weight (default to 1 if not found)
-                weight = self.symptom_weights.get(sym, 1)
-                total_weight += weight
-                
-                # Check if symptom matches any disease symptom
-                result = process.extractOne(sym, symptoms)
-                if result:
-                    _, score, _ = result
-                    if score > 70:
-                        matched_weight += weight * (score / 100)
-                        matched_symptoms.append(sym)
-            
-            # Calculate final match score
-            if total_weight > 0:
-                match_score = (matched_weight / total_weight) * 100
-                
-                # Calculate coverage (what % of disease symptoms are matched)
-                coverage = (len(matched_symptoms) / len(symptoms)) * 100 if symptoms else 0
-                
-                disease_scores.append({
-                    "row": row,
-                    "score": match_score,
-                    "coverage": coverage,
-                    "matched_symptoms": matched_symptoms
-                })
         
-        # Sort by score
-        disease_scores.sort(key=lambda x: x['score'], reverse=True)
+        return None
+
+    def _build_prediction(self, user_symptoms, processed_symptoms, unknown_symptoms, matched_info,
+                          scores, matched, rows, exhaustive, min_confidence):
+        """Turn the disease scores of one case into the match_disease result"""
+        ranking = self._rank(scores, rows, exhaustive)
         
         # Get best match
-        if disease_scores and disease_scores[0]['score'] >= min_confidence:
-            best = disease_scores[0]
+        if len(ranking) and scores[ranking[0]] >= min_confidence:
+            best = ranking[0]
+            row = self.kb.disease_metadata[rows[best]]
+            matched_symptoms = [sym for sym, hit in zip(processed_symptoms, matched[best]) if hit]
             
-            # Determine accuracy level
-            confidence = best['score']
-            if confidence >= 75:
-                accuracy_level = "high"
-                accuracy_message = "High confidence prediction"
-            elif confidence >= 50:
-                accuracy_level = "medium"
-                accuracy_message = "Moderate confidence - consider providing more symptoms"
-            else:
-                accuracy_level = "low"
-                accuracy_message = "Low confidence - more symptoms needed for accurate diagnosis"
-            
-            result = {
-                "disease": best["row"]["disease"],
-                "description": best["row"].get("description", "No description available"),
-                "medications": str(best["row"].get("medications", "")).split('|') if best["row"].get("medications") else [],
-                "procedures": str(best["row"].get("procedures", "")).split('|') if best["row"].get("procedures") else [],
-                "precautions": str(best["row"].get("precautions", "")).split('|') if best["row"].get("precautions") else [],
-                "specialist": best["row"].get("specialist", "General Practitioner"),
-                "confidence": round(confidence, 2),
-                "accuracy_level": accuracy_level,
-                "accuracy_message": accuracy_message,
-                "matched_symptoms": best["matched_symptoms"],
-                "symptom_match_info": matched_info,
-                "unknown_symptoms": unknown_symptoms if unknown_symptoms else None,
-                "total_symptoms_provided": len(user_symptoms),
-                "recognized_symptoms": len(processed_symptoms)
-            }
+            # One numpy call instead of round() per numpy scalar, same rounding
+            top = ranking[:4]
+            confidences = np.round(scores[top], 2).tolist()
             
             # Add alternative diagnoses if available
-            if len(disease_scores) > 1:
-                alternatives = []
-                for alt in disease_scores[1:4]:  # Top 3 alternatives
-                    if alt['score'] >= min_confidence * 0.7:  # At least 70% of best score
-                        alternatives.append({
-                            "disease": alt["row"]["disease"],
-                            "confidence": round(alt['score'], 2)
-                        })
-                if alternatives:
-                    result["alternative_diagnoses"] = alternatives
+            alternatives = [
+                Alternative(self.kb.disease_names[rows[alt]], confidence)
+                for alt, confidence in zip(top[1:], confidences[1:])  # Top 3 alternatives
+                if scores[alt] >= min_confidence * 0.7  # At least 70% of best score
+            ]
             
-            return result
+            return Prediction(
+                row["disease"],
+                row.get("description", "No description available"),
+                str(row.get("medications", "")).split('|') if row.get("medications") else [],
+                str(row.get("procedures", "")).split('|') if row.get("procedures") else [],
+                str(row.get("precautions", "")).split('|') if row.get("precautions") else [],
+                row.get("specialist", "General Practitioner"),
+                confidences[0],
+                accuracy_level(scores[best]),
+                matched_symptoms,
+                matched_info,
+                unknown_symptoms if unknown_symptoms else None,
+                len(user_symptoms),
+                len(processed_symptoms),
+                alternatives or None
+            )
         else:
             # No confident match found - but we have recognized symptoms
             recognized = [m['matched'] for m in matched_info]
@@ -338,6 +690,10 @@ class SymptomPredictor:
                 }
 
 class GreetingsResponder:
+    # Minimum fuzzy score for the whole input / its first 1-3 words to count as a greeting
+    GREETING_THRESHOLD = 80
+    PREFIX_THRESHOLD = 85
+
     def __init__(self, csv_path=None):
         try:
             if csv_path is None:
@@ -370,67 +726,89 @@ class GreetingsResponder:
                 'hi': 'Hi there! What symptoms are you experiencing?',
                 'hey': 'Hey! How can I help you?'
             }
+        
+        # Exact lookup, length filter and prefix cache in front of extractOne
+        self.detector = GreetingDetector(self.greetings)
 
     def get_response(self, user_input):
         """
         Check if user input is a greeting.
         Returns greeting response if detected, None otherwise.
+        
+        First checks whether the entire input is a greeting (exact or fuzzy
+        match), then whether it STARTS with one by matching its first 1-3
+        words with a higher threshold. This handles cases like
+        "good night, I have fever". See app/greetings.py for how the
+        detector avoids scanning every greeting.
         """
         user_input_lower = user_input.lower().strip()
         
-        # First check: Is the entire input a greeting? (exact or fuzzy match)
-        match, score, _ = process.extractOne(user_input_lower, self.greetings)
-        if score > 80:
-            print(f"🎯 Greeting detected: '{user_input}' matched '{match}' with {score}% confidence")
+        detected = self.detector.detect(user_input_lower, self.GREETING_THRESHOLD, self.PREFIX_THRESHOLD)
+        if detected:
+            match, score, prefix = detected
+            if prefix is None:
+                logger.debug("🎯 Greeting detected: '%s' matched '%s' with %s%% confidence", user_input, match, score)
+            else:
+                logger.debug("🎯 Greeting detected at start: '%s' matched '%s' with %s%% confidence", prefix, match, score)
             return self.responses.get(match)
         
-        # Second check: Does input START with a greeting?
-        # This handles cases like "good night, I have fever"
-        words = user_input_lower.split()
-        
-        # Try matching first 1-3 words as potential multi-word greetings
-        for word_count in range(min(3, len(words)), 0, -1):
-            prefix = ' '.join(words[:word_count])
-            match, score, _ = process.extractOne(prefix, self.greetings)
-            if score > 85:  # Higher threshold for prefix matching
-                print(f"🎯 Greeting detected at start: '{prefix}' matched '{match}' with {score}% confidence")
-                return self.responses.get(match)
-        
-        print(f"❌ No greeting detected in: '{user_input}'")
+        logger.debug("❌ No greeting detected in: '%s'", user_input)
         return None
 
-# Simple in-memory user storage for development
-# In production, this should use a proper database
-USERS_DB = {
-    "admin@example.com": {"username": "Admin User", "password": "admin123", "email": "admin@example.com"},
-    "user@example.com": {"username": "Test User", "password": "user123", "email": "user@example.com"}
-}
+# User accounts (app/users.py), opened by the first login or signup of each process
+_user_store = None
+_user_store_lock = threading.Lock()
+
+def user_store():
+    """Return this process's UserStore, opening it on first use"""
+    global _user_store
+    if _user_store is None:
+        with _user_store_lock:
+            if _user_store is None:
+                _user_store = build_user_store()
+    return _user_store
 
 def login(email, password):
-    """Simple login function using in-memory storage"""
+    """
+    Check credentials against the user store.
+    Returns {'email', 'username'}, or None if they don't match.
+    Raises UserStoreBusy when the store is overloaded.
+    """
     try:
-        user_data = USERS_DB.get(email)
-        if user_data and user_data["password"] == password:
-            return {
-                "email": email, 
-                "username": user_data["username"]
-            }
-        return None
+        return user_store().login(email, password)
+    except UserStoreBusy:
+        raise
     except Exception as e:
         print(f"Login error: {e}")
         return None
 
 def signup(username, email, password):
-    """Simple signup function using in-memory storage"""
+    """
+    Create an account in the user store.
+    Raises ValueError if the email is already registered.
+    """
+    try:
+        return user_store().signup(username, email, password)
+    except Exception as e:
+        print(f"Signup error: {e}")
+        raise e
+
+async def login_async(email, password):
+    """login() for the event loop; the password check is awaited, not blocking a thread"""
+    try:
+        store = await asyncio.to_thread(user_store)
+        return await store.login_async(email, password)
+    except UserStoreBusy:
+        raise
+    except Exception as e:
+        print(f"Login error: {e}")
+        return None
+
+async def signup_async(username, email, password):
+    """signup() for the event loop; the password hash is awaited, not blocking a thread"""
     try:
-        if email in USERS_DB:
-            raise ValueError("User already exists")
-        USERS_DB[email] = {
-            "username": username, 
-            "password": password, 
-            "email": email
-        }
-        return True
+        store = await asyncio.to_thread(user_store)
+        return await store.signup_async(username, email, password)
     except Exception as e:
         print(f"Signup error: {e}")
         raise e
@@ -0,0 +1,164 @@
+"""
+Knowledge base hot reload.
+
+SymptomPredictor loads the knowledge base once, so editing
+disease_treatments.csv, Symptom-severity.csv or the alias table used to
+need a restart of every worker. KnowledgeBaseReloader instead:
+
+  - loads the knowledge base again (the compiled bundle when it is fresh,
+    otherwise the CSVs) and builds a new SymptomPredictor around it with
+    with_knowledge_base(), off the request path
+  - swaps the new predictor in with a single reference assignment and hands
+    it to on_swap (api_server installs it as its predictor)
+  - never modifies the old predictor, so requests that already picked it up
+    finish on the old snapshot; derived state (aliases, phrase trie, fuzzy
+    index, resolution cache) belongs to each predictor and is rebuilt with it
+
+Reloads are triggered by POST /api/admin/reload, or by polling the source
+files' modification times every KB_WATCH_INTERVAL seconds. A reload that
+fails keeps the current snapshot. Each process reloads its own predictor, so
+with several workers use the watcher (each worker polls) rather than the
+admin endpoint (which reaches one worker).
+"""
+import os
+import threading
+import time
+import traceback
+
+from app.knowledge_base import source_files
+
+
+class KnowledgeBaseReloader:
+    """
+    Owns the current SymptomPredictor snapshot and replaces it on reload.
+
+    Args:
+        predictor: The initial SymptomPredictor
+        on_swap: Called with each new predictor right after it is swapped in
+        watch_interval: Seconds between source file checks for watch()
+            (KB_WATCH_INTERVAL, 0 disables watching)
+    """
+    def __init__(self, predictor, on_swap=None, watch_interval=None):
+        if watch_interval is None:
+            watch_interval = float(os.environ.get('KB_WATCH_INTERVAL', 0))
+        self.predictor = predictor
+        self.on_swap = on_swap
+        self.watch_interval = watch_interval
+        self.version = 1
+        self.loaded_at = time.time()
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stamp = self.source_stamp()
+        self._watcher_pid = None
+
+    def watched_files(self):
+        predictor = self.predictor
+        paths = list(source_files(predictor.data_dir).values()) + [predictor.aliases_path]
+        if predictor.bundle_path:
+            paths.append(predictor.bundle_path)
+        return paths
+
+    def source_stamp(self):
+        """(path, mtime, size) of every watched file; None for missing files"""
+        stamp = []
+        for path in self.watched_files():
+            try:
+                stat = os.stat(path)
+                stamp.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append((path, None, None))
+        return tuple(stamp)
+
+    @property
+    def reloading(self):
+        return self._lock.locked()
+
+    def reload(self):
+        """
+        Build a new snapshot and swap it in. Concurrent calls run one after
+        the other.
+
+        Returns:
+            True if a new snapshot is in use, False if the reload failed
+        """
+        with self._lock:
+            # Taken before loading, so changes made while loading trigger another reload
+            stamp = self.source_stamp()
+            start = time.perf_counter()
+            try:
+                kb = self.predictor.load_knowledge_base()
+                predictor = self.predictor.with_knowledge_base(kb)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"❌ Knowledge base reload failed, keeping version {self.version}: {e}")
+                traceback.print_exc()
+                return False
+
+            self.predictor = predictor
+            self._stamp = stamp
+            self.version += 1
+            self.loaded_at = time.time()
+            self.reloads += 1
+            self.last_error = None
+            if self.on_swap is not None:
+                self.on_swap(predictor)
+            print(f"✅ Knowledge base version {self.version} in use ({kb.origin}, "
+                  f"{len(kb.disease_names)} diseases, {(time.perf_counter() - start) * 1000:.0f} ms)")
+            return True
+
+    def reload_in_background(self):
+        """
+        Start a reload on a background thread.
+
+        Returns:
+            False if a reload is already running
+        """
+        if self.reloading:
+            return False
+        threading.Thread(target=self.reload, name='kb-reload', daemon=True).start()
+        return True
+
+    def check(self):
+        """Reload if a watched file changed since the current snapshot was loaded"""
+        if self.source_stamp() != self._stamp:
+            return self.reload()
+        return False
+
+    def watch(self):
+        """
+        Poll the watched files every watch_interval seconds on a daemon thread.
+        Safe to call again after a fork: the thread is restarted in the child
+        (see gunicorn.conf.py).
+        """
+        if self.watch_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        self._watcher_pid = os.getpid()
+
+        def poll():
+            while True:
+                time.sleep(self.watch_interval)
+                try:
+                    self.check()
+                except Exception as e:
+                    print(f"⚠️ Knowledge base watcher error: {e}")
+
+        threading.Thread(target=poll, name='kb-watch', daemon=True).start()
+
+    def status(self):
+        kb = self.predictor.kb
+        return {
+            'version': self.version,
+            'source_digest': kb.source_digest,
+            'origin': kb.origin,
+            'diseases': len(kb.disease_names),
+            'symptoms': len(kb.symptom_vocab),
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.loaded_at)),
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'reloading': self.reloading,
+            'watch_interval': self.watch_interval
+        }
@@ -0,0 +1,200 @@
+"""
+Prediction result objects.
+
+match_disease used to return a fresh nested dict per call; successful
+predictions are now Prediction objects with __slots__ and one Alternative
+per alternative diagnosis. The accuracy level and message are one shared
+ACCURACY_LEVELS entry per result instead of two strings.
+
+Both classes are read-only Mappings with the keys (and key order) of the
+old dicts, so result['disease'], result.get(...), 'error' in result,
+dict(result) and comparisons with plain dicts keep working. They are not
+dicts, so json.dumps needs to_dict(); API responses are encoded by
+app/serialization.py, which writes them directly. Error results
+(need_more_symptoms, no_match, ...) are still plain dicts.
+
+RankedDisease is one entry of a differential diagnosis (rank_diseases).
+"""
+from collections.abc import Mapping
+
+# (minimum confidence, accuracy_level, accuracy_message), checked in order
+ACCURACY_LEVELS = (
+    (75, 'high', 'High confidence prediction'),
+    (50, 'medium', 'Moderate confidence - consider providing more symptoms'),
+    (float('-inf'), 'low', 'Low confidence - more symptoms needed for accurate diagnosis'),
+)
+
+
+def accuracy_level(confidence):
+    """Return the (minimum, level, message) entry of ACCURACY_LEVELS for a confidence"""
+    for entry in ACCURACY_LEVELS:
+        if confidence >= entry[0]:
+            return entry
+    return ACCURACY_LEVELS[-1]  # NaN
+
+
+class Alternative(Mapping):
+    """An alternative diagnosis: disease name and confidence"""
+    __slots__ = ('disease', 'confidence')
+
+    FIELDS = __slots__
+
+    def __init__(self, disease, confidence):
+        self.disease = disease
+        self.confidence = confidence
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return f'Alternative({self.disease!r}, {self.confidence!r})'
+
+    def to_dict(self):
+        return {'disease': self.disease, 'confidence': self.confidence}
+
+
+class Prediction(Mapping):
+    """
+    A successful match_disease result.
+
+    Args:
+        disease, description, specialist: Metadata of the best match
+        medications, procedures, precautions: Lists of strings
+        confidence: Score of the best match (0-100), rounded to 2 places
+        accuracy: ACCURACY_LEVELS entry, from the unrounded score
+        matched_symptoms: Input symptoms found in the best match
+        symptom_match_info: [{'original', 'matched', 'confidence'}, ...]
+        unknown_symptoms: Unresolved inputs, or None
+        total_symptoms_provided, recognized_symptoms: Input counts
+        alternative_diagnoses: List of Alternative, or None
+    """
+    __slots__ = (
+        'disease', 'description', 'medications', 'procedures', 'precautions', 'specialist',
+        'confidence', 'accuracy', 'matched_symptoms', 'symptom_match_info', 'unknown_symptoms',
+        'total_symptoms_provided', 'recognized_symptoms', 'alternative_diagnoses'
+    )
+
+    # Mapping keys, in the order of the dict match_disease used to return
+    FIELDS = (
+        'disease', 'description', 'medications', 'procedures', 'precautions', 'specialist',
+        'confidence', 'accuracy_level', 'accuracy_message', 'matched_symptoms', 'symptom_match_info',
+        'unknown_symptoms', 'total_symptoms_provided', 'recognized_symptoms', 'alternative_diagnoses'
+    )
+    FIELD_SET = frozenset(FIELDS)
+
+    def __init__(self, disease, description, medications, procedures, precautions, specialist,
+                 confidence, accuracy, matched_symptoms, symptom_match_info, unknown_symptoms,
+                 total_symptoms_provided, recognized_symptoms, alternative_diagnoses=None):
+        self.disease = disease
+        self.description = description
+        self.medications = medications
+        self.procedures = procedures
+        self.precautions = precautions
+        self.specialist = specialist
+        self.confidence = confidence
+        self.accuracy = accuracy
+        self.matched_symptoms = matched_symptoms
+        self.symptom_match_info = symptom_match_info
+        self.unknown_symptoms = unknown_symptoms
+        self.total_symptoms_provided = total_symptoms_provided
+        self.recognized_symptoms = recognized_symptoms
+        self.alternative_diagnoses = alternative_diagnoses
+
+    @property
+    def accuracy_level(self):
+        return self.accuracy[1]
+
+    @property
+    def accuracy_message(self):
+        return self.accuracy[2]
+
+    def __getitem__(self, key):
+        if key not in self.FIELD_SET or (key == 'alternative_diagnoses' and self.alternative_diagnoses is None):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    # get/__contains__ without the Mapping defaults' KeyError round trip; the
+    # response formatters call get() for every field
+    def get(self, key, default=None):
+        if key in self.FIELD_SET:
+            value = getattr(self, key)
+            if value is not None or key != 'alternative_diagnoses':
+                return value
+        return default
+
+    def __contains__(self, key):
+        return key in self.FIELD_SET and (key != 'alternative_diagnoses' or self.alternative_diagnoses is not None)
+
+    def __iter__(self):
+        if self.alternative_diagnoses is None:
+            return iter(self.FIELDS[:-1])
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS) - (self.alternative_diagnoses is None)
+
+    def __repr__(self):
+        return f'Prediction({self.disease!r}, confidence={self.confidence!r})'
+
+    def replace(self, **changes):
+        """Copy with some fields replaced"""
+        copy = object.__new__(Prediction)
+        for name in self.__slots__:
+            setattr(copy, name, changes.pop(name) if name in changes else getattr(self, name))
+        if changes:
+            raise TypeError(f'unknown fields: {", ".join(changes)}')
+        return copy
+
+    def to_dict(self):
+        """The result as a plain (JSON-serializable) dict"""
+        result = {key: self[key] for key in self}
+        if self.alternative_diagnoses is not None:
+            result['alternative_diagnoses'] = [alt.to_dict() for alt in self.alternative_diagnoses]
+        return result
+
+
+class RankedDisease(Mapping):
+    """
+    One entry of a differential diagnosis (SymptomPredictor.rank_diseases).
+
+    Args:
+        disease: Disease name
+        score: Weighted symptom score (0-100, rounded to 2 places)
+        coverage: Share of the disease's symptoms present in the input
+            (0-100, rounded to 2 places)
+        matched_symptoms: Input symptoms that count towards the disease
+    """
+    __slots__ = ('disease', 'score', 'coverage', 'matched_symptoms')
+
+    FIELDS = __slots__
+
+    def __init__(self, disease, score, coverage, matched_symptoms):
+        self.disease = disease
+        self.score = score
+        self.coverage = coverage
+        self.matched_symptoms = matched_symptoms
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return f'RankedDisease({self.disease!r}, score={self.score!r}, coverage={self.coverage!r})'
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.FIELDS}
@@ -0,0 +1,123 @@
+"""
+JSON encoding of API response bodies.
+
+dumps() returns the same text as Flask's jsonify outside debug mode (sorted
+keys, ASCII escapes, no whitespace; jsonify adds the trailing newline), so
+the Flask and ASGI servers keep returning byte-identical responses. What
+differs is how results are written:
+
+  - Prediction, Alternative and RankedDisease objects (app/results.py) are
+    written field by field from pre-encoded key fragments and accuracy
+    strings, without being converted to dicts first
+  - dicts and lists are only walked in Python when they contain one of those
+    (or another container); everything else goes to the C JSON encoder in
+    one call
+
+Response bodies only use string keys, which the walk relies on.
+"""
+import math
+from json.encoder import JSONEncoder, c_make_encoder, encode_basestring_ascii
+
+from app.results import ACCURACY_LEVELS, Alternative, Prediction, RankedDisease
+
+
+def _raise(obj):
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+if c_make_encoder is not None:
+    # JSONEncoder.encode builds a new C encoder on every call; build it once
+    _c_iterencode = c_make_encoder(None, _raise, encode_basestring_ascii, None, ':', ',', True, False, True)
+
+    def _encode(obj):
+        if type(obj) is str:
+            return encode_basestring_ascii(obj)
+        return ''.join(_c_iterencode(obj, 0))
+else:
+    _encode = JSONEncoder(ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode
+
+# Prediction fields in sorted key order start with these two
+_ACCURACY = {
+    level: f'{{"accuracy_level":{_encode(level)},"accuracy_message":{_encode(message)}'
+    for _, level, message in ACCURACY_LEVELS
+}
+
+_NESTED = frozenset((dict, list, Prediction, Alternative, RankedDisease))
+
+
+def _number(value):
+    if isinstance(value, float) and math.isfinite(value):
+        return float.__repr__(value)
+    return _encode(value)
+
+
+def _alternative(alt):
+    return f'{{"confidence":{_number(alt.confidence)},"disease":{_encode(alt.disease)}}}'
+
+
+def _ranked(entry):
+    return (f'{{"coverage":{_number(entry.coverage)},"disease":{_encode(entry.disease)}'
+            f',"matched_symptoms":{_encode(entry.matched_symptoms)},"score":{_number(entry.score)}}}')
+
+
+def _prediction(p):
+    parts = [_ACCURACY[p.accuracy[1]]]
+    if p.alternative_diagnoses is not None:
+        parts.append(',"alternative_diagnoses":[')
+        parts.append(','.join([_alternative(alt) for alt in p.alternative_diagnoses]))
+        parts.append(']')
+    parts.append(
+        f',"confidence":{_number(p.confidence)}'
+        f',"description":{_encode(p.description)}'
+        f',"disease":{_encode(p.disease)}'
+        f',"matched_symptoms":{_encode(p.matched_symptoms)}'
+        f',"medications":{_encode(p.medications)}'
+        f',"precautions":{_encode(p.precautions)}'
+        f',"procedures":{_encode(p.procedures)}'
+        f',"recognized_symptoms":{_encode(p.recognized_symptoms)}'
+        f',"specialist":{_encode(p.specialist)}'
+        f',"symptom_match_info":{_encode(p.symptom_match_info)}'
+        f',"total_symptoms_provided":{_encode(p.total_symptoms_provided)}'
+        f',"unknown_symptoms":{_encode(p.unknown_symptoms)}}}'
+    )
+    return ''.join(parts)
+
+
+def _write(obj, parts):
+    kind = type(obj)
+    if kind is Prediction:
+        parts.append(_prediction(obj))
+    elif kind is Alternative:
+        parts.append(_alternative(obj))
+    elif kind is RankedDisease:
+        parts.append(_ranked(obj))
+    elif kind is dict and any(type(value) in _NESTED for value in obj.values()):
+        separator = '{'
+        for key in sorted(obj):
+            parts.append(separator + encode_basestring_ascii(key) + ':')
+            _write(obj[key], parts)
+            separator = ','
+        parts.append('}')
+    elif kind is list and any(type(item) in _NESTED for item in obj):
+        separator = '['
+        for item in obj:
+            parts.append(separator)
+            _write(item, parts)
+            separator = ','
+        parts.append(']')
+    else:
+        parts.append(_encode(obj))
+
+
+def dumps(body):
+    """Encode a response body like Flask's jsonify, without the trailing newline"""
+    parts = []
+    _write(body, parts)
+    return ''.join(parts)
+
+
+def json_default(obj):
+    """json.dumps default= hook for result objects"""
+    if isinstance(obj, (Prediction, Alternative, RankedDisease)):
+        return obj.to_dict()
+    _raise(obj)
@@ -0,0 +1,312 @@
+"""
+Conversational symptom sessions.
+
+The chat sends one message per turn. Without sessions every turn is scored
+on its own (or the client has to resend everything said so far, which is
+re-parsed, re-matched and re-scored). A SymptomSession keeps the canonical
+symptoms of a conversation and the running weighted sum of every disease
+that one of them earns credit for, so a turn only touches the diseases
+affected by the symptoms it adds or removes:
+
+  - adding symptom j adds weight[j] * match_scores[d, j] / 100 to each
+    disease d in its posting list (diseases it is not listed for would add
+    0). Symptoms are summed in the order they were added, exactly like
+    SymptomPredictor._score_diseases, so scores (and therefore tie
+    breaking) are bit-identical to a full match_disease over the same
+    symptoms
+  - removing a symptom re-sums only the diseases in its posting list over
+    the remaining symptoms, in order, for the same reason
+
+The rows with credit are kept as a sorted array next to their sums, so the
+session is already in the (rows, scores) layout ranking expects.
+
+Sessions are plain dicts in a SessionStore between requests:
+
+  - MemorySessionStore: bounded LRU with TTL, per process
+  - SQLiteSessionStore: a SQLite file shared by every worker process on the
+    machine, standing in for a networked store such as Redis
+
+A conversation's turns can reach different workers, so the in-memory store
+is only the default for a single process: with WEB_CONCURRENCY above 1, or
+more than one gunicorn worker (gunicorn.conf.py), SESSION_STORE defaults to
+sqlite.
+
+Concurrent turns on the same session are last-writer-wins.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from app.cache import LRUCache
+from app.knowledge_base import DEFAULT_DATA_DIR
+
+STORE_KINDS = ('memory', 'sqlite')
+
+
+class SymptomSession:
+    """
+    Canonical symptoms of one conversation and their per-disease sums.
+    Unrecognized symptoms are not kept: they only affect the turn they were
+    sent in.
+
+    Args:
+        session_id: Client-chosen session identifier
+        kb_digest: source_digest of the knowledge base the sums belong to
+    """
+    # Sorted disease rows with credit from some symptom, their running
+    # matched weight and how many symptoms contribute to it
+    ARRAYS = {'rows': np.intp, 'sums': np.float64, 'counts': np.int32}
+
+    def __init__(self, session_id, kb_digest=None):
+        self.session_id = session_id
+        self.kb_digest = kb_digest
+        self._clear()
+
+    def _clear(self):
+        self.symptoms = []
+        self.matched_info = []
+        for name, dtype in self.ARRAYS.items():
+            setattr(self, name, np.empty(0, dtype=dtype))
+
+    def _postings(self, kb, symptom):
+        j = kb.symptom_ids[symptom]
+        return kb.postings[kb.postings_indptr[j]:kb.postings_indptr[j + 1]], j
+
+    def add(self, kb, matched_info):
+        """
+        Add resolved symptoms (the matched_info of SymptomPredictor.canonicalize),
+        ignoring those already in the session.
+
+        Returns:
+            List of canonical symptoms that were added
+        """
+        added = []
+        for info in matched_info:
+            symptom = info['matched']
+            if symptom in self.symptoms:
+                continue
+            self.symptoms.append(symptom)
+            self.matched_info.append(info)
+            added.append(symptom)
+
+            postings, j = self._postings(kb, symptom)
+            rows = np.union1d(self.rows, postings)
+            sums = np.zeros(len(rows))
+            counts = np.zeros(len(rows), dtype=np.int32)
+            kept = np.searchsorted(rows, self.rows)
+            sums[kept] = self.sums
+            counts[kept] = self.counts
+            touched = np.searchsorted(rows, postings)
+            sums[touched] += kb.weight_vector[j] * (kb.match_scores[postings, j] / 100)
+            counts[touched] += 1
+            self.rows, self.sums, self.counts = rows, sums, counts
+        return added
+
+    def remove(self, kb, symptom):
+        """
+        Remove a canonical symptom.
+
+        Returns:
+            True if the session held it
+        """
+        if symptom not in self.symptoms:
+            return False
+        k = self.symptoms.index(symptom)
+        del self.symptoms[k]
+        del self.matched_info[k]
+
+        postings, _ = self._postings(kb, symptom)
+        touched = np.searchsorted(self.rows, postings)
+        self.counts[touched] -= 1
+        # Re-sum the touched rows in symptom order rather than subtracting,
+        # which could leave rounding residue and break exact ties
+        sums = np.zeros(len(postings))
+        for sym in self.symptoms:
+            j = kb.symptom_ids[sym]
+            sums += kb.weight_vector[j] * (kb.match_scores[postings, j] / 100)
+        self.sums[touched] = sums
+
+        keep = self.counts > 0
+        self.rows, self.sums, self.counts = self.rows[keep], self.sums[keep], self.counts[keep]
+        return True
+
+    def sync(self, kb):
+        """Recompute the sums if kb is not the knowledge base they were built on"""
+        if self.kb_digest == kb.source_digest:
+            return
+        matched_info = [info for info in self.matched_info if info['matched'] in kb.symptom_ids]
+        self._clear()
+        self.add(kb, matched_info)
+        self.kb_digest = kb.source_digest
+
+    def scores(self, kb):
+        """
+        (rows, scores, matched) in the layout of SymptomPredictor._score_diseases
+        for the diseases the session's symptoms earn credit for.
+        """
+        ids = np.array([kb.symptom_ids[sym] for sym in self.symptoms], dtype=np.intp)
+        scores = (self.sums / kb.weight_vector[ids].sum()) * 100
+        matched = kb.match_scores[self.rows[:, None], ids[None, :]] > 0
+        return self.rows, scores, matched
+
+    def canonical(self, unknown_symptoms=()):
+        """The session plus a turn's unknown symptoms as a SymptomPredictor.canonicalize tuple"""
+        user_symptoms = [info['original'] for info in self.matched_info] + list(unknown_symptoms)
+        return user_symptoms, list(self.symptoms), list(unknown_symptoms), list(self.matched_info)
+
+    def summary(self):
+        return {'id': self.session_id, 'symptoms': list(self.symptoms)}
+
+    def to_dict(self):
+        """
+        Snapshot of the session that shares nothing with it: JSON-serializable
+        fields plus the ARRAYS as numpy arrays.
+        """
+        data = {
+            'session_id': self.session_id,
+            'kb_digest': self.kb_digest,
+            'symptoms': list(self.symptoms),
+            'matched_info': list(self.matched_info)
+        }
+        for name in self.ARRAYS:
+            data[name] = getattr(self, name).copy()
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        session = cls(data['session_id'], data.get('kb_digest'))
+        session.symptoms = list(data['symptoms'])
+        session.matched_info = list(data['matched_info'])
+        for name, dtype in cls.ARRAYS.items():
+            setattr(session, name, np.array(data[name], dtype=dtype))
+        return session
+
+
+class MemorySessionStore:
+    """In-process session store: bounded LRU with TTL (refreshed on every save)"""
+    kind = 'memory'
+
+    def __init__(self, max_sessions=10000, ttl=1800):
+        self.cache = LRUCache(max_sessions, ttl)
+
+    def get(self, session_id):
+        data = self.cache.get(session_id)
+        return SymptomSession.from_dict(data) if data is not None else None
+
+    def save(self, session):
+        # Stored as a snapshot so concurrent requests never share a session object
+        self.cache.put(session.session_id, session.to_dict())
+
+    def delete(self, session_id):
+        return self.cache.pop(session_id) is not None
+
+    def stats(self):
+        return dict(self.cache.stats(), kind=self.kind)
+
+
+class SQLiteSessionStore:
+    """
+    Session store in a SQLite file, shared by all processes that open it.
+    The session arrays are stored as raw bytes next to a JSON document.
+    Expired sessions are purged on write, and the sessions closest to
+    expiring are evicted past max_sessions.
+    """
+    kind = 'sqlite'
+
+    def __init__(self, path, max_sessions=10000, ttl=1800):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # Nothing is opened here: the store is built at import time, and with
+        # preload_app a connection opened in the gunicorn master would be
+        # inherited by every worker. Connections belong to the process (and
+        # thread) that opened them instead.
+        self._pid = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # One connection per thread; WAL lets readers run while another process writes
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Forked: connections inherited from the parent must not be used
+                    self._local = threading.local()
+                    self._pid = os.getpid()
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS sessions ('
+                    'id TEXT PRIMARY KEY, data TEXT NOT NULL, rows BLOB, sums BLOB, counts BLOB, '
+                    'expires_at REAL NOT NULL)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)')
+            local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        row = self._connect().execute(
+            'SELECT data, rows, sums, counts FROM sessions WHERE id = ? AND expires_at > ?',
+            (session_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        for (name, dtype), blob in zip(SymptomSession.ARRAYS.items(), row[1:]):
+            data[name] = np.frombuffer(blob, dtype=dtype)
+        return SymptomSession.from_dict(data)
+
+    def save(self, session):
+        data = session.to_dict()
+        blobs = [data.pop(name).tobytes() for name in SymptomSession.ARRAYS]
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO sessions (id, data, rows, sums, counts, expires_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [session.session_id, json.dumps(data)] + blobs + [now + self.ttl]
+            )
+            conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,))
+            conn.execute(
+                'DELETE FROM sessions WHERE id IN ('
+                'SELECT id FROM sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_sessions,)
+            )
+
+    def delete(self, session_id):
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,)).rowcount > 0
+
+    def stats(self):
+        size = self._connect().execute(
+            'SELECT COUNT(*) FROM sessions WHERE expires_at > ?', (time.time(),)
+        ).fetchone()[0]
+        return {'kind': self.kind, 'size': size, 'max_size': self.max_sessions, 'ttl': self.ttl}
+
+
+def build_store(kind=None):
+    """
+    Session store from SESSION_STORE (memory or sqlite), SESSION_MAX_ENTRIES,
+    SESSION_TTL_SECONDS and SESSION_DB_PATH. SESSION_STORE defaults to
+    sqlite when WEB_CONCURRENCY asks for several worker processes.
+    """
+    if kind is None:
+        default = 'sqlite' if int(os.environ.get('WEB_CONCURRENCY') or 1) > 1 else 'memory'
+        kind = os.environ.get('SESSION_STORE', default).lower()
+    if kind not in STORE_KINDS:
+        raise ValueError(f"Unknown session store '{kind}', expected one of {', '.join(STORE_KINDS)}")
+    max_sessions = int(os.environ.get('SESSION_MAX_ENTRIES', 10000))
+    ttl = float(os.environ.get('SESSION_TTL_SECONDS', 1800))
+    if kind == 'sqlite':
+        path = os.environ.get('SESSION_DB_PATH') or os.path.join(DEFAULT_DATA_DIR, 'sessions.db')
+        return SQLiteSessionStore(path, max_sessions, ttl)
+    return MemorySessionStore(max_sessions, ttl)
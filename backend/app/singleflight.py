@@ -0,0 +1,97 @@
+import threading
+
+
+class _Call:
+    """A computation in flight and its outcome"""
+    __slots__ = ('done', 'value', 'ok')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.ok = False
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one computation.
+
+    The first caller for a key (the leader) computes the value; callers
+    arriving with the same key while it runs wait for it and share the
+    result instead of computing it again. Nothing is kept once the leader
+    finishes: a later call computes afresh (that is what a cache is for).
+
+    A waiting caller gives up after timeout seconds, or when the leader's
+    computation raised, and computes the value itself, so coalescing never
+    makes a request fail where it would have succeeded on its own.
+    Counters mirror LRUCache so they can be exposed the same way.
+    """
+
+    # Outcomes returned by do()
+    LEADER = 'leader'
+    COALESCED = 'coalesced'
+    TIMEOUT = 'timeout'
+    LEADER_FAILED = 'leader_failed'
+
+    def __init__(self, timeout=1.0):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.leader_failures = 0
+
+    def do(self, key, compute):
+        """
+        Return (compute() or the in-flight leader's result for key, outcome).
+
+        Args:
+            key: hashable identity of the computation
+            compute: callable without arguments; its result is shared with
+                concurrent callers, so it must not be mutated afterwards
+
+        Returns:
+            (value, outcome) where outcome is LEADER, COALESCED, TIMEOUT or
+            LEADER_FAILED (the last two computed by this caller)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+
+        if leader:
+            try:
+                call.value = compute()
+                call.ok = True
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.value, self.LEADER
+
+        finished = call.done.wait(self.timeout)
+        with self._lock:
+            if finished and call.ok:
+                self.coalesced += 1
+                return call.value, self.COALESCED
+            if finished:
+                self.leader_failures += 1
+            else:
+                self.timeouts += 1
+        return compute(), self.LEADER_FAILED if finished else self.TIMEOUT
+
+    def stats(self):
+        """Return in-flight and outcome counters"""
+        with self._lock:
+            calls = self.leaders + self.coalesced + self.timeouts + self.leader_failures
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'timeouts': self.timeouts,
+                'leader_failures': self.leader_failures,
+                'coalesced_rate': round(self.coalesced / calls, 4) if calls else 0.0,
+                'timeout': self.timeout
+            }
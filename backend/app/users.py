@@ -0,0 +1,331 @@
+"""
+User accounts for /api/login and /api/signup.
+
+Accounts used to live in a module-level dict with plaintext passwords: each
+gunicorn worker had its own copy, signups were lost on restart and only
+reached the worker that handled them. UserStore keeps them in a SQLite file
+shared by every worker on the machine:
+
+  - WAL journal, so logins (reads) never wait for a signup (write) from
+    another worker
+  - a unique index on email: lookups are an index seek instead of a table
+    scan, and two concurrent signups for one email cannot both succeed
+  - a small pool of connections per process, handed to one thread at a
+    time; every query is a constant SQL string, which sqlite3 compiles once
+    per connection and reuses from its statement cache
+  - passwords stored as salted PBKDF2-HMAC-SHA256 hashes. Hashing costs
+    ~0.1 s of CPU by design, so it runs in a bounded thread pool (hashlib
+    releases the GIL while hashing); when too many hashes are pending,
+    requests fail fast with UserStoreBusy instead of queueing without limit
+
+The pool bounds how many hashes run at once, but login() and signup() still
+block the calling thread until the hash is done (and for up to 5 s waiting
+for a slot). That is fine for gunicorn's one-request-per-thread workers.
+The ASGI server uses login_async() and signup_async() instead: they await the
+hash on the event loop, so a burst of logins doesn't hold the threads that
+serve /api/analyze.
+
+The store is opened lazily (by the first login or signup), so every worker
+process opens its own connections after forking.
+"""
+import asyncio
+import base64
+import contextlib
+import hashlib
+import hmac
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.knowledge_base import DEFAULT_DATA_DIR
+
+HASH_ALGORITHM = 'pbkdf2_sha256'
+DEFAULT_ITERATIONS = 600000
+
+# Development accounts, created when missing (USER_SEED_DEMO=false to skip)
+DEMO_USERS = (
+    ('Admin User', 'admin@example.com', 'admin123'),
+    ('Test User', 'user@example.com', 'user123'),
+)
+
+_SELECT_USER = 'SELECT username, password_hash FROM users WHERE email = ?'
+_EMAIL_EXISTS = 'SELECT 1 FROM users WHERE email = ?'
+_INSERT_USER = 'INSERT INTO users (email, username, password_hash, created_at) VALUES (?, ?, ?, ?)'
+
+
+class UserStoreBusy(RuntimeError):
+    """Raised when no connection or hashing slot frees up in time"""
+
+
+class ConnectionPool:
+    """
+    Up to `size` SQLite connections, each used by one thread at a time.
+
+    Args:
+        path: Database file
+        size: Maximum number of open connections
+        timeout: Seconds to wait for a free connection (and for SQLite locks)
+    """
+
+    def __init__(self, path, size=4, timeout=5.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise UserStoreBusy('No database connection available')
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class PasswordHasher:
+    """
+    PBKDF2-HMAC-SHA256 hashing on a bounded thread pool.
+
+    Hashes are stored as 'pbkdf2_sha256$<iterations>$<salt>$<hash>' (base64
+    salt and hash), so records keep verifying after the iteration count
+    changes.
+
+    Args:
+        iterations: PBKDF2 iterations for new hashes
+        workers: Threads hashing at the same time
+        max_pending: Hashes running or queued before UserStoreBusy is raised
+        timeout: Seconds hash() and verify() wait for a free hashing slot
+            (the async variants don't wait)
+    """
+
+    def __init__(self, iterations=DEFAULT_ITERATIONS, workers=2, max_pending=64, timeout=5.0):
+        self.iterations = iterations
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pbkdf2')
+        self._dummy = None
+
+    def _submit(self, fn, *args, wait=True):
+        """
+        Queue fn on the hashing pool and return its Future. Waits up to
+        timeout for a pending slot, or fails at once when wait is False.
+        """
+        acquired = self._pending.acquire(timeout=self.timeout) if wait else self._pending.acquire(blocking=False)
+        if not acquired:
+            raise UserStoreBusy('Too many password checks in progress')
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def _run(self, fn, *args):
+        # Blocks the calling thread until the hash is done
+        return self._submit(fn, *args).result()
+
+    async def _run_async(self, fn, *args):
+        # Never blocks the event loop: no slot means UserStoreBusy right away
+        return await asyncio.wrap_future(self._submit(fn, *args, wait=False))
+
+    @staticmethod
+    def _derive(password, salt, iterations):
+        return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+
+    def _encode(self, password):
+        salt = secrets.token_bytes(16)
+        digest = self._derive(password, salt, self.iterations)
+        return '$'.join((HASH_ALGORITHM, str(self.iterations),
+                         base64.b64encode(salt).decode('ascii'), base64.b64encode(digest).decode('ascii')))
+
+    def _check(self, password, encoded):
+        try:
+            algorithm, iterations, salt, digest = encoded.split('$')
+            salt, digest, iterations = base64.b64decode(salt), base64.b64decode(digest), int(iterations)
+        except ValueError:
+            return False
+        if algorithm != HASH_ALGORITHM:
+            return False
+        return hmac.compare_digest(self._derive(password, salt, iterations), digest)
+
+    def hash(self, password):
+        """Return the encoded hash of a new password"""
+        return self._run(self._encode, password)
+
+    def verify(self, password, encoded):
+        """Check a password against an encoded hash"""
+        return self._run(self._check, password, encoded)
+
+    def verify_dummy(self, password):
+        """
+        Spend the time of a real check for an unknown account, so response
+        times don't reveal which emails are registered.
+        """
+        if self._dummy is None:
+            self._dummy = self.hash(secrets.token_hex(16))
+        self.verify(password, self._dummy)
+
+    async def hash_async(self, password):
+        """hash() awaited instead of blocking"""
+        return await self._run_async(self._encode, password)
+
+    async def verify_async(self, password, encoded):
+        """verify() awaited instead of blocking"""
+        return await self._run_async(self._check, password, encoded)
+
+    async def verify_dummy_async(self, password):
+        """verify_dummy() awaited instead of blocking"""
+        if self._dummy is None:
+            self._dummy = await self.hash_async(secrets.token_hex(16))
+        await self.verify_async(password, self._dummy)
+
+    def stats(self):
+        return {'iterations': self.iterations, 'hash_workers': self.workers, 'max_pending': self.max_pending}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class UserStore:
+    """
+    User accounts in a SQLite file.
+
+    Args:
+        path: Database file (created if missing)
+        pool_size: Connections per process
+        hasher: PasswordHasher (one with default settings if None)
+        seed_demo: Create the DEMO_USERS accounts if missing
+    """
+
+    def __init__(self, path, pool_size=4, hasher=None, seed_demo=True):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        self.hasher = hasher or PasswordHasher()
+        with self.pool.connection() as conn, conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS users ('
+                'id INTEGER PRIMARY KEY, email TEXT NOT NULL, username TEXT NOT NULL, '
+                'password_hash TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users (email)')
+        if seed_demo:
+            for username, email, password in DEMO_USERS:
+                try:
+                    self.signup(username, email, password)
+                except ValueError:
+                    pass
+
+    def login(self, email, password):
+        """
+        Check credentials.
+
+        Returns:
+            {'email', 'username'} of the account, or None if the email is
+            unknown or the password is wrong
+        """
+        row = self._find(email)
+        if row is None:
+            self.hasher.verify_dummy(password)
+            return None
+        if not self.hasher.verify(password, row[1]):
+            return None
+        return {'email': email, 'username': row[0]}
+
+    async def login_async(self, email, password):
+        """login() for the event loop: queries run in a thread, the hash is awaited"""
+        row = await asyncio.to_thread(self._find, email)
+        if row is None:
+            await self.hasher.verify_dummy_async(password)
+            return None
+        if not await self.hasher.verify_async(password, row[1]):
+            return None
+        return {'email': email, 'username': row[0]}
+
+    def signup(self, username, email, password):
+        """
+        Create an account.
+
+        Raises:
+            ValueError: If the email is already registered
+        """
+        # Checked before hashing so a duplicate doesn't cost a hash; the
+        # unique index catches signups racing for the same email
+        self._check_new(email)
+        self._insert(username, email, self.hasher.hash(password))
+        return True
+
+    async def signup_async(self, username, email, password):
+        """signup() for the event loop: queries run in a thread, the hash is awaited"""
+        await asyncio.to_thread(self._check_new, email)
+        password_hash = await self.hasher.hash_async(password)
+        await asyncio.to_thread(self._insert, username, email, password_hash)
+        return True
+
+    def _find(self, email):
+        with self.pool.connection() as conn:
+            return conn.execute(_SELECT_USER, (email,)).fetchone()
+
+    def _check_new(self, email):
+        with self.pool.connection() as conn:
+            if conn.execute(_EMAIL_EXISTS, (email,)).fetchone():
+                raise ValueError("User already exists")
+
+    def _insert(self, username, email, password_hash):
+        try:
+            with self.pool.connection() as conn, conn:
+                conn.execute(_INSERT_USER, (email, username, password_hash, time.time()))
+        except sqlite3.IntegrityError:
+            raise ValueError("User already exists")
+
+    def stats(self):
+        with self.pool.connection() as conn:
+            users = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        return dict(self.hasher.stats(), users=users, pool_size=self.pool.size)
+
+    def close(self):
+        self.pool.close()
+        self.hasher.close()
+
+
+def build_store():
+    """
+    User store from USER_DB_PATH, USER_DB_POOL_SIZE, USER_HASH_ITERATIONS,
+    USER_HASH_WORKERS, USER_HASH_MAX_PENDING and USER_SEED_DEMO.
+    """
+    path = os.environ.get('USER_DB_PATH') or os.path.join(DEFAULT_DATA_DIR, 'users.db')
+    hasher = PasswordHasher(
+        iterations=int(os.environ.get('USER_HASH_ITERATIONS', DEFAULT_ITERATIONS)),
+        workers=int(os.environ.get('USER_HASH_WORKERS', 2)),
+        max_pending=int(os.environ.get('USER_HASH_MAX_PENDING', 64))
+    )
+    seed_demo = os.environ.get('USER_SEED_DEMO', 'true').lower() in ('1', 'true', 'yes')
+    return UserStore(path, int(os.environ.get('USER_DB_POOL_SIZE', 4)), hasher, seed_demo)
@@ -0,0 +1,284 @@
+"""
+ASGI entry point for the SymptomAI backend.
+
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+
+Serves the same routes as api_server.py (the Flask app keeps working
+unchanged) using the same request handlers, so response bodies and status
+codes are identical. The difference is how requests are scheduled:
+  - the event loop only parses requests and writes responses; matching runs
+    on a bounded thread pool (ASGI_EXECUTOR_WORKERS). Login and signup await
+    their password hash on the loop (app/users.py) instead of holding a pool
+    thread for it, so a burst of logins can't starve /api/analyze
+  - at most ASGI_QUEUE_LIMIT requests may be running or waiting for the pool;
+    past that the server answers 503 with a Retry-After header right away
+    instead of letting latency grow without bound
+  - request bodies larger than ASGI_MAX_BODY_BYTES are rejected with 413
+
+See benchmarks/load_test.py for a throughput and tail latency comparison
+with the Flask app under gunicorn.
+"""
+import asyncio
+import functools
+import json
+import os
+import re
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import api_server
+from app import metrics
+from app.serialization import dumps
+
+EXECUTOR_WORKERS = int(os.environ.get('ASGI_EXECUTOR_WORKERS', min(32, (os.cpu_count() or 1) + 4)))
+QUEUE_LIMIT = int(os.environ.get('ASGI_QUEUE_LIMIT', 64))
+RETRY_AFTER_SECONDS = int(os.environ.get('ASGI_RETRY_AFTER_SECONDS', 1))
+MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 10 * 1024 * 1024))
+
+ROUTES = {
+    ('POST', '/api/analyze'): api_server.analyze_request,
+    ('POST', '/api/analyze/batch'): api_server.analyze_batch_request,
+    ('POST', '/api/login'): api_server.login_request_async,
+    ('POST', '/api/signup'): api_server.signup_request_async,
+    ('POST', '/api/admin/reload'): api_server.reload_request,
+}
+
+# Routes with path parameters: (method, pattern, metrics endpoint label, handler).
+# Captured groups are passed to the handler before get_json.
+PATTERN_ROUTES = [
+    ('POST', re.compile(r'/api/sessions/([^/]+)/symptoms'), '/api/sessions/{id}/symptoms',
+     api_server.session_symptoms_request),
+    ('DELETE', re.compile(r'/api/sessions/([^/]+)/symptoms/(.+)'), '/api/sessions/{id}/symptoms/{symptom}',
+     api_server.remove_session_symptom_request),
+    ('GET', re.compile(r'/api/sessions/([^/]+)'), '/api/sessions/{id}', api_server.session_request),
+    ('DELETE', re.compile(r'/api/sessions/([^/]+)'), '/api/sessions/{id}', api_server.delete_session_request),
+]
+
+# Coroutine handlers, awaited on the event loop instead of run on the executor
+ASYNC_HANDLERS = {
+    api_server.login_request_async,
+    api_server.signup_request_async,
+}
+
+# Handlers that take the ?format= query value
+FORMAT_HANDLERS = {
+    api_server.analyze_request,
+    api_server.analyze_batch_request,
+    api_server.session_symptoms_request,
+}
+
+# Cheap endpoints answered on the event loop, outside admission control, so
+# health checks keep working while the executor is saturated
+INLINE_ROUTES = {
+    ('GET', '/api/health'): api_server.health_status,
+    ('GET', '/'): api_server.api_info,
+}
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+]
+
+
+class Backpressure:
+    """
+    Admission control for the executor.
+    Counts requests that are running or queued for a worker thread; all
+    updates happen on the event loop thread so no lock is needed.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self):
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'limit': self.limit,
+            'rejected': self.rejected,
+            'executor_workers': EXECUTOR_WORKERS
+        }
+
+
+executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix='analyze')
+backpressure = Backpressure(QUEUE_LIMIT)
+
+metrics.REGISTRY.register_collector(lambda: [
+    ('symptomai_asgi_in_flight', 'gauge', 'Requests running or waiting for an executor thread.',
+     [({}, backpressure.in_flight)]),
+    ('symptomai_asgi_queue_limit', 'gauge', 'Requests admitted before answering 503.',
+     [({}, backpressure.limit)]),
+    ('symptomai_asgi_rejected_total', 'counter', 'Requests rejected with 503 because the queue was full.',
+     [({}, backpressure.rejected)]),
+])
+
+
+def match_route(method, path):
+    """
+    Find the handler for a request.
+    Returns (endpoint, handler, path_args), or (None, None, allowed) where
+    allowed tells whether the path exists for some other method.
+    """
+    handler = ROUTES.get((method, path))
+    if handler is not None:
+        return path, handler, ()
+    allowed = path == '/api/metrics' or any(route_path == path for _, route_path in list(ROUTES) + list(INLINE_ROUTES))
+    for route_method, pattern, endpoint, handler in PATTERN_ROUTES:
+        match = pattern.fullmatch(path)
+        if match is None:
+            continue
+        if route_method == method:
+            return endpoint, handler, match.groups()
+        allowed = True
+    return None, None, allowed
+
+
+def encode_json(body):
+    """Serialize like Flask's jsonify so both servers return the same bytes"""
+    return (dumps(body) + '\n').encode('utf-8')
+
+
+def json_loader(headers, raw):
+    """Build the get_json callable passed to the shared handlers"""
+    def get_json():
+        content_type = headers.get(b'content-type', b'').decode('latin-1').lower()
+        if not content_type.startswith('application/json'):
+            raise ValueError("Did not attempt to load JSON data because the request "
+                             "Content-Type was not 'application/json'.")
+        return json.loads(raw)
+    return get_json
+
+
+async def read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise OverflowError
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def send_response(send, status, body, extra_headers=(), content_type=b'application/json'):
+    payload = encode_json(body) if content_type == b'application/json' else body.encode('utf-8')
+    headers = [
+        (b'content-type', content_type),
+        (b'content-length', str(len(payload)).encode()),
+    ] + CORS_HEADERS + list(extra_headers)
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+def timing_headers(timing):
+    return [(b'server-timing', timing.encode('latin-1'))] if timing else []
+
+
+async def send_preflight(send, headers):
+    requested = headers.get(b'access-control-request-headers')
+    response_headers = CORS_HEADERS + [
+        (b'access-control-allow-methods', b'DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT'),
+        (b'content-length', b'0'),
+    ]
+    if requested:
+        response_headers.append((b'access-control-allow-headers', requested))
+    await send({'type': 'http.response.start', 'status': 200, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if api_server.predictor is None or api_server.greeter is None:
+                print("⚠️ ASGI server starting without initialized backend components", flush=True)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False, cancel_futures=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    method, path = scope['method'], scope['path']
+    headers = dict(scope['headers'])
+
+    if method == 'OPTIONS':
+        await send_preflight(send, headers)
+        return
+
+    if (method, path) == ('GET', '/api/metrics'):
+        await send_response(send, 200, metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE.encode())
+        return
+
+    inline = INLINE_ROUTES.get((method, path))
+    if inline is not None:
+        body, status, timing = api_server.run_handler(path, inline)
+        if path == '/api/health':
+            body['server'] = {'type': 'asgi', 'backpressure': backpressure.stats()}
+        await send_response(send, status, body, timing_headers(timing))
+        return
+
+    endpoint, handler, path_args = match_route(method, path)
+    if handler is None:
+        # path_args is the method-not-allowed flag here
+        if path_args:
+            await send_response(send, 405, {'error': 'Method not allowed'})
+        else:
+            await send_response(send, 404, {'error': 'Not found'})
+        return
+
+    if not backpressure.try_acquire():
+        await send_response(
+            send, 503,
+            {'error': 'Server busy', 'message': 'Too many requests in progress, please retry shortly.'},
+            [(b'retry-after', str(RETRY_AFTER_SECONDS).encode())]
+        )
+        return
+
+    try:
+        try:
+            raw = await read_body(receive)
+        except OverflowError:
+            await send_response(send, 413, {'error': 'Request body too large'})
+            return
+        if raw is None:
+            return
+
+        if handler in ASYNC_HANDLERS:
+            run = api_server.run_handler_async(endpoint, handler, *path_args, json_loader(headers, raw))
+        else:
+            call = functools.partial(api_server.run_handler, endpoint, handler, *path_args, json_loader(headers, raw))
+            if handler in FORMAT_HANDLERS:
+                query = parse_qs(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True)
+                call = functools.partial(call, response_format=query.get('format', ['full'])[0])
+            run = asyncio.get_running_loop().run_in_executor(executor, call)
+        try:
+            body, status, timing = await run
+        except Exception as e:
+            api_server.logger.error("Exception occurred: %s", e)
+            traceback.print_exc()
+            body, status, timing = {'error': 'Internal server error'}, 500, None
+        await send_response(send, status, body, timing_headers(timing))
+    finally:
+        backpressure.release()
@@ -0,0 +1,169 @@
+"""
+Compare top-k differential diagnosis with and without the upper-bound cutoff.
+
+For random symptom sets (1-8 symptoms from the vocabulary) the top --k
+diseases are computed three ways for each ranking (score, coverage, blend):
+
+  sort    score every disease sharing a symptom with the input and sort all
+          of them (np.lexsort)
+  heap    score them all and select the top k with heapq.nlargest, as
+          match_disease ranks its alternatives
+  rank    SymptomPredictor.rank_canonical: bounds from the inverted index,
+          exact scores only for the diseases that can still make the top k
+
+At --scales 1 the real disease table is used; at larger scales a random one
+with scale times as many diseases (random_kb: every disease gets its own
+random symptom set and the symptoms random severity weights, so unlike the
+repeated table of parallel_scoring.py ties are not built in). Reported per scale: mean milliseconds per query for
+each path and the share of candidate diseases rank_canonical scored. Every
+rank result is checked against the sorted one.
+
+Usage (from backend/):
+    python benchmarks/differential.py --scales 1 100 1000 --k 10
+"""
+import argparse
+import contextlib
+import heapq
+import io
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+from app.knowledge_base import KnowledgeBase, build_matrices  # noqa: E402
+
+
+def random_kb(kb, diseases, seed=0):
+    """
+    Random disease table over kb's vocabulary: each disease has 3-17 symptoms
+    drawn at random and each symptom a random weight in [1, 7)
+    """
+    rng = np.random.default_rng(seed)
+    vocab = kb.symptom_vocab
+    disease_symptoms = [
+        [vocab[i] for i in rng.choice(len(vocab), size=rng.integers(3, 18), replace=False)]
+        for _ in range(diseases)
+    ]
+    incidence, match_scores = build_matrices(vocab, disease_symptoms, kb.neighbours)
+    weight_vector = rng.uniform(1, 7, size=len(vocab))
+    base = list(kb.disease_metadata)
+    records = [dict(base[i % len(base)], disease=f'Disease {i}') for i in range(diseases)]
+    return KnowledgeBase(
+        vocab, dict(zip(vocab, weight_vector.tolist())), records,
+        incidence, match_scores, weight_vector,
+        source_digest=f'random-{diseases}-{seed}-{kb.source_digest}', origin='synthetic',
+        neighbours=kb.neighbours
+    )
+
+
+def rank_values(rank_by, blend, scores, coverage):
+    if rank_by == 'score':
+        return scores
+    if rank_by == 'coverage':
+        return coverage
+    return blend * scores + (1 - blend) * coverage
+
+
+def full_scores(predictor, canonical):
+    rows = predictor._candidate_rows([canonical[1]])
+    scores, coverage, matched = predictor._score_diseases([canonical[1]], rows)
+    return rows, scores[0], coverage[0], matched[0]
+
+
+def top_sorted(predictor, canonical, k, rank_by, blend):
+    rows, scores, coverage, matched = full_scores(predictor, canonical)
+    values = rank_values(rank_by, blend, scores, coverage)
+    best = np.lexsort((rows, -values))[:k]
+    return [(predictor.kb.disease_names[rows[i]], round(float(scores[i]), 2), round(float(coverage[i]), 2))
+            for i in best]
+
+
+def top_heap(predictor, canonical, k, rank_by, blend):
+    rows, scores, coverage, matched = full_scores(predictor, canonical)
+    values = rank_values(rank_by, blend, scores, coverage)
+    return heapq.nlargest(k, range(len(rows)), key=lambda r: (values[r], -rows[r]))
+
+
+def run(predictor, cases, k, rank_by, blend):
+    scored = []
+    score_diseases = predictor._score_diseases
+
+    def counting(processed_cases, rows):
+        scored[-1] += len(rows)
+        return score_diseases(processed_cases, rows)
+
+    timings = {'sort': 0.0, 'heap': 0.0, 'rank': 0.0}
+    candidates = mismatches = 0
+    for canonical in cases:
+        start = time.perf_counter()
+        expected = top_sorted(predictor, canonical, k, rank_by, blend)
+        timings['sort'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        top_heap(predictor, canonical, k, rank_by, blend)
+        timings['heap'] += time.perf_counter() - start
+
+        scored.append(0)
+        predictor._score_diseases = counting
+        start = time.perf_counter()
+        ranked = predictor.rank_canonical(canonical, k, rank_by, blend)
+        timings['rank'] += time.perf_counter() - start
+        del predictor._score_diseases
+
+        candidates += len(predictor._candidate_rows([canonical[1]]))
+        got = [(entry.disease, entry.score, entry.coverage) for entry in ranked]
+        mismatches += got != [(name, score, coverage) for name, score, coverage in expected]
+
+    report = {f'{name}_ms': round(total / len(cases) * 1000, 3) for name, total in timings.items()}
+    report['scored'] = round(sum(scored) / candidates, 3) if candidates else 0
+    report['mismatches'] = mismatches
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--blend', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.predictor import SymptomPredictor
+        predictor = SymptomPredictor(processes=0)
+    base_kb = predictor.kb
+    rng = random.Random(args.seed)
+    cases = [predictor.canonicalize(rng.sample(predictor.symptom_vocab, rng.randint(1, 8)))
+             for _ in range(args.queries)]
+
+    report = {}
+    for scale in args.scales:
+        with contextlib.redirect_stdout(io.StringIO()):
+            kb = random_kb(base_kb, scale * len(base_kb.disease_names), args.seed) if scale > 1 else base_kb
+            predictor.set_knowledge_base(kb)
+        for rank_by in SymptomPredictor.RANK_BY:
+            report[f'{scale}/{rank_by}'] = dict(
+                run(predictor, cases, args.k, rank_by, args.blend), diseases=len(predictor.kb.disease_names)
+            )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'diseases':>9}  {'rank_by':<9}{'sort':>11}{'heap':>11}{'rank':>11}{'scored':>8}{'mismatches':>12}")
+        for key, stats in report.items():
+            print(f"{stats['diseases']:>9}  {key.split('/')[1]:<9}{stats['sort_ms']:>8} ms{stats['heap_ms']:>8} ms"
+                  f"{stats['rank_ms']:>8} ms{stats['scored']:>7.0%}{stats['mismatches']:>12}")
+
+    if any(stats['mismatches'] for stats in report.values()):
+        sys.exit("Ranked results differ from sorting every candidate")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Compare the whole-file and the chunked disease data merge on large inputs.
+
+Writes a synthetic symptom CSV of --rows rows (the shipped
+DiseaseAndSymptoms.csv rows repeated, every --variants-th copy renamed so
+the output has more diseases) and merges it with the shipped descriptions,
+precautions and treatments two ways, each in a fresh subprocess:
+
+  legacy   the whole file read at once, symptom and precaution columns
+           joined with DataFrame.apply(axis=1), pd.merge and a groupby with
+           Python lambdas, as data/merge_datasets.py did before app/etl.py
+  chunked  app.etl.merge_disease_data, reading --chunk-rows rows at a time
+
+Reported per path: wall time, rows per second and the growth of peak RSS
+over the process after imports (Linux ru_maxrss). The legacy path keeps
+its groupby but with first-seen instead of set order, so both outputs must
+be byte-identical.
+
+Usage (from backend/):
+    python benchmarks/etl.py --rows 1000000 2000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+import pandas as pd  # noqa: E402
+
+from app.etl import DEFAULT_CHUNK_ROWS, merge_disease_data  # noqa: E402
+from app.knowledge_base import DEFAULT_DATA_DIR  # noqa: E402
+
+SOURCES = {
+    'description_paths': ['symptom_Description.csv'],
+    'precaution_paths': ['symptom_precaution.csv', 'Disease precaution.csv'],
+    'treatment_paths': ['disease_treatments.csv']
+}
+
+
+def peak_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_symptoms(path, rows, variants):
+    base = pd.read_csv(os.path.join(DEFAULT_DATA_DIR, 'DiseaseAndSymptoms.csv'), dtype=str)
+    written = 0
+    copy = 0
+    with open(path, 'w', newline='') as f:
+        while written < rows:
+            block = base.iloc[:rows - written].copy()
+            if variants > 1 and copy % variants:
+                block['Disease'] = block['Disease'] + f' variant {copy % variants}'
+            block.to_csv(f, index=False, header=written == 0)
+            written += len(block)
+            copy += 1
+
+
+def legacy_merge(symptom_path, sources):
+    def combine(df, prefix):
+        cols = [col for col in df.columns if col.startswith(prefix)]
+        return df[cols].fillna('').apply(lambda x: ', '.join(filter(None, x)), axis=1)
+
+    symptoms_df = pd.read_csv(symptom_path)
+    symptoms_df['symptoms'] = combine(symptoms_df, 'Symptom_')
+    symptoms_df = symptoms_df[['Disease', 'symptoms']]
+    symptoms_df['Disease'] = symptoms_df['Disease'].str.lower().str.strip()
+    symptoms_df['symptoms'] = symptoms_df['symptoms'].str.lower().str.strip()
+
+    desc_df = pd.read_csv(sources['description_paths'][0])
+    treatments_df = pd.read_csv(sources['treatment_paths'][0])
+    precautions = pd.concat([pd.read_csv(path) for path in sources['precaution_paths']], ignore_index=True)
+    for df in (desc_df, treatments_df, precautions):
+        df['Disease'] = df['Disease'].str.lower().str.strip()
+    precautions['precautions'] = combine(precautions, 'Precaution_')
+    precautions = precautions[['Disease', 'precautions']]
+
+    merged = symptoms_df.merge(desc_df, on='Disease', how='left')
+    merged = merged.merge(precautions, on='Disease', how='left')
+    merged = merged.merge(treatments_df, on='Disease', how='left')
+    return merged.groupby('Disease').agg({
+        'symptoms': lambda x: ', '.join(dict.fromkeys(x.dropna())),
+        'Description': 'first',
+        'precautions': 'first',
+        'medications': 'first',
+        'procedures': 'first',
+        'specialist': 'first'
+    }).reset_index()
+
+
+def child(path, symptom_path, output_path, chunk_rows):
+    sources = {role: [os.path.join(DEFAULT_DATA_DIR, name) for name in names] for role, names in SOURCES.items()}
+    baseline = peak_rss_mib()
+    start = time.perf_counter()
+    if path == 'legacy':
+        merged = legacy_merge(symptom_path, sources)
+    else:
+        merged = merge_disease_data([symptom_path], chunk_rows=chunk_rows, **sources)
+    merged.to_csv(output_path, index=False)
+    print(json.dumps({
+        'seconds': round(time.perf_counter() - start, 2),
+        'peak_rss_mib': round(peak_rss_mib() - baseline, 1),
+        'diseases': len(merged)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--variants', type=int, default=10, help='renamed copies of each shipped disease')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--paths', nargs='+', default=['legacy', 'chunked'], choices=['legacy', 'chunked'])
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    parser.add_argument('--child', nargs=3, metavar=('PATH', 'SYMPTOMS', 'OUTPUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child, args.chunk_rows)
+        return
+
+    report = []
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            symptom_path = os.path.join(tmp, f'symptoms-{rows}.csv')
+            write_symptoms(symptom_path, rows, args.variants)
+            outputs = []
+            for path in args.paths:
+                output_path = os.path.join(tmp, f'{path}-{rows}.csv')
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--chunk-rows', str(args.chunk_rows),
+                     '--child', path, symptom_path, output_path],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                stats = json.loads(output)
+                stats.update(path=path, rows=rows, rows_per_s=round(rows / stats['seconds']))
+                report.append(stats)
+                with open(output_path, 'rb') as f:
+                    outputs.append(f.read())
+            mismatches += any(output != outputs[0] for output in outputs)
+
+    if args.json:
+        print(json.dumps({'runs': report, 'mismatches': mismatches}, indent=2))
+    else:
+        print(f"{'rows':>10}  {'path':<9}{'time':>10}{'rows/s':>12}{'peak RSS':>13}{'diseases':>10}")
+        for run in report:
+            print(f"{run['rows']:>10}  {run['path']:<9}{run['seconds']:>8} s{run['rows_per_s']:>12}"
+                  f"{run['peak_rss_mib']:>9} MiB{run['diseases']:>10}")
+
+    if mismatches:
+        sys.exit('Chunked output differs from the whole-file merge')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""
+Offline evaluation of SymptomPredictor.match_disease on data/dataset.csv.
+
+Replays every labelled row (4,920 symptom lists with their disease) through
+match_disease, written the way users type them (benchmarks/workloads.py),
+optionally with seeded noise per row:
+
+  --typo-rate R   each symptom gets one random character edit with probability R
+  --drop-rate R   each symptom is left out with probability R (at least one is kept)
+
+Rows are split into contiguous shards evaluated by --workers processes, each
+with its own predictor. Reported together, so a change can be judged on
+both:
+
+  accuracy     top-1 (the prediction is the labelled disease) and top-3 (it
+               is the prediction or one of the first two alternatives)
+  outcomes     correct / wrong_disease / each error type match_disease
+               returns (need_more_symptoms, no_match, ...)
+  confusion    the most frequent (labelled -> predicted) mistakes
+  throughput   rows per second over the whole run and p50/p95/p99 latency
+               of one match_disease call
+
+The symptom resolution cache is disabled unless --warm-cache is given (the
+dataset repeats the same symptoms constantly). Results are JSON; with
+--compare the process exits with status 1 when top-1 or top-3 accuracy is
+lower than the baseline's by more than --max-accuracy-drop (default: any
+drop), or rows per second by more than --threshold. Rows whose outcome
+changed are counted either way:
+
+    python benchmarks/evaluate.py --workers 4
+    python benchmarks/evaluate.py --typo-rate 0.1 --drop-rate 0.2 --save-baseline eval.json
+    python benchmarks/evaluate.py --typo-rate 0.1 --drop-rate 0.2 --compare eval.json
+"""
+import argparse
+import collections
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(BENCHMARKS_DIR, '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+import workloads  # noqa: E402
+
+# Settings that must match for two runs to be comparable
+CONFIG_KEYS = ('typo_rate', 'drop_rate', 'seed', 'min_symptoms', 'min_confidence', 'rows')
+
+# Predictor of each worker process (set by _init_worker)
+_predictor = None
+
+
+def _init_worker():
+    global _predictor
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.predictor import SymptomPredictor
+        _predictor = SymptomPredictor(processes=0)
+
+
+def normalize(name):
+    return ' '.join(name.lower().split())
+
+
+def add_noise(rows, typo_rate, drop_rate, seed):
+    """Seeded per row, so the noisy workload doesn't depend on how rows are sharded"""
+    cases = []
+    for i, (disease, symptoms) in enumerate(rows):
+        rng = random.Random(f'{seed}:{i}')
+        kept = [sym for sym in symptoms if rng.random() >= drop_rate] or [rng.choice(symptoms)]
+        cases.append((disease, [
+            workloads.misspell(rng, sym) if rng.random() < typo_rate else sym for sym in kept
+        ]))
+    return cases
+
+
+def evaluate_shard(shard, min_symptoms, min_confidence):
+    """Return (outcome, [top-3 diseases], seconds) per case"""
+    if _predictor is None:
+        _init_worker()
+    records = []
+    for disease, symptoms in shard:
+        start = time.perf_counter()
+        result = _predictor.match_disease(symptoms, min_symptoms, min_confidence)
+        elapsed = time.perf_counter() - start
+        if result is None:
+            records.append(('no_result', [], elapsed))
+        elif 'error' in result:
+            records.append((result['error'], [], elapsed))
+        else:
+            top = [result['disease']] + [alt['disease'] for alt in result.get('alternative_diagnoses') or []][:2]
+            top = [normalize(name) for name in top]
+            records.append(('correct' if top[0] == normalize(disease) else 'wrong_disease', top, elapsed))
+    return records
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run(cases, workers, min_symptoms, min_confidence):
+    """Evaluate cases on `workers` processes (in this one for 1); return records in case order and seconds"""
+    start = time.perf_counter()
+    if workers <= 1:
+        records = evaluate_shard(cases, min_symptoms, min_confidence)
+    else:
+        size = -(-len(cases) // workers)
+        shards = [cases[i:i + size] for i in range(0, len(cases), size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            # Pool start-up (one predictor per worker) is not part of the run
+            list(pool.map(time.sleep, [0] * workers))
+            start = time.perf_counter()
+            records = [record for shard in pool.map(evaluate_shard, shards, [min_symptoms] * len(shards),
+                                                    [min_confidence] * len(shards))
+                       for record in shard]
+    return records, time.perf_counter() - start
+
+
+def summarize(cases, records, seconds, confusions):
+    labels = [normalize(disease) for disease, _ in cases]
+    outcomes = collections.Counter(outcome for outcome, _, _ in records)
+    top3 = sum(label in top for label, (_, top, _) in zip(labels, records))
+    mistakes = collections.Counter(
+        (label, top[0]) for label, (outcome, top, _) in zip(labels, records) if outcome == 'wrong_disease'
+    )
+    latencies = sorted(elapsed * 1000 for _, _, elapsed in records)
+    return {
+        'accuracy': {
+            'top1': round(outcomes['correct'] / len(records), 4),
+            'top3': round(top3 / len(records), 4)
+        },
+        'outcomes': dict(outcomes.most_common()),
+        'confusion': [
+            {'disease': label, 'predicted': predicted, 'count': count}
+            for (label, predicted), count in mistakes.most_common(confusions)
+        ],
+        'throughput': {
+            'rows_per_sec': round(len(records) / seconds, 1),
+            'p50_ms': round(percentile(latencies, 50), 4),
+            'p95_ms': round(percentile(latencies, 95), 4),
+            'p99_ms': round(percentile(latencies, 99), 4)
+        },
+        # Per row: the predicted disease, or the outcome when there is none
+        'predictions': [top[0] if top else outcome for outcome, top, _ in records]
+    }
+
+
+def compare(report, baseline, max_accuracy_drop, threshold):
+    """Return (lines, failures) comparing a report with a baseline report"""
+    lines, failures = [], []
+    for key in ('top1', 'top3'):
+        before, after = baseline['accuracy'][key], report['accuracy'][key]
+        failed = before - after > max_accuracy_drop
+        lines.append(f"{key + ' accuracy':<16}{before:>10.2%}{after:>10.2%}{after - before:>+10.2%}"
+                     + ('  ❌' if failed else ''))
+        if failed:
+            failures.append(f'{key} accuracy')
+    before, after = baseline['throughput']['rows_per_sec'], report['throughput']['rows_per_sec']
+    failed = after < before * (1 - threshold)
+    lines.append(f"{'rows/sec':<16}{before:>10}{after:>10}{after / before - 1:>+10.1%}" + ('  ❌' if failed else ''))
+    if failed:
+        failures.append('throughput')
+    changed = sum(a != b for a, b in zip(baseline['predictions'], report['predictions']))
+    lines.append(f"{changed} of {len(report['predictions'])} row(s) changed outcome")
+    return lines, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--typo-rate', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rows', type=int, help='evaluate only the first ROWS rows')
+    parser.add_argument('--min-symptoms', type=int, default=3)
+    parser.add_argument('--min-confidence', type=float, default=30)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--confusions', type=int, default=10, help='most frequent mistakes to report')
+    parser.add_argument('--warm-cache', action='store_true', help='keep the symptom resolution cache enabled')
+    parser.add_argument('--output', help='write results JSON to this file')
+    parser.add_argument('--save-baseline', help='write results JSON as the new baseline')
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.0,
+                        help='allowed top-1/top-3 accuracy loss (a fraction: 0.01 = 1 point)')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative rows/sec regression')
+    args = parser.parse_args()
+
+    # Set before any predictor exists so worker processes inherit it
+    if not args.warm_cache:
+        os.environ['SYMPTOM_CACHE_SIZE'] = '0'
+
+    rows = workloads.load_disease_symptoms()[:args.rows]
+    cases = add_noise(rows, args.typo_rate, args.drop_rate, args.seed)
+    records, seconds = run(cases, args.workers, args.min_symptoms, args.min_confidence)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'workers': args.workers,
+            'warm_cache': args.warm_cache,
+            'typo_rate': args.typo_rate,
+            'drop_rate': args.drop_rate,
+            'seed': args.seed,
+            'min_symptoms': args.min_symptoms,
+            'min_confidence': args.min_confidence,
+            'rows': len(cases)
+        },
+        **summarize(cases, records, seconds, args.confusions)
+    }
+
+    payload = json.dumps(report, indent=2)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            f.write(payload + '\n')
+
+    print(f"{report['meta']['rows']} rows, typo rate {args.typo_rate}, drop rate {args.drop_rate}, "
+          f"{args.workers} worker(s)", file=sys.stderr)
+    print(f"top-1 {report['accuracy']['top1']:.2%}  top-3 {report['accuracy']['top3']:.2%}", file=sys.stderr)
+    print('outcomes: ' + ', '.join(f'{name} {count}' for name, count in report['outcomes'].items()),
+          file=sys.stderr)
+    for mistake in report['confusion']:
+        print(f"  {mistake['count']:>5}  {mistake['disease']} -> {mistake['predicted']}", file=sys.stderr)
+    throughput = report['throughput']
+    print(f"{throughput['rows_per_sec']} rows/sec, p50 {throughput['p50_ms']} ms, p95 {throughput['p95_ms']} ms, "
+          f"p99 {throughput['p99_ms']} ms", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        mismatched = [key for key in CONFIG_KEYS if baseline['meta'].get(key) != report['meta'][key]]
+        if mismatched:
+            sys.exit(f"❌ Baseline was run with different settings: {', '.join(mismatched)}")
+        lines, failures = compare(report, baseline, args.max_accuracy_drop, args.threshold)
+        print(f"\n{'':<16}{'baseline':>10}{'current':>10}{'change':>10}", file=sys.stderr)
+        for line in lines:
+            print(line, file=sys.stderr)
+        if failures:
+            print(f"\n❌ Regressed: {', '.join(failures)}", file=sys.stderr)
+            sys.exit(1)
+        print('\n✅ No accuracy loss and no throughput regression over '
+              f'{args.threshold:.0%}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Compare the fuzzy lookup indexes in app/fuzzy_index.py with brute force.
+
+For each vocabulary size (the dataset's symptoms topped up with synthetic
+terms, see workloads.make_vocabulary) this builds the trigram index, then
+resolves seeded queries with both: vocabulary terms written with spaces,
+misspelled with --typo-rate, plus random letter strings as noise (every
+10th query). A query agrees when both paths return the same (match, score),
+or both return nothing, at SymptomPredictor.SYMPTOM_MATCH_THRESHOLD.
+
+Noise is reported separately: in a large vocabulary brute force usually
+finds some term scoring just above the threshold for random letters, which
+the trigram index tends to drop, so noise agreement is informative only.
+
+Usage (from backend/):
+    python benchmarks/fuzzy_index.py --sizes 100 1000 10000 100000
+
+Exits with status 1 when symptom query agreement is below --min-agreement
+at any size.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from rapidfuzz import process
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+import workloads  # noqa: E402
+from app.fuzzy_index import BruteForceIndex, TrigramIndex  # noqa: E402
+from app.predictor import SymptomPredictor  # noqa: E402
+
+THRESHOLD = SymptomPredictor.SYMPTOM_MATCH_THRESHOLD
+
+
+def resolve(index, query):
+    """SymptomPredictor._fuzzy_resolve against the given index"""
+    candidates = index.candidates(query)
+    if not candidates:
+        return None
+    match, score, _ = process.extractOne(query, candidates)
+    return (match, score) if score > THRESHOLD else None
+
+
+def make_queries(vocab, count, typo_rate, seed):
+    """Return [(query, is_noise), ...]"""
+    rng = random.Random(f'queries:{seed}:{len(vocab)}')
+    queries = []
+    for i in range(count):
+        if i % 10 == 9:
+            queries.append((''.join(rng.choice(workloads.LETTERS) for _ in range(rng.randint(4, 14))), True))
+            continue
+        query = rng.choice(vocab).replace('_', ' ')
+        queries.append((workloads.misspell(rng, query) if rng.random() < typo_rate else query, False))
+    return queries
+
+
+def time_per_query(index, queries):
+    start = time.perf_counter()
+    results = [resolve(index, query) for query in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--typo-rate', type=float, default=0.5)
+    parser.add_argument('--limit', type=int, default=32, help='trigram candidates per ranking')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-agreement', type=float, default=0.99)
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+
+    rows = workloads.load_disease_symptoms()
+    report = {}
+    for size in args.sizes:
+        vocab = workloads.make_vocabulary(size, args.seed, rows)
+        queries, noise = zip(*make_queries(vocab, args.queries, args.typo_rate, args.seed))
+
+        start = time.perf_counter()
+        trigram = TrigramIndex(vocab, args.limit)
+        build = time.perf_counter() - start
+
+        brute_time, expected = time_per_query(BruteForceIndex(vocab), queries)
+        index_time, actual = time_per_query(trigram, queries)
+        agreed = [a == b for a, b in zip(expected, actual)]
+        symptom_agreed = [ok for ok, is_noise in zip(agreed, noise) if not is_noise]
+        noise_agreed = [ok for ok, is_noise in zip(agreed, noise) if is_noise]
+        report[size] = {
+            'queries': len(queries),
+            'build_ms': round(build * 1000, 1),
+            'brute_us': round(brute_time * 1e6, 1),
+            'trigram_us': round(index_time * 1e6, 1),
+            'speedup': round(brute_time / index_time, 2),
+            'agreement': round(sum(symptom_agreed) / len(symptom_agreed), 4),
+            'noise_agreement': round(sum(noise_agreed) / max(1, len(noise_agreed)), 4)
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'terms':>8}{'build':>11}{'brute':>13}{'trigram':>13}{'speedup':>9}{'agreement':>11}{'noise':>9}")
+        for size, stats in report.items():
+            print(f"{size:>8}{stats['build_ms']:>8} ms{stats['brute_us']:>10} us"
+                  f"{stats['trigram_us']:>10} us{stats['speedup']:>8}x{stats['agreement']:>11.2%}"
+                  f"{stats['noise_agreement']:>9.0%}")
+
+    low = [size for size, stats in report.items() if stats['agreement'] < args.min_agreement]
+    if low:
+        sys.exit(f"Agreement below {args.min_agreement:.0%} for vocabulary sizes: {', '.join(map(str, low))}")
+
+
+if __name__ == '__main__':
+    main()
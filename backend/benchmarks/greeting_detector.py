@@ -0,0 +1,102 @@
+"""
+Compare GreetingsResponder.get_response with the previous full-scan version.
+
+The previous version ran process.extractOne over every greeting for the
+whole input and for up to three word prefixes. This script times both on
+non-greeting inputs (symptom lists generated from dataset.csv with seeded
+misspellings) and on greeting inputs, and checks that both return the same
+response for every input.
+
+Usage (from backend/):
+    python benchmarks/greeting_detector.py --ops 2000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+from rapidfuzz import process
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+import workloads  # noqa: E402
+from app.predictor import GreetingsResponder  # noqa: E402
+
+
+def full_scan_response(greeter, user_input):
+    """get_response before the detector: four full extractOne scans"""
+    user_input_lower = user_input.lower().strip()
+    match, score, _ = process.extractOne(user_input_lower, greeter.greetings)
+    if score > 80:
+        return greeter.responses.get(match)
+    words = user_input_lower.split()
+    for word_count in range(min(3, len(words)), 0, -1):
+        prefix = ' '.join(words[:word_count])
+        match, score, _ = process.extractOne(prefix, greeter.greetings)
+        if score > 85:
+            return greeter.responses.get(match)
+    return None
+
+
+def time_per_call(func, inputs, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for text in inputs:
+            func(text)
+        best = min(best, (time.perf_counter() - start) / len(inputs))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=2000, help='inputs per workload')
+    parser.add_argument('--repeats', type=int, default=5, help='timing rounds; the fastest is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        greeter = GreetingsResponder()
+
+    rng = random.Random(args.seed)
+    rows = workloads.load_disease_symptoms()
+    symptom_inputs = []
+    for n in (1, 3, 5, 8):
+        cases = workloads.make_cases(args.ops // 4, n, 0.2, args.seed, rows)
+        symptom_inputs += [', '.join(symptoms) for _, symptoms in cases]
+    greeting_inputs = [
+        workloads.misspell(rng, text) if rng.random() < 0.3 else text
+        for text in (rng.choice(workloads.GREETING_INPUTS + greeter.greetings) for _ in range(args.ops))
+    ]
+
+    report = {}
+    for name, inputs in (('non_greeting', symptom_inputs), ('greeting', greeting_inputs)):
+        mismatches = sum(full_scan_response(greeter, text) != greeter.get_response(text) for text in inputs)
+        if mismatches:
+            sys.exit(f"{mismatches} {name} inputs got a different response from the detector")
+        before = time_per_call(lambda text: full_scan_response(greeter, text), inputs, args.repeats)
+        after = time_per_call(greeter.get_response, inputs, args.repeats)
+        report[name] = {
+            'inputs': len(inputs),
+            'full_scan_us': round(before * 1e6, 2),
+            'detector_us': round(after * 1e6, 2),
+            'speedup': round(before / after, 2)
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("get_response, mean time per call (identical responses on every input)")
+    print(f"{'workload':<14}{'full scan':>12}{'detector':>12}{'speedup':>9}")
+    for name, stats in report.items():
+        print(f"{name:<14}{stats['full_scan_us']:>10} us{stats['detector_us']:>10} us{stats['speedup']:>8}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+Load test /api/analyze on the Flask app (gunicorn) and the ASGI app (uvicorn).
+
+Starts each server on a free port, then keeps a fixed number of concurrent
+clients sending /api/analyze requests over keep-alive connections for a
+fixed duration. Reports throughput, latency percentiles of successful
+responses, how many requests were rejected with 503 (ASGI backpressure)
+and the server's CPU time per request (user + system time of the server
+process and its workers, from /proc, so Linux only).
+
+With --burst N the clients form groups of N that send the same input at
+the same moment (a burst of duplicate submissions) instead of independent
+random inputs. --single-flight on off runs each server with and without
+request coalescing (SINGLE_FLIGHT_ENABLED, app/singleflight.py).
+
+Usage (from backend/):
+    python benchmarks/load_test.py --concurrency 32 --duration 20
+    python benchmarks/load_test.py --servers asgi --concurrency 256
+    python benchmarks/load_test.py --servers asgi --burst 16 --single-flight on off
+
+The clients run in this process, so on small machines they compete with
+the server for CPU; compare servers on the same machine only.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+SERVERS = {
+    'flask': lambda port: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api_server:app'],
+    'asgi': lambda port: [sys.executable, '-m', 'uvicorn', 'asgi_server:app',
+                          '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+}
+
+SYMPTOM_INPUTS = [
+    'fever, headache, cough, fatigue',
+    'itching, skin rash, nodal skin eruptions',
+    'stomach pain, acidity, ulcers on tongue, vomiting',
+    'chills, high fever, sweating, muscle pain, nausea',
+    'joint pain, neck pain, knee pain, swelling joints',
+    'continuous sneezing, shivering, chills, watering from eyes',
+    'fatigue, weight loss, restlessness, lethargy, irregular sugar level',
+    'cough, high fever, breathlessness, chest pain, phlegm',
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(name, port, workers, single_flight='on'):
+    env = dict(os.environ, PORT=str(port), HOST='127.0.0.1', WEB_CONCURRENCY=str(workers),
+               SINGLE_FLIGHT_ENABLED=str(single_flight == 'on').lower())
+    proc = subprocess.Popen(SERVERS[name](port), cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while True:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            conn.getresponse().read()
+            conn.close()
+            return proc
+        except OSError:
+            if proc.poll() is not None or time.time() > deadline:
+                proc.kill()
+                raise RuntimeError(f'{name} server did not start')
+            time.sleep(0.2)
+
+
+def cpu_seconds(pid):
+    """User + system CPU seconds of a process and all its descendants"""
+    total = 0.0
+    pending = [pid]
+    while pending:
+        pid = pending.pop()
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            for tid in os.listdir(f'/proc/{pid}/task'):
+                with open(f'/proc/{pid}/task/{tid}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+        # utime and stime are fields 14 and 15 of /proc/<pid>/stat
+        total += (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    return total
+
+
+class Burst:
+    """
+    Makes a group of clients send the same input at the same moment.
+    Every round the last client to arrive picks the input (and whether the
+    run is over), then all of them are released together.
+    """
+    def __init__(self, size, stop_at, seed):
+        self.rng = random.Random(seed)
+        self.stop_at = stop_at
+        self.text = None
+        self.done = False
+        self.barrier = threading.Barrier(size, action=self._next)
+
+    def _next(self):
+        self.done = time.perf_counter() >= self.stop_at
+        self.text = self.rng.choice(SYMPTOM_INPUTS)
+
+    def next_input(self):
+        """The round's input, or None once the run is over"""
+        try:
+            self.barrier.wait(timeout=30)
+        except threading.BrokenBarrierError:
+            return None
+        return None if self.done else self.text
+
+
+def client(port, stop_at, seed, latencies, statuses, lock, burst=None):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    local_latencies, local_statuses = [], {}
+    while time.perf_counter() < stop_at or burst is not None:
+        text = burst.next_input() if burst is not None else rng.choice(SYMPTOM_INPUTS)
+        if text is None:
+            break
+        body = json.dumps({'symptoms': text})
+        start = time.perf_counter()
+        try:
+            conn.request('POST', '/api/analyze', body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            status = 'error'
+        elapsed = time.perf_counter() - start
+        local_statuses[status] = local_statuses.get(status, 0) + 1
+        if status == 200:
+            local_latencies.append(elapsed)
+        elif status == 503:
+            # Honour Retry-After loosely so rejected clients don't spin
+            time.sleep(0.05)
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        for status, count in local_statuses.items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+def run_load(port, pid, concurrency, duration, warmup, burst=1):
+    lock = threading.Lock()
+    for phase_duration, record in ((warmup, False), (duration, True)):
+        latencies, statuses = [], {}
+        stop_at = time.perf_counter() + phase_duration
+        bursts = [Burst(burst, stop_at, seed) for seed in range(concurrency // burst)] if burst > 1 else []
+        threads = [
+            threading.Thread(target=client, args=(port, stop_at, seed, latencies, statuses, lock,
+                                                  bursts[seed // burst] if bursts else None))
+            for seed in range(len(bursts) * burst or concurrency)
+        ]
+        cpu_start = cpu_seconds(pid)
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        cpu = cpu_seconds(pid) - cpu_start
+    requests = sum(statuses.values())
+    return {
+        'concurrency': len(threads),
+        'burst': burst,
+        'duration_s': round(elapsed, 2),
+        'requests': requests,
+        'statuses': statuses,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'server_cpu_ms_per_request': round(cpu * 1000 / requests, 3) if requests else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            'p95': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+            'p99': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+            'mean': round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['flask', 'asgi'])
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent client connections')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds per server')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before each run')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='gunicorn workers for the Flask app')
+    parser.add_argument('--burst', type=int, default=1, help='clients sending the same input at once')
+    parser.add_argument('--single-flight', nargs='+', choices=['on', 'off'], default=['on'],
+                        help='run each server with request coalescing on and/or off')
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+
+    report = {}
+    for name in args.servers:
+        for single_flight in args.single_flight:
+            port = free_port()
+            proc = start_server(name, port, args.workers, single_flight)
+            label = name if len(args.single_flight) == 1 else f'{name}/{single_flight}'
+            try:
+                report[label] = run_load(port, proc.pid, args.concurrency, args.duration, args.warmup, args.burst)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    burst = f' in bursts of {args.burst}' if args.burst > 1 else ''
+    print(f"/api/analyze with {args.concurrency} concurrent clients{burst} for {args.duration:g}s")
+    print(f"{'server':<12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'CPU ms/req':>12}  statuses")
+    for name, stats in report.items():
+        lat = stats['latency_ms']
+        print(f"{name:<12}{stats['throughput_rps']:>9}{lat['p50']!s:>9}{lat['p95']!s:>9}{lat['p99']!s:>9}"
+              f"{stats['server_cpu_ms_per_request']!s:>12}  {stats['statuses']}")
+
+
+if __name__ == '__main__':
+    main()
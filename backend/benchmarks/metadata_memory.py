@@ -0,0 +1,155 @@
+"""
+Measure the memory held by disease metadata, eager records vs the lazy store.
+
+Builds a synthetic disease table (the real one repeated until --diseases
+rows, each with about --text-bytes of description/precaution/treatment
+text), compiles it into a bundle and loads it in a fresh subprocess per
+mode, reading /proc/self/smaps_rollup before and after (Linux only):
+
+  eager  every record decoded into a Python dict up front, as the knowledge
+         base held them before app/metadata.py
+  lazy   records stay in the offset-indexed store and are decoded on access
+
+each with the bundle read into memory and with KB_MMAP. Reported: growth of
+RSS and of anonymous memory (heap; private to every worker, unlike the
+file-backed pages of a memory-mapped bundle, which workers share through the
+page cache), and the mean cost of reading one record.
+
+Usage (from backend/):
+    python benchmarks/metadata_memory.py --diseases 5000 --text-bytes 4000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+import numpy as np  # noqa: E402
+
+from app.knowledge_base import KnowledgeBase, load_bundle, save_bundle  # noqa: E402
+
+WORDS = ('rest', 'fluids', 'consult', 'doctor', 'daily', 'avoid', 'exposure', 'monitor', 'symptoms',
+         'tablet', 'twice', 'after', 'meals', 'infection', 'chronic', 'therapy', 'severe', 'mild')
+
+
+def memory():
+    """Return RSS and anonymous memory of this process in MiB"""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {'rss': fields['Rss'] / 1024, 'anonymous': fields['Anonymous'] / 1024}
+
+
+def text(rng, size):
+    words = []
+    while sum(len(word) + 1 for word in words) < size:
+        words.append(rng.choice(WORDS))
+    return ' '.join(words)
+
+
+def synthetic_kb(kb, diseases, text_bytes, seed):
+    """The real table repeated to `diseases` rows with long free-text fields"""
+    rng = random.Random(seed)
+    base = list(kb.disease_metadata)
+    rows = [i % len(base) for i in range(diseases)]
+    part = text_bytes // 8
+    records = [
+        {
+            'disease': f"{base[row]['disease']} #{i}",
+            'description': text(rng, part * 4),
+            'precautions': '|'.join(text(rng, part // 2) for _ in range(4)),
+            'medications': '|'.join(text(rng, part // 3) for _ in range(3)),
+            'procedures': text(rng, part - 20),
+            'specialist': base[row]['specialist']
+        }
+        for i, row in enumerate(rows)
+    ]
+    return KnowledgeBase(
+        kb.symptom_vocab, kb.symptom_weights, records,
+        kb.incidence[rows], kb.match_scores[rows], kb.weight_vector,
+        source_digest=f'synthetic-{diseases}-{kb.source_digest}', origin='synthetic'
+    )
+
+
+def child(bundle_path, mode, use_mmap, lookups):
+    before = memory()
+    kb = load_bundle(bundle_path, use_mmap=use_mmap)
+    if mode == 'eager':
+        kb.disease_metadata = list(kb.disease_metadata)
+    gc.collect()
+    after = memory()
+
+    rows = np.random.default_rng(0).integers(len(kb.disease_names), size=lookups)
+    start = time.perf_counter()
+    for row in rows:
+        kb.disease_metadata[row]
+    lookup_us = (time.perf_counter() - start) / lookups * 1e6
+
+    print(json.dumps({
+        'rss_mib': round(after['rss'] - before['rss'], 1),
+        'anonymous_mib': round(after['anonymous'] - before['anonymous'], 1),
+        'lookup_us': round(lookup_us, 2)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--diseases', type=int, default=5000)
+    parser.add_argument('--text-bytes', type=int, default=4000, help='approximate metadata text per disease')
+    parser.add_argument('--lookups', type=int, default=1000, help='records read to time a lookup')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    parser.add_argument('--child', nargs=3, metavar=('BUNDLE', 'MODE', 'MMAP'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        bundle_path, mode, use_mmap = args.child
+        child(bundle_path, mode, use_mmap == 'true', args.lookups)
+        return
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.predictor import SymptomPredictor
+        base = SymptomPredictor(processes=0)
+    kb = synthetic_kb(base.kb, args.diseases, args.text_bytes, args.seed)
+
+    report = {
+        'diseases': len(kb.disease_names),
+        'metadata_mib': round(kb.disease_metadata.nbytes / 2 ** 20, 1),
+        'runs': []
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = os.path.join(tmp, 'knowledge_base.bin')
+        save_bundle(kb, bundle_path)
+        for use_mmap in ('false', 'true'):
+            for mode in ('eager', 'lazy'):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--lookups', str(args.lookups),
+                     '--child', bundle_path, mode, use_mmap],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                report['runs'].append(dict(json.loads(output), mode=mode, mmap=use_mmap == 'true'))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['diseases']} diseases, {report['metadata_mib']} MiB of packed metadata")
+    print(f"{'mode':<6}{'mmap':>6}{'RSS':>11}{'anonymous':>14}{'lookup':>12}")
+    for run in report['runs']:
+        print(f"{run['mode']:<6}{'yes' if run['mmap'] else 'no':>6}{run['rss_mib']:>7} MiB"
+              f"{run['anonymous_mib']:>10} MiB{run['lookup_us']:>9} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Compare building the partial-credit matrix with and without the neighbour table.
+
+For the real knowledge base and synthetic vocabularies of --vocab-sizes
+symptoms (workloads.make_vocabulary) with --diseases diseases of 3-17
+symptoms each, match_scores is built two ways:
+
+  cdist    the vocabulary fuzzy matched against every disease's symptoms,
+           as build_matrices did before app/neighbours.py
+  table    NeighbourTable.build (every vocabulary pair once) plus one row
+           lookup per disease; "reuse" is the lookup alone, as when the
+           vocabulary is unchanged and the table comes from the bundle
+
+Reported per vocabulary: seconds for each path, neighbour pairs kept and
+the table's size. The matrices are checked to be identical (the process
+exits with status 1 otherwise).
+
+Usage (from backend/):
+    python benchmarks/neighbour_table.py --vocab-sizes 1000 2000 4000 --diseases 500
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+import workloads  # noqa: E402
+from app.knowledge_base import DISEASE_MATCH_THRESHOLD, build_matrices  # noqa: E402
+from app.neighbours import NeighbourTable  # noqa: E402
+
+
+def cdist_scores(symptom_vocab, disease_symptoms):
+    match_scores = np.zeros((len(disease_symptoms), len(symptom_vocab)), dtype=np.float64)
+    for d, symptoms in enumerate(disease_symptoms):
+        best = process.cdist(symptom_vocab, symptoms, scorer=fuzz.WRatio, dtype=np.float64).max(axis=1)
+        match_scores[d] = np.where(best > DISEASE_MATCH_THRESHOLD, best, 0.0)
+    return match_scores
+
+
+def measure(name, symptom_vocab, disease_symptoms):
+    start = time.perf_counter()
+    expected = cdist_scores(symptom_vocab, disease_symptoms)
+    cdist_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table = NeighbourTable.build(symptom_vocab)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    _, match_scores = build_matrices(symptom_vocab, disease_symptoms, table)
+    reuse_s = time.perf_counter() - start
+
+    return {
+        'name': name,
+        'vocab': len(symptom_vocab),
+        'diseases': len(disease_symptoms),
+        'cdist_s': round(cdist_s, 3),
+        'table_s': round(build_s + reuse_s, 3),
+        'reuse_s': round(reuse_s, 3),
+        'pairs': table.nnz,
+        'table_kib': round((table.indptr.nbytes + table.ids.nbytes + table.scores.nbytes) / 1024, 1),
+        'identical': bool(np.array_equal(expected, match_scores))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vocab-sizes', type=int, nargs='+', default=[1000, 2000, 4000])
+    parser.add_argument('--diseases', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.knowledge_base import build_from_csv
+        kb = build_from_csv()
+    real = [[kb.symptom_vocab[j] for j in np.flatnonzero(row)] for row in kb.incidence]
+    report = [measure('dataset', kb.symptom_vocab, real)]
+
+    rows = workloads.load_disease_symptoms()
+    for size in args.vocab_sizes:
+        vocab = workloads.make_vocabulary(size, args.seed, rows)
+        rng = random.Random(f'{args.seed}:{size}')
+        diseases = [rng.sample(vocab, rng.randint(3, 17)) for _ in range(args.diseases)]
+        report.append(measure('synthetic', vocab, diseases))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'vocab':>6}{'diseases':>10}{'cdist':>10}{'table':>10}{'reuse':>10}{'pairs':>9}{'size':>11}  identical")
+        for run in report:
+            print(f"{run['vocab']:>6}{run['diseases']:>10}{run['cdist_s']:>8} s{run['table_s']:>8} s"
+                  f"{run['reuse_s']:>8} s{run['pairs']:>9}{run['table_kib']:>7} KiB  {run['identical']}")
+
+    if not all(run['identical'] for run in report):
+        sys.exit('Partial-credit scores differ between the cdist and neighbour table paths')
+
+
+if __name__ == '__main__':
+    main()
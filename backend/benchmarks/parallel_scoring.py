@@ -0,0 +1,120 @@
+"""
+Measure match_disease_batch speedup from the process-pool engine (app/engine.py).
+
+Builds a synthetic disease table by repeating the real one (--scale copies),
+writes it as a temporary bundle for the pool processes to memory-map, then
+times match_disease_batch on seeded, typo-laden batches for each process
+count. The resolution cache is cleared before every run so fuzzy matching is
+part of the measurement. Every parallel result is checked against the
+serial one.
+
+Usage (from backend/):
+    python benchmarks/parallel_scoring.py --scale 100 --batch-sizes 250 1000 --processes 1 2 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+from app.knowledge_base import KnowledgeBase, save_bundle  # noqa: E402
+from app.predictor import SymptomPredictor  # noqa: E402
+
+
+def synthetic_kb(kb, scale):
+    records = [
+        dict(record, disease=f"{record['disease']} #{copy}")
+        for copy in range(scale) for record in kb.disease_metadata
+    ]
+    return KnowledgeBase(
+        kb.symptom_vocab, kb.symptom_weights, records,
+        np.tile(kb.incidence, (scale, 1)), np.tile(kb.match_scores, (scale, 1)),
+        kb.weight_vector, source_digest=f'synthetic-x{scale}-{kb.source_digest}', origin='synthetic'
+    )
+
+
+def typo(rng, text):
+    chars = list(text.replace('_', ' '))
+    for _ in range(rng.randint(0, 2)):
+        i = rng.randrange(len(chars))
+        chars[i] = rng.choice('abcdefghijklmnopqrstuvwxyz')
+    return ''.join(chars)
+
+
+def make_batch(vocab, size, seed):
+    rng = random.Random(seed)
+    return [[typo(rng, sym) for sym in rng.sample(vocab, rng.randint(3, 7))] for _ in range(size)]
+
+
+def time_batch(predictor, batch, repeats):
+    timings, result = [], None
+    for _ in range(repeats):
+        predictor.resolution_cache.clear()
+        start = time.perf_counter()
+        result = predictor.match_disease_batch(batch)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=100, help='copies of the real disease table')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[250, 1000])
+    parser.add_argument('--processes', type=int, nargs='+', default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        base = SymptomPredictor(processes=0)
+    kb = synthetic_kb(base.kb, args.scale)
+
+    report = {'diseases': len(kb.disease_names), 'cpu_count': os.cpu_count(), 'runs': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = os.path.join(tmp, 'knowledge_base.bin')
+        save_bundle(kb, bundle_path)
+
+        for size in args.batch_sizes:
+            batch = make_batch(kb.symptom_vocab, size, args.seed)
+            serial_time, expected = None, None
+            for processes in args.processes:
+                predictor = SymptomPredictor(kb=kb, bundle_path=bundle_path, processes=processes)
+                if predictor.engine is not None:
+                    predictor.engine.warm_up()
+                elapsed, result = time_batch(predictor, batch, args.repeats)
+                if predictor.engine is not None:
+                    predictor.engine.shutdown()
+                if expected is None:
+                    serial_time, expected = elapsed, result
+                elif result != expected:
+                    sys.exit(f"results differ from serial with {processes} processes (batch {size})")
+                report['runs'].append({
+                    'batch_size': size,
+                    'processes': processes,
+                    'seconds': round(elapsed, 4),
+                    'cases_per_sec': round(size / elapsed, 1),
+                    'speedup': round(serial_time / elapsed, 2)
+                })
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"match_disease_batch over {report['diseases']} diseases, {report['cpu_count']} CPU(s), median of {args.repeats}")
+    print(f"{'batch':>7}{'processes':>11}{'seconds':>10}{'cases/s':>10}{'speedup':>9}")
+    for run in report['runs']:
+        print(f"{run['batch_size']:>7}{run['processes']:>11}{run['seconds']:>10}{run['cases_per_sec']:>10}{run['speedup']:>9}")
+
+
+if __name__ == '__main__':
+    main()
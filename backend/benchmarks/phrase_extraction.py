@@ -0,0 +1,137 @@
+"""
+Compare free-text symptom parsing: phrase extraction vs. the old split.
+
+Messages of 50-500 words are generated from filler sentences with symptoms
+mixed in: vocabulary symptoms written with spaces, aliases from
+data/symptom_aliases.csv and misspelled symptoms (--typo-rate). Each
+message is parsed both ways and canonicalized with the resolution cache
+disabled:
+
+  split    commas, or every word when there are none (the old parser)
+  extract  SymptomPredictor.extract_symptoms (app/phrases.py)
+
+Reported per message length: milliseconds per message, fuzzy matches run,
+recall of the mixed-in symptoms and recognized symptoms that were not
+mixed in (spurious).
+
+Usage (from backend/):
+    python benchmarks/phrase_extraction.py --messages 50
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+os.environ['SYMPTOM_CACHE_SIZE'] = '0'
+
+import workloads  # noqa: E402
+from app import metrics  # noqa: E402
+
+FILLER = [
+    "i am not sure what is going on with me",
+    "it started a few days ago after dinner",
+    "my family is getting worried",
+    "i went to work yesterday but had to come home early",
+    "nothing like this has happened before",
+    "i tried resting over the weekend",
+    "please tell me what i should do next",
+    "it gets worse in the evening",
+    "i have been drinking plenty of water",
+    "my doctor is on holiday this week",
+    "i do not take any regular medication",
+    "the pharmacy near my house was closed",
+]
+CONNECTORS = [' and ', ', ', ' with ', ' and also ', '. i also have ', ' plus ']
+
+
+def split_symptoms(text):
+    """The parser /api/analyze used before phrase extraction"""
+    if ',' in text:
+        return [s.strip() for s in text.split(',') if s.strip()]
+    return [s.strip() for s in text.split() if s.strip()]
+
+
+def make_message(rng, words, vocab, aliases, typo_rate):
+    """Return (message, {mixed-in vocabulary symptoms})"""
+    parts, expected = [], set()
+    while sum(len(part.split()) for part in parts) < words:
+        parts.append(rng.choice(FILLER))
+        if rng.random() < 0.5:
+            mentions = []
+            for _ in range(rng.randint(1, 3)):
+                if aliases and rng.random() < 0.3:
+                    alias, symptom = rng.choice(aliases)
+                    mentions.append(alias)
+                else:
+                    symptom = rng.choice(vocab)
+                    text = symptom.replace('_', ' ')
+                    mentions.append(workloads.misspell(rng, text) if rng.random() < typo_rate else text)
+                expected.add(symptom)
+            text = mentions[0]
+            for mention in mentions[1:]:
+                text += rng.choice(CONNECTORS) + mention
+            parts.append('i have ' + text)
+    return '. '.join(parts) + '.', expected
+
+
+def run(predictor, parse, messages):
+    fuzzy_before = metrics.SYMPTOM_LOOKUPS.value('fuzzy')
+    found = missed = spurious = 0
+    start = time.perf_counter()
+    for text, expected in messages:
+        cleaned = set(predictor.canonicalize(parse(text))[1])
+        found += len(cleaned & expected)
+        missed += len(expected - cleaned)
+        spurious += len(cleaned - expected)
+    elapsed = time.perf_counter() - start
+    n = len(messages)
+    return {
+        'ms_per_message': round(elapsed / n * 1000, 3),
+        'fuzzy_per_message': round((metrics.SYMPTOM_LOOKUPS.value('fuzzy') - fuzzy_before) / n, 1),
+        'recall': round(found / max(1, found + missed), 4),
+        'spurious_per_message': round(spurious / n, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[50, 100, 250, 500], help='words per message')
+    parser.add_argument('--messages', type=int, default=50, help='messages per length')
+    parser.add_argument('--typo-rate', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.predictor import SymptomPredictor
+        predictor = SymptomPredictor()
+
+    vocab = predictor.symptom_vocab
+    aliases = sorted(predictor.aliases.items())
+    report = {}
+    for words in args.lengths:
+        rng = random.Random(f'{args.seed}:{words}')
+        messages = [make_message(rng, words, vocab, aliases, args.typo_rate) for _ in range(args.messages)]
+        report[words] = {
+            'split': run(predictor, split_symptoms, messages),
+            'extract': run(predictor, predictor.extract_symptoms, messages)
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'words':>6}  {'parser':<8}{'ms/msg':>9}{'fuzzy/msg':>11}{'recall':>9}{'spurious/msg':>14}")
+    for words, runs in report.items():
+        for name, stats in runs.items():
+            print(f"{words:>6}  {name:<8}{stats['ms_per_message']:>9}{stats['fuzzy_per_message']:>11}"
+                  f"{stats['recall']:>9.1%}{stats['spurious_per_message']:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Compare ways of turning match results into /api/analyze response bytes.
+
+Every case is canonicalized up front; each path then runs match_canonical
+and builds and encodes the response body:
+
+  jsonify  results converted to plain dicts (what match_disease returned
+           before app/results.py) and encoded by Flask's JSON provider
+  fast     Prediction objects encoded by app/serialization.py
+  compact  as fast, with ?format=compact (no formatted message)
+
+Reported per path: mean microseconds per response, peak traced Python
+memory of one response (tracemalloc), and the size of the result objects
+themselves (the result container plus its alternatives, not the strings
+they share). The jsonify and fast bytes are checked to be identical.
+
+Usage (from backend/):
+    python benchmarks/response_encoding.py --ops 1000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+import workloads  # noqa: E402
+
+
+def container_bytes(result):
+    alternatives = result.get('alternative_diagnoses') or []
+    return sys.getsizeof(result) + sum(sys.getsizeof(alt) for alt in alternatives)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=1000)
+    parser.add_argument('--symptoms', type=int, default=4, help='symptoms per case')
+    parser.add_argument('--typo-rate', type=float, default=0.1)
+    parser.add_argument('--repeats', type=int, default=7, help='rounds per path; the fastest is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import api_server
+    from app.results import Prediction
+    from app.serialization import dumps
+
+    predictor = api_server.predictor
+    rows = workloads.load_disease_symptoms()
+    cases = [predictor.canonicalize(symptoms)
+             for _, symptoms in workloads.make_cases(args.ops, args.symptoms, args.typo_rate, args.seed, rows)]
+
+    def plain(result):
+        return result.to_dict() if isinstance(result, Prediction) else result
+
+    paths = {
+        'jsonify': lambda case: api_server.app.json.dumps(
+            api_server.build_analysis_response(plain(predictor.match_canonical(case)))[0], separators=(',', ':')
+        ),
+        'fast': lambda case: dumps(api_server.build_analysis_response(predictor.match_canonical(case))[0]),
+        'compact': lambda case: dumps(api_server.build_analysis_response(predictor.match_canonical(case), True)[0])
+    }
+
+    mismatches = sum(paths['jsonify'](case) != paths['fast'](case) for case in cases)
+    results = [predictor.match_canonical(case) for case in cases]
+    predictions = [result for result in results if isinstance(result, Prediction)]
+
+    best = {name: float('inf') for name in paths}
+    for _ in range(args.repeats):
+        for name, path in paths.items():
+            start = time.perf_counter()
+            for case in cases:
+                path(case)
+            best[name] = min(best[name], (time.perf_counter() - start) / len(cases))
+
+    report = {
+        'cases': len(cases),
+        'predictions': len(predictions),
+        'mismatches': mismatches,
+        'paths': {}
+    }
+    for name, path in paths.items():
+        peaks = []
+        tracemalloc.start()
+        for case in cases[:max(1, len(cases) // 10)]:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            path(case)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+        report['paths'][name] = {
+            'us_per_response': round(best[name] * 1e6, 1),
+            'peak_kib': round(statistics.mean(peaks) / 1024, 1)
+        }
+    if predictions:
+        report['paths']['jsonify']['result_bytes'] = round(
+            statistics.mean(container_bytes(plain(result)) for result in predictions))
+        report['paths']['fast']['result_bytes'] = report['paths']['compact']['result_bytes'] = round(
+            statistics.mean(container_bytes(result) for result in predictions))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['cases']} cases, {report['predictions']} predictions")
+        print(f"{'path':<9}{'per response':>15}{'peak':>12}{'result':>12}")
+        for name, stats in report['paths'].items():
+            print(f"{name:<9}{stats['us_per_response']:>12} us{stats['peak_kib']:>8} KiB"
+                  f"{stats.get('result_bytes', '-'):>8} B")
+
+    if mismatches:
+        sys.exit(f"{mismatches} response(s) differ from Flask's encoding")
+
+
+if __name__ == '__main__':
+    main()
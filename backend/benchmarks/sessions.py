@@ -0,0 +1,159 @@
+"""
+Compare conversational sessions with rescoring the whole conversation.
+
+Each simulated conversation names one new symptom per turn (written with
+spaces, misspelled with --typo-rate). Every turn is answered two ways:
+
+  rescore  canonicalize + match_canonical over every symptom so far, i.e.
+           the client resends the conversation and it is scored from scratch
+  session  canonicalize the new symptom, load the session from the store,
+           add it, save, and match_session (app/sessions.py)
+
+With --remove-rate some turns instead drop a random earlier symptom. The
+disease table is the real one repeated --scales times (as in
+parallel_scoring.py). Reported per scale and store: mean milliseconds per
+turn for both paths; every session result is checked against the rescored
+one.
+
+Usage (from backend/):
+    python benchmarks/sessions.py --scales 1 100 --turns 12
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+os.environ['SYMPTOM_CACHE_SIZE'] = '0'
+
+import workloads  # noqa: E402
+from parallel_scoring import synthetic_kb  # noqa: E402
+from app.sessions import MemorySessionStore, SQLiteSessionStore, SymptomSession  # noqa: E402
+
+
+def make_conversations(vocab, count, turns, typo_rate, remove_rate, seed):
+    """[[('add', text) or ('remove', index of the earlier add whose symptom is dropped), ...], ...]"""
+    rng = random.Random(seed)
+    conversations = []
+    for _ in range(count):
+        steps, adds = [], 0
+        for symptom in rng.sample(vocab, turns):
+            if adds > 2 and rng.random() < remove_rate:
+                steps.append(('remove', rng.randrange(adds)))
+            adds += 1
+            text = symptom.replace('_', ' ')
+            steps.append(('add', workloads.misspell(rng, text) if rng.random() < typo_rate else text))
+        conversations.append(steps)
+    return conversations
+
+
+def run(predictor, store, conversations):
+    rescore_time = session_time = 0.0
+    turns = mismatches = 0
+    for c, steps in enumerate(conversations):
+        session_id = f'bench-{c}'
+        history = []
+        for action, value in steps:
+            turns += 1
+            if action == 'remove':
+                # Both paths drop the canonical symptom the earlier turn resolved to
+                target = predictor.canonicalize([history[value]])[1] if history[value] else []
+                history[value] = None
+                start = time.perf_counter()
+                session = store.get(session_id)
+                for symptom in target:
+                    session.remove(predictor.kb, symptom)
+                store.save(session)
+                session_time += time.perf_counter() - start
+                continue
+
+            history.append(value)
+            start = time.perf_counter()
+            # The session never holds a symptom twice, so neither does the resent conversation
+            sent = [text for text in history if text is not None]
+            canonical = predictor.canonicalize(sent)
+            seen, keep = set(), []
+            for info in canonical[3]:
+                if info['matched'] not in seen:
+                    seen.add(info['matched'])
+                    keep.append(info)
+            canonical = (
+                [info['original'] for info in keep] + canonical[2],
+                [info['matched'] for info in keep], canonical[2], keep
+            )
+            expected = predictor.match_canonical(canonical)
+            rescore_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            _, _, unknown_symptoms, matched_info = predictor.canonicalize([value])
+            session = store.get(session_id) or SymptomSession(session_id, predictor.kb.source_digest)
+            session.add(predictor.kb, matched_info)
+            store.save(session)
+            result = predictor.match_session(session, unknown_symptoms)
+            session_time += time.perf_counter() - start
+
+            # Unknown symptoms only count in the turn they were sent in
+            if not canonical[2] and not unknown_symptoms:
+                mismatches += result != expected
+    return {
+        'turns': turns,
+        'rescore_ms': round(rescore_time / turns * 1000, 3),
+        'session_ms': round(session_time / turns * 1000, 3),
+        'speedup': round(rescore_time / session_time, 2),
+        'mismatches': mismatches
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100])
+    parser.add_argument('--conversations', type=int, default=50)
+    parser.add_argument('--turns', type=int, default=12, help='symptoms named per conversation')
+    parser.add_argument('--typo-rate', type=float, default=0.1)
+    parser.add_argument('--remove-rate', type=float, default=0.1)
+    parser.add_argument('--stores', nargs='+', default=['memory', 'sqlite'], choices=['memory', 'sqlite'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.predictor import SymptomPredictor
+        predictor = SymptomPredictor()
+    base_kb = predictor.kb
+    conversations = make_conversations(
+        predictor.symptom_vocab, args.conversations, args.turns, args.typo_rate, args.remove_rate, args.seed
+    )
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            with contextlib.redirect_stdout(io.StringIO()):
+                predictor.set_knowledge_base(synthetic_kb(base_kb, scale) if scale > 1 else base_kb)
+            for kind in args.stores:
+                if kind == 'sqlite':
+                    store = SQLiteSessionStore(os.path.join(tmp, f'sessions-{scale}.db'))
+                else:
+                    store = MemorySessionStore()
+                report[f'{scale}/{kind}'] = dict(
+                    run(predictor, store, conversations), diseases=len(predictor.kb.disease_names)
+                )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'diseases':>9}  {'store':<7}{'rescore':>12}{'session':>12}{'speedup':>9}{'mismatches':>12}")
+        for key, stats in report.items():
+            print(f"{stats['diseases']:>9}  {key.split('/')[1]:<7}{stats['rescore_ms']:>9} ms"
+                  f"{stats['session_ms']:>9} ms{stats['speedup']:>8}x{stats['mismatches']:>12}")
+
+    if any(stats['mismatches'] for stats in report.values()):
+        sys.exit("Session results differ from rescoring")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Measure SymptomPredictor cold start with and without the compiled bundle.
+
+Each run starts a fresh Python process, so imports and file reads are paid
+every time just like a new gunicorn worker. Reports the time spent in
+SymptomPredictor() and the whole process wall time.
+
+Usage (from backend/):
+    python data/merge_datasets.py          # compile data/compiled/knowledge_base.bin
+    python benchmarks/startup_time.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+CHILD = """
+import contextlib, io, json, sys, time
+sys.path.insert(0, {backend!r})
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    from app.predictor import SymptomPredictor
+    imported = time.perf_counter()
+    predictor = SymptomPredictor()
+done = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'init': done - imported, 'origin': predictor.kb.origin}}))
+"""
+
+
+def run_once(use_bundle):
+    env = dict(os.environ, KB_USE_BUNDLE='true' if use_bundle else 'false')
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, '-c', CHILD.format(backend=BACKEND_DIR)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    wall = time.perf_counter() - start
+    result = json.loads(out.strip().splitlines()[-1])
+    result['wall'] = wall
+    return result
+
+
+def summarize(runs):
+    return {
+        key: round(statistics.median(run[key] for run in runs) * 1000, 2)
+        for key in ('init', 'import', 'wall')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per mode')
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+
+    report = {}
+    for mode, use_bundle in (('csv', False), ('bundle', True)):
+        runs = [run_once(use_bundle) for _ in range(args.runs)]
+        origins = {run['origin'] for run in runs}
+        if origins != {mode}:
+            sys.exit(f"expected {mode} loads but got {origins} - compile the bundle with data/merge_datasets.py")
+        report[mode] = summarize(runs)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"SymptomPredictor cold start, median of {args.runs} runs (ms)")
+    print(f"{'mode':<8}{'__init__':>10}{'imports':>10}{'process':>10}")
+    for mode, stats in report.items():
+        print(f"{mode:<8}{stats['init']:>10}{stats['import']:>10}{stats['wall']:>10}")
+    speedup = report['csv']['init'] / report['bundle']['init'] if report['bundle']['init'] else float('inf')
+    print(f"__init__ speedup with bundle: {speedup:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Measure login and signup throughput of the SQLite user store.
+
+Fills a fresh store with --users accounts, then reports:
+
+  lookup   mean microseconds to fetch one account by email, through the
+           unique email index and with it bypassed (SQLite NOT INDEXED,
+           i.e. a table scan)
+  login    logins per second and p50/p99 latency with --threads clients
+           logging in to random accounts at the same time
+  signup   the same for new accounts
+
+login and signup run once per --iterations value: with the production
+PBKDF2 cost they measure the hashing pool, with 1 iteration they measure
+the storage layer (pool, index, WAL writes) on its own. The accounts are
+inserted directly with one precomputed hash per iteration count, since
+hashing 100,000 passwords at full cost would take hours.
+
+Usage (from backend/):
+    python benchmarks/user_store.py --users 100000 --threads 1 4 16
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+from app.users import DEFAULT_ITERATIONS, PasswordHasher, UserStore  # noqa: E402
+
+PASSWORD = 'correct horse battery staple'
+
+
+def populate(store, users):
+    password_hash = store.hasher.hash(PASSWORD)
+    now = time.time()
+    with store.pool.connection() as conn, conn:
+        conn.executemany(
+            'INSERT INTO users (email, username, password_hash, created_at) VALUES (?, ?, ?, ?)',
+            ((f'user{i}@example.com', f'User {i}', password_hash, now) for i in range(users))
+        )
+
+
+def lookup_us(store, users, queries, indexed):
+    sql = 'SELECT username, password_hash FROM users {}WHERE email = ?'.format('' if indexed else 'NOT INDEXED ')
+    emails = [f'user{random.randrange(users)}@example.com' for _ in range(queries)]
+    with store.pool.connection() as conn:
+        start = time.perf_counter()
+        for email in emails:
+            conn.execute(sql, (email,)).fetchone()
+        return (time.perf_counter() - start) / queries * 1e6
+
+
+def throughput(operation, threads, seconds):
+    """Run operation(thread, i) from `threads` threads for `seconds`; return ops/s and latency percentiles"""
+    latencies = [[] for _ in range(threads)]
+    errors = []
+    deadline = time.perf_counter() + seconds
+
+    def client(t):
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                operation(t, i)
+            except Exception as e:
+                errors.append(e)
+            latencies[t].append(time.perf_counter() - start)
+            i += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=client, args=(t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    merged = sorted(sum(latencies, []))
+    return {
+        'ops_per_s': round(len(merged) / elapsed, 1),
+        'p50_ms': round(merged[len(merged) // 2] * 1000, 2),
+        'p99_ms': round(merged[min(len(merged) - 1, int(len(merged) * 0.99))] * 1000, 2),
+        'errors': len(errors)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--iterations', type=int, nargs='+', default=[DEFAULT_ITERATIONS, 1],
+                        help='PBKDF2 iteration counts to run login/signup with')
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=3.0, help='duration of each throughput run')
+    parser.add_argument('--queries', type=int, default=2000, help='lookups timed with the index')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    report = {'users': args.users, 'cpus': os.cpu_count(), 'runs': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for iterations in args.iterations:
+            hasher = PasswordHasher(iterations, args.hash_workers, max_pending=max(64, 2 * max(args.threads)),
+                                    timeout=60.0)
+            store = UserStore(os.path.join(tmp, f'users-{iterations}.db'), args.pool_size, hasher, seed_demo=False)
+            start = time.perf_counter()
+            populate(store, args.users)
+            report.setdefault('populate_s', round(time.perf_counter() - start, 2))
+            if 'lookup' not in report:
+                report['lookup'] = {
+                    'indexed_us': round(lookup_us(store, args.users, args.queries, True), 1),
+                    'scan_us': round(lookup_us(store, args.users, max(1, args.queries // 100), False), 1)
+                }
+
+            def login(t, i):
+                if store.login(f'user{random.randrange(args.users)}@example.com', PASSWORD) is None:
+                    raise AssertionError('login failed')
+
+            new_ids = itertools.count()
+
+            def signup(t, i):
+                n = next(new_ids)
+                store.signup(f'New {n}', f'new{n}@example.com', PASSWORD)
+
+            for name, operation in (('login', login), ('signup', signup)):
+                for threads in args.threads:
+                    report['runs'].append(dict(throughput(operation, threads, args.seconds),
+                                               operation=name, iterations=iterations, threads=threads))
+            store.close()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['users']} users (inserted in {report['populate_s']} s), {report['cpus']} CPU(s)")
+        print(f"lookup by email: {report['lookup']['indexed_us']} us indexed, "
+              f"{report['lookup']['scan_us']} us scanning")
+        print(f"{'operation':<10}{'iterations':>11}{'threads':>9}{'ops/s':>10}{'p50':>12}{'p99':>12}{'errors':>8}")
+        for run in report['runs']:
+            print(f"{run['operation']:<10}{run['iterations']:>11}{run['threads']:>9}{run['ops_per_s']:>10}"
+                  f"{run['p50_ms']:>9} ms{run['p99_ms']:>9} ms{run['errors']:>8}")
+
+    if any(run['errors'] for run in report['runs']):
+        sys.exit('Some operations failed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Compare per-worker memory of gunicorn with and without the shared knowledge base.
+
+Starts gunicorn with gunicorn.conf.py twice (SHARED_KB=false, then true),
+warms every worker up with /api/analyze requests and reads each worker's
+/proc/<pid>/smaps_rollup (Linux only):
+  RSS - resident pages, shared pages counted in full
+  PSS - shared pages divided between the processes sharing them
+  USS - pages private to the worker (what each extra worker really costs)
+
+Usage (from backend/):
+    python data/merge_datasets.py          # compile the bundle first
+    python benchmarks/worker_memory.py --workers 4
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    pids = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return pids
+
+
+def memory(pid):
+    """Return RSS/PSS/USS of a process in MiB"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields['Rss'] / 1024,
+        'pss': fields['Pss'] / 1024,
+        'uss': (fields['Private_Clean'] + fields['Private_Dirty']) / 1024
+    }
+
+
+def measure(shared, workers, requests):
+    port = free_port()
+    env = dict(os.environ, SHARED_KB='true' if shared else 'false',
+               WEB_CONCURRENCY=str(workers), PORT=str(port), HOST='127.0.0.1')
+    env.pop('KB_MMAP', None)
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api_server:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f'http://127.0.0.1:{port}'
+        deadline = time.time() + 60
+        while True:
+            try:
+                urllib.request.urlopen(f'{base}/api/health', timeout=1).read()
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.2)
+
+        body = json.dumps({'symptoms': 'fever, headache, cough, fatigue'}).encode()
+        for _ in range(requests):
+            req = urllib.request.Request(f'{base}/api/analyze', data=body,
+                                         headers={'Content-Type': 'application/json'})
+            urllib.request.urlopen(req, timeout=10).read()
+
+        worker_pids = children(master.pid)
+        stats = [memory(pid) for pid in worker_pids]
+        return {
+            'workers': len(stats),
+            'master': memory(master.pid),
+            'per_worker': {key: sum(s[key] for s in stats) / len(stats) for key in ('rss', 'pss', 'uss')},
+            'total_pss': memory(master.pid)['pss'] + sum(s['pss'] for s in stats)
+        }
+    finally:
+        master.terminate()
+        master.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200, help='warm-up requests before measuring')
+    parser.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = parser.parse_args()
+
+    report = {
+        'per_worker_kb': measure(False, args.workers, args.requests),
+        'shared_kb': measure(True, args.workers, args.requests)
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"gunicorn with {args.workers} workers (MiB)")
+    print(f"{'mode':<15}{'RSS/worker':>12}{'PSS/worker':>12}{'USS/worker':>12}{'total PSS':>12}")
+    for mode, stats in report.items():
+        w = stats['per_worker']
+        print(f"{mode:<15}{w['rss']:>12.1f}{w['pss']:>12.1f}{w['uss']:>12.1f}{stats['total_pss']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Seeded synthetic workloads for the benchmarks.
+
+Cases are drawn from the symptom lists in data/dataset.csv and written the
+way users type them (spaces instead of underscores), with optional
+misspellings: each symptom gets one random edit (insert, delete, substitute
+or swap adjacent letters) with probability typo_rate. The same seed always
+produces the same workload.
+"""
+import csv
+import os
+import random
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DATASET_PATH = os.path.join(BACKEND_DIR, 'data', 'dataset.csv')
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+GREETING_INPUTS = [
+    'hello', 'hi', 'hey there', 'good morning', 'good evening, I have a fever',
+    'helo', 'hii', 'good afternon', 'sup', 'hey doc i have a rash'
+]
+
+
+def load_disease_symptoms(path=DATASET_PATH):
+    """Return [(disease, [symptom, ...]), ...] with symptoms as users would type them"""
+    rows = []
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            symptoms = [s.strip().replace('_', ' ') for s in row[1:] if s.strip()]
+            symptoms = [' '.join(s.split()) for s in symptoms]
+            if symptoms:
+                rows.append((row[0].strip(), symptoms))
+    return rows
+
+
+def misspell(rng, text):
+    """Apply one random character edit"""
+    if len(text) < 2:
+        return text
+    i = rng.randrange(len(text))
+    edit = rng.choice(('insert', 'delete', 'substitute', 'swap'))
+    if edit == 'insert':
+        return text[:i] + rng.choice(LETTERS) + text[i:]
+    if edit == 'delete':
+        return text[:i] + text[i + 1:]
+    if edit == 'substitute':
+        return text[:i] + rng.choice(LETTERS) + text[i + 1:]
+    i = min(i, len(text) - 2)
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def make_vocabulary(size, seed=0, rows=None):
+    """
+    Symptom vocabulary of the given size for scaling benchmarks: the dataset's
+    symptoms (underscored, as in the knowledge base) followed by synthetic
+    terms of 1-4 words mixing dataset words with made-up ones.
+    """
+    rng = random.Random(f'vocab:{seed}')
+    rows = rows or load_disease_symptoms()
+    vocab = sorted({sym.replace(' ', '_') for _, symptoms in rows for sym in symptoms})
+    words = sorted({word for term in vocab for word in term.split('_')})
+    syllables = [c + v for c in 'bcdfghklmnprstvz' for v in 'aeiou']
+    words += sorted({''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(5000)})
+    seen = set(vocab)
+    while len(vocab) < size:
+        term = '_'.join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        if term not in seen:
+            seen.add(term)
+            vocab.append(term)
+    return vocab[:size]
+
+
+def make_cases(count, n_symptoms, typo_rate=0.0, seed=0, rows=None):
+    """
+    Generate symptom-list cases with n_symptoms symptoms each.
+
+    Symptoms come from one dataset row when it has enough of them, topped up
+    from other rows otherwise (no row has more than 17).
+
+    Returns:
+        List of (disease, [symptom, ...]) tuples
+    """
+    rng = random.Random(f'{seed}:{n_symptoms}:{typo_rate}')
+    rows = rows or load_disease_symptoms()
+    vocab = sorted({sym for _, symptoms in rows for sym in symptoms})
+    cases = []
+    for _ in range(count):
+        disease, symptoms = rng.choice(rows)
+        picked = rng.sample(symptoms, min(n_symptoms, len(symptoms)))
+        extra = [sym for sym in vocab if sym not in picked]
+        picked += rng.sample(extra, n_symptoms - len(picked))
+        cases.append((disease, [
+            misspell(rng, sym) if rng.random() < typo_rate else sym for sym in picked
+        ]))
+    return cases
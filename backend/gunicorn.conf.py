@@ -0,0 +1,59 @@
+"""
+Gunicorn configuration for the SymptomAI backend.
+
+    gunicorn -c gunicorn.conf.py api_server:app
+
+By default the knowledge base is shared between workers (SHARED_KB=true):
+  - the master imports api_server once before forking (preload_app), so the
+    predictor, greeter and imported libraries are inherited copy-on-write
+  - the compiled bundle's arrays are memory-mapped read-only (KB_MMAP), so
+    they live in the page cache once instead of in every worker
+  - objects created during preload are moved out of the garbage collector's
+    generations (gc.freeze) so collections in workers don't write to them
+    and break copy-on-write sharing
+
+Set SHARED_KB=false to let each worker build its own predictor.
+
+Every worker has its own memory, so with more than one worker conversational
+sessions are kept in SQLite (SESSION_STORE=sqlite, see app/sessions.py);
+SESSION_STORE=memory would split a conversation's turns across workers and
+is refused.
+
+Threads don't survive the fork, so the knowledge base file watcher
+(KB_WATCH_INTERVAL, see app/reloader.py) is not started in the master
+(KB_WATCH_AFTER_FORK): each worker starts its own in post_fork.
+See benchmarks/worker_memory.py for a per-worker memory comparison.
+"""
+import gc
+import multiprocessing
+import os
+
+SHARED_KB = os.environ.get('SHARED_KB', 'true').lower() in ('1', 'true', 'yes')
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+preload_app = SHARED_KB
+if SHARED_KB:
+    os.environ.setdefault('KB_MMAP', 'true')
+    os.environ['KB_WATCH_AFTER_FORK'] = 'true'
+
+if workers > 1:
+    if os.environ.setdefault('SESSION_STORE', 'sqlite').lower() == 'memory':
+        raise RuntimeError(
+            f"SESSION_STORE=memory is per process and gunicorn runs {workers} workers; "
+            "use SESSION_STORE=sqlite or WEB_CONCURRENCY=1"
+        )
+
+
+def pre_fork(server, worker):
+    if SHARED_KB:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if SHARED_KB:
+        import api_server
+        if api_server.reloader is not None:
+            api_server.reloader.watch()
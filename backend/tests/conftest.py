@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the backend the way the servers do: from backend/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+# and share the benchmarks' workload generators
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks')))
+
+
+@pytest.fixture(scope='session')
+def predictor():
+    """SymptomPredictor over the bundled data (compiled bundle when present)"""
+    from app.predictor import SymptomPredictor
+    return SymptomPredictor()
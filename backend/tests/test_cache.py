@@ -0,0 +1,32 @@
+from app.cache import LRUCache
+
+
+def test_fresh_cache_is_empty_and_continues_counters():
+    cache = LRUCache(max_size=1)
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('b')
+    cache.put('b', 2)
+
+    fresh = cache.fresh()
+    assert len(fresh) == 0
+    assert fresh.get('b') is None
+    stats = fresh.stats()
+    assert (stats['size'], stats['max_size']) == (0, 1)
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 2, 1)
+
+    # Lookups on the old cache (requests still on the old snapshot) keep counting
+    cache.get('b')
+    assert fresh.stats()['hits'] == 2
+    assert len(cache) == 1
+
+
+def test_resolution_cache_counters_survive_reload(predictor):
+    snapshot = predictor.with_knowledge_base(predictor.kb)
+    snapshot.preprocess_input(['hig fever', 'hig fever'])
+    before = snapshot.resolution_cache.stats()
+    reloaded = snapshot.with_knowledge_base(snapshot.kb)
+    after = reloaded.resolution_cache.stats()
+    assert after['size'] == 0
+    assert (after['hits'], after['misses']) == (before['hits'], before['misses'])
+    assert before['hits'] >= 1
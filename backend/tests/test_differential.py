@@ -0,0 +1,40 @@
+import random
+
+import numpy as np
+import pytest
+
+from differential import random_kb
+
+
+@pytest.fixture(scope='module')
+def kbs(predictor):
+    return {'real': predictor.kb, 'random': random_kb(predictor.kb, 3000, seed=1)}
+
+
+def full_sort(predictor, processed_symptoms, k, rank_by, blend):
+    """Score every disease sharing a symptom with the case and sort them all"""
+    kb = predictor.kb
+    ids = [kb.symptom_ids[sym] for sym in processed_symptoms]
+    rows = np.flatnonzero((kb.match_scores[:, ids] > 0).any(axis=1))
+    scores, coverage, _ = predictor._score_diseases([processed_symptoms], rows)
+    scores, coverage = scores[0], coverage[0]
+    values = {'score': scores, 'coverage': coverage, 'blend': blend * scores + (1 - blend) * coverage}[rank_by]
+    best = np.lexsort((rows, -values))[:k]
+    return [(kb.disease_names[rows[i]], round(float(scores[i]), 2), round(float(coverage[i]), 2)) for i in best]
+
+
+@pytest.mark.parametrize('table', ['real', 'random'])
+@pytest.mark.parametrize('rank_by', ['score', 'coverage', 'blend'])
+def test_rank_diseases_matches_full_sort(predictor, kbs, table, rank_by):
+    ranker = predictor.with_knowledge_base(kbs[table])
+    # A small first chunk so the bound cutoff prunes even on the real table
+    ranker.RANK_CHUNK = 8
+    rng = random.Random(f'{table}:{rank_by}')
+    vocab = ranker.kb.symptom_vocab
+    for _ in range(40):
+        symptoms = rng.sample(vocab, rng.randint(1, 8))
+        processed_symptoms = ranker.canonicalize(symptoms)[1]
+        for k in (1, 3, 10, 50):
+            ranked = ranker.rank_diseases(symptoms, k, rank_by, blend=0.3)
+            got = [(entry.disease, entry.score, entry.coverage) for entry in ranked]
+            assert got == full_sort(ranker, processed_symptoms, k, rank_by, 0.3), (symptoms, k)
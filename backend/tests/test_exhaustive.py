@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from app.predictor import SymptomPredictor
+from differential import random_kb
+
+
+def make_cases(kb, seed):
+    """Random symptom sets (with a typo and an unknown symptom now and then)"""
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(150):
+        symptoms = [sym.replace('_', ' ') for sym in rng.sample(kb.symptom_vocab, rng.randint(1, 6))]
+        if rng.random() < 0.2:
+            symptoms[0] = symptoms[0][:-1]
+        if rng.random() < 0.2:
+            symptoms.append('purple toenails')
+        cases.append(symptoms)
+    return cases
+
+
+@pytest.mark.parametrize('table', ['real', 'sparse'])
+def test_pruned_scoring_matches_exhaustive(predictor, table):
+    # The sparse table lists few of the symptoms, so some cases have no candidates at all
+    kb = predictor.kb if table == 'real' else random_kb(predictor.kb, 12, seed=2)
+    exhaustive = SymptomPredictor(kb=kb, exhaustive=True, processes=0)
+    pruned = SymptomPredictor(kb=kb, exhaustive=False, processes=0)
+    cases = make_cases(kb, table)
+
+    no_candidates = ties = 0
+    for min_symptoms, min_confidence in ((1, 30), (3, 30), (1, 0), (2, 60)):
+        expected = [exhaustive.match_disease(case, min_symptoms, min_confidence) for case in cases]
+        assert [pruned.match_disease(case, min_symptoms, min_confidence) for case in cases] == expected
+        assert pruned.match_disease_batch(cases, min_symptoms, min_confidence) == expected
+        assert exhaustive.match_disease_batch(cases, min_symptoms, min_confidence) == expected
+        for case, result in zip(cases, expected):
+            processed_symptoms = pruned.canonicalize(case)[1]
+            no_candidates += bool(processed_symptoms) and not len(pruned._candidate_rows([processed_symptoms]))
+            alternatives = result.get('alternative_diagnoses') or []
+            ties += any(alt.confidence == result['confidence'] for alt in alternatives)
+
+    # Both edge cases were actually exercised
+    assert ties
+    assert no_candidates or table == 'real'
@@ -0,0 +1,82 @@
+import copy
+import random
+
+import pytest
+
+from app.fuzzy_index import BruteForceIndex, TrigramIndex, build_index
+from app.predictor import SymptomPredictor
+from workloads import make_vocabulary, misspell
+
+THRESHOLD = SymptomPredictor.SYMPTOM_MATCH_THRESHOLD
+# Floors documented in app/fuzzy_index.py, for misspelled queries: the same
+# (match, score) as brute force, and the same best score (possibly a tied term)
+MIN_AGREEMENT = 0.98
+MIN_SCORE_AGREEMENT = 0.99
+
+
+@pytest.fixture(scope='module')
+def resolve(predictor):
+    """SymptomPredictor._fuzzy_resolve against the given index"""
+    resolver = copy.copy(predictor)
+
+    def resolve(index, query):
+        resolver.fuzzy_index = index
+        return resolver._fuzzy_resolve(query, THRESHOLD)
+    return resolve
+
+
+@pytest.fixture(scope='module')
+def vocab():
+    """The dataset's symptoms topped up to 5,000 terms mixing their words with made-up ones"""
+    return make_vocabulary(5000)
+
+
+@pytest.fixture(scope='module')
+def indexes(vocab):
+    return TrigramIndex(vocab), BruteForceIndex(vocab)
+
+
+def test_index_agrees_exactly_on_vocabulary_terms(vocab, indexes, resolve):
+    rng = random.Random('exact')
+    trigram, brute = indexes
+    for term in rng.sample(vocab, 300):
+        query = term.replace('_', ' ')
+        assert resolve(trigram, query) == resolve(brute, query), query
+
+
+def assert_agreement_floors(resolve, trigram, brute, queries):
+    results = [(resolve(trigram, query), resolve(brute, query)) for query in queries]
+    agreed = sum(ours == theirs for ours, theirs in results)
+    same_score = sum((ours and ours[1]) == (theirs and theirs[1]) for ours, theirs in results)
+    assert agreed / len(queries) >= MIN_AGREEMENT
+    assert same_score / len(queries) >= MIN_SCORE_AGREEMENT
+
+
+def test_index_agreement_on_misspelled_terms_meets_floor(vocab, indexes, resolve):
+    rng = random.Random('typos')
+    queries = [misspell(rng, rng.choice(vocab).replace('_', ' ')) for _ in range(500)]
+    assert_agreement_floors(resolve, *indexes, queries)
+
+
+def test_index_on_bundled_vocabulary(predictor, resolve):
+    rng = random.Random('bundled')
+    vocab = predictor.kb.symptom_vocab
+    trigram, brute = TrigramIndex(vocab), BruteForceIndex(vocab)
+    queries = [term.replace('_', ' ') for term in vocab]
+    for query in queries:
+        assert resolve(trigram, query) == resolve(brute, query), query
+    assert_agreement_floors(resolve, trigram, brute, [misspell(rng, query) for query in queries for _ in range(3)])
+
+
+def test_auto_uses_index_only_from_min_vocab(vocab, monkeypatch):
+    monkeypatch.delenv('FUZZY_INDEX', raising=False)
+    monkeypatch.delenv('FUZZY_INDEX_MIN_VOCAB', raising=False)
+    assert build_index(vocab[:4999]).kind == 'brute'
+    assert build_index(vocab[:5000]).kind == 'trigram'
+    assert build_index(vocab[:100], kind='trigram').kind == 'trigram'
+    assert build_index(vocab, kind='brute').kind == 'brute'
+
+
+def test_bundled_vocabulary_stays_on_brute_force(predictor):
+    assert len(predictor.kb.symptom_vocab) < 5000
+    assert predictor.fuzzy_index.kind == 'brute'
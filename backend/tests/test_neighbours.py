@@ -0,0 +1,110 @@
+import contextlib
+import io
+import random
+import shutil
+
+import numpy as np
+import pytest
+from rapidfuzz import process
+
+from app.knowledge_base import DEFAULT_DATA_DIR, build_from_csv, compile_bundle, load_bundle, save_bundle
+from app.neighbours import DISEASE_MATCH_THRESHOLD, NeighbourTable
+
+
+def extract_one_row(symptom_vocab, disease_symptoms):
+    """The partial-credit row as the original per-request fuzzy path scored it"""
+    row = np.zeros(len(symptom_vocab))
+    for j, sym in enumerate(symptom_vocab):
+        result = process.extractOne(sym, disease_symptoms, score_cutoff=DISEASE_MATCH_THRESHOLD)
+        if result and result[1] > DISEASE_MATCH_THRESHOLD:
+            row[j] = result[1]
+    return row
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+@pytest.fixture(scope='module')
+def kb():
+    return quiet(build_from_csv, DEFAULT_DATA_DIR)
+
+
+def test_rows_match_extract_one_for_every_disease(kb):
+    table = NeighbourTable.build(kb.symptom_vocab)
+    for d in range(len(kb.disease_names)):
+        ids = np.flatnonzero(kb.incidence[d])
+        expected = extract_one_row(kb.symptom_vocab, [kb.symptom_vocab[i] for i in ids])
+        np.testing.assert_array_equal(table.row_scores(ids, len(kb.symptom_vocab)), expected)
+
+
+def test_rows_match_extract_one_on_a_larger_vocabulary(kb, monkeypatch):
+    # Made-up terms built from the real words give many near misses around the threshold
+    rng = random.Random(0)
+    words = sorted({word for sym in kb.symptom_vocab for word in sym.split('_')})
+    vocab, seen = list(kb.symptom_vocab), set(kb.symptom_vocab)
+    while len(vocab) < 1000:
+        term = '_'.join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        if term not in seen:
+            seen.add(term)
+            vocab.append(term)
+    # Several cdist chunks, including a partial one
+    monkeypatch.setattr('app.neighbours.BUILD_CHUNK', 300)
+    table = NeighbourTable.build(vocab)
+    for _ in range(25):
+        ids = sorted(rng.sample(range(len(vocab)), rng.randint(1, 17)))
+        expected = extract_one_row(vocab, [vocab[i] for i in ids])
+        np.testing.assert_array_equal(table.row_scores(ids, len(vocab)), expected)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / 'data'
+    shutil.copytree(DEFAULT_DATA_DIR, path, ignore=shutil.ignore_patterns('compiled', '*.db*'))
+    return path
+
+
+def count_builds(monkeypatch):
+    calls = []
+    build = NeighbourTable.build.__func__
+
+    def counting_build(cls, symptom_vocab):
+        calls.append(len(symptom_vocab))
+        return build(cls, symptom_vocab)
+    monkeypatch.setattr(NeighbourTable, 'build', classmethod(counting_build))
+    return calls
+
+
+def test_bundle_round_trip_keeps_the_table(kb, tmp_path):
+    path = tmp_path / 'kb.bin'
+    save_bundle(kb, str(path))
+    loaded = load_bundle(str(path))
+    assert loaded.neighbours.digest == kb.neighbours.digest
+    for name in ('indptr', 'ids', 'scores'):
+        np.testing.assert_array_equal(getattr(loaded.neighbours, name), getattr(kb.neighbours, name))
+
+
+def test_recompile_reuses_the_table_only_for_an_unchanged_vocabulary(data_dir, monkeypatch):
+    bundle = str(data_dir / 'kb.bin')
+    quiet(compile_bundle, str(data_dir), bundle)
+    first = load_bundle(bundle)
+    builds = count_builds(monkeypatch)
+
+    # Descriptions changed, vocabulary unchanged: the bundle's table is reused
+    descriptions = data_dir / 'symptom_Description.csv'
+    descriptions.write_text(descriptions.read_text().replace('most deadly type', 'deadliest type'))
+    quiet(compile_bundle, str(data_dir), bundle)
+    second = load_bundle(bundle)
+    assert builds == []
+    assert second.neighbours.digest == first.neighbours.digest
+    np.testing.assert_array_equal(second.match_scores, first.match_scores)
+
+    # A new symptom changes the vocabulary: the table is rebuilt
+    with open(data_dir / 'dataset.csv', 'a') as f:
+        f.write('Malaria,chills,vomiting,high_fever,purple_toenails' + ',' * 13 + '\n')
+    quiet(compile_bundle, str(data_dir), bundle)
+    third = load_bundle(bundle)
+    assert builds == [len(first.symptom_vocab) + 1]
+    assert third.neighbours.digest != first.neighbours.digest
+    assert 'purple_toenails' in third.symptom_vocab
@@ -0,0 +1,41 @@
+from app.phrases import PhraseExtractor
+
+VOCAB = ['high_fever', 'headache', 'cough', 'vomiting', 'weight_gain', 'chills']
+ALIASES = {'throwing up': 'vomiting'}
+
+
+def extract(text):
+    return PhraseExtractor(VOCAB, ALIASES).extract(text)
+
+
+def test_free_text_is_split_into_phrases():
+    assert extract('I have a high fever and headache with throwing up') == ['high fever', 'headache', 'throwing up']
+
+
+def test_free_text_leftovers_are_trimmed_of_fillers():
+    assert extract('i have a high fever and a weird rash') == ['high fever', 'weird rash']
+
+
+def test_comma_segments_without_phrases_are_kept_whole():
+    assert extract('feeling weird, headache, cough') == ['feeling weird', 'headache', 'cough']
+
+
+def test_comma_segments_mixing_phrases_and_other_words_are_kept_whole():
+    assert extract('headache, high fever but feeling weird') == ['headache', 'high fever but feeling weird']
+
+
+def test_comma_segments_of_known_phrases_are_split():
+    assert extract('headache and throwing up, i have chills') == ['headache', 'throwing up', 'chills']
+
+
+def test_comma_segments_are_echoed_untrimmed():
+    assert extract('Cough,  a bit of a weird feeling ,chills') == ['cough', 'a bit of a weird feeling', 'chills']
+
+
+def test_comma_list_with_unknown_segment_is_not_diagnosed(predictor):
+    symptoms = predictor.extract_symptoms('feeling weird, headache, cough')
+    _, cleaned, unknown, matched = predictor.canonicalize(symptoms)
+    assert cleaned == ['headache', 'cough']
+    assert unknown == ['feeling weird']
+    assert [m['original'] for m in matched] == ['headache', 'cough']
+    assert predictor.match_disease(symptoms)['error'] == 'insufficient_symptoms'
@@ -0,0 +1,72 @@
+import contextlib
+import io
+import shutil
+import threading
+
+import pytest
+
+from app.knowledge_base import DEFAULT_DATA_DIR
+from app.predictor import SymptomPredictor
+from app.reloader import KnowledgeBaseReloader
+
+CASES = [
+    ['itching', 'skin_rash', 'nodal_skin_eruptions'],
+    ['chills', 'vomiting', 'high_fever', 'sweating', 'headache'],
+    ['cough', 'high_fever', 'breathlessness', 'fatigue'],
+    ['continuous_sneezing', 'chills', 'fatigue', 'cough', 'runny_nose'],
+]
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / 'data'
+    shutil.copytree(DEFAULT_DATA_DIR, path, ignore=shutil.ignore_patterns('compiled', '*.db*'))
+    return path
+
+
+def test_reload_during_sharded_request_keeps_the_old_snapshot(data_dir, monkeypatch):
+    # Shard every scoring call across two pool processes
+    monkeypatch.setenv('PARALLEL_MIN_CELLS', '1')
+    old = quiet(SymptomPredictor, data_dir=str(data_dir), bundle_path='', processes=2)
+    old.engine.warm_up()
+    expected = old.match_disease_batch(CASES)
+    reloader = KnowledgeBaseReloader(old, watch_interval=0)
+
+    results, errors, reloaded = [], [], threading.Event()
+
+    def requests_on_old_snapshot():
+        try:
+            # Keep requests in flight on the old snapshot until the reload is done, then a few more
+            remaining = 3
+            while remaining:
+                results.append(old.match_disease_batch(CASES))
+                if reloaded.is_set():
+                    remaining -= 1
+        except Exception as e:
+            errors.append(e)
+
+    client = threading.Thread(target=requests_on_old_snapshot)
+    client.start()
+    # A new disease with a new symptom changes the rows and the vocabulary
+    with open(data_dir / 'dataset.csv', 'a') as f:
+        f.write('Test disease,chills,vomiting,high_fever,purple_toenails' + ',' * 13 + '\n')
+    assert quiet(reloader.reload)
+    reloaded.set()
+    client.join(timeout=120)
+
+    new = reloader.predictor
+    assert errors == []
+    assert old.engine.stats['fallbacks'] == 0
+    assert all(result == expected for result in results)
+    assert new.engine is not old.engine
+    assert 'purple_toenails' not in old.symptom_vocab
+    assert 'purple_toenails' in new.symptom_vocab
+    assert new.match_disease(['purple_toenails', 'chills', 'vomiting'])['disease'] == 'Test disease'
+    assert old.engine.stats['parallel_scores'] > len(results)
+    new.engine.shutdown()
+    old.engine.shutdown()
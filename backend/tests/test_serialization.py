@@ -0,0 +1,70 @@
+import pytest
+from flask import json, jsonify
+
+api_server = pytest.importorskip('api_server')
+
+from app.knowledge_base import KnowledgeBase
+from app.serialization import dumps
+
+
+@pytest.fixture(scope='module')
+def unicode_snapshot(predictor):
+    """The bundled knowledge base with non-ASCII disease names and texts"""
+    kb = predictor.kb
+    records = [
+        dict(record, disease=f"{record['disease']} (Ménière – 病 {i})",
+             description=f"Éruption cutanée, fièvre 🩺 — {record['description']}",
+             precautions='repos|boire de l’eau|“rest”')
+        for i, record in enumerate(kb.disease_metadata)
+    ]
+    return predictor.with_knowledge_base(KnowledgeBase(
+        kb.symptom_vocab, kb.symptom_weights, records, kb.incidence, kb.match_scores, kb.weight_vector,
+        source_digest=f'unicode-{kb.source_digest}', neighbours=kb.neighbours
+    ))
+
+
+REQUESTS = [
+    # success, with and without alternatives and differentials
+    {'symptoms': 'skin rash, itching, nodal skin eruptions'},
+    {'symptoms': 'vomiting, headache, high fever, chills, sweating'},
+    {'symptoms': 'cough, fatigue, high fever, breathlessness', 'top_k': 5, 'rank_by': 'blend', 'blend': 0.25},
+    # greetings
+    {'symptoms': 'hello'},
+    {'symptoms': 'good morning, I have a fever'},
+    # errors
+    {'symptoms': ''},
+    {'symptoms': 'fièvre, mal à la tête, 頭痛'},
+    {'symptoms': 'headache'},
+    {'symptoms': 'headache, cough, fever', 'top_k': 0},
+]
+
+
+def assert_flask_encoding(body):
+    assert dumps(body) == json.dumps(body, separators=(',', ':'))
+    assert dumps(body) + '\n' == jsonify(body).get_data(as_text=True)
+
+
+@pytest.mark.parametrize('response_format', ['full', 'compact', 'xml'])
+def test_dumps_matches_flask_json(predictor, unicode_snapshot, monkeypatch, response_format):
+    app = api_server.app
+    monkeypatch.setattr(app, 'debug', False)
+    with app.app_context():
+        for snapshot in (predictor, unicode_snapshot):
+            monkeypatch.setattr(api_server, 'predictor', snapshot)
+            for data in REQUESTS:
+                body, _ = api_server.analyze_request(lambda: data, response_format)
+                assert_flask_encoding(body)
+            body, _ = api_server.analyze_batch_request(
+                lambda: [data['symptoms'] for data in REQUESTS], response_format
+            )
+            assert_flask_encoding(body)
+        assert_flask_encoding(api_server.health_status()[0])
+        assert_flask_encoding(api_server.api_info()[0])
+
+
+def test_unicode_snapshot_reaches_responses(unicode_snapshot, monkeypatch):
+    monkeypatch.setattr(api_server, 'predictor', unicode_snapshot)
+    body, status_code = api_server.analyze_request(lambda: REQUESTS[0])
+    assert status_code == 200
+    assert 'Ménière' in body['details']['disease'] and '🩺' in body['details']['description']
+    assert '\\ud83e\\ude7a' in dumps(body)
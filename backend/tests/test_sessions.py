@@ -0,0 +1,55 @@
+import multiprocessing
+import os
+
+import pytest
+
+from app.sessions import SQLiteSessionStore, build_store
+
+
+def test_sqlite_store_opens_nothing_until_used(tmp_path):
+    path = tmp_path / 'sessions.db'
+    store = SQLiteSessionStore(str(path))
+    assert not path.exists()
+    assert store.stats()['size'] == 0
+    assert path.exists()
+
+
+def _child_stats(store, parent_conn, results):
+    # Fork start method: arguments are the parent's objects, not pickled copies
+    results.put((store._connect() is not parent_conn, store.stats()['size'], store.get('missing')))
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='needs fork')
+def test_sqlite_store_reopens_connections_after_fork(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    parent_conn = store._connect()
+    ctx = multiprocessing.get_context('fork')
+    results = ctx.Queue()
+    child = ctx.Process(target=_child_stats, args=(store, parent_conn, results))
+    child.start()
+    reopened, size, missing = results.get(timeout=30)
+    child.join(timeout=30)
+    assert child.exitcode == 0
+    assert reopened
+    assert (size, missing) == (0, None)
+    # The parent keeps its own connection
+    assert store._connect() is parent_conn
+
+
+def test_sqlite_store_connection_is_per_process(tmp_path, monkeypatch):
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    conn = store._connect()
+    assert store._connect() is conn
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+    assert store._connect() is not conn
+
+
+@pytest.mark.parametrize('concurrency, expected', [(None, 'memory'), ('1', 'memory'), ('4', 'sqlite')])
+def test_store_defaults_to_sqlite_with_several_workers(tmp_path, monkeypatch, concurrency, expected):
+    monkeypatch.delenv('SESSION_STORE', raising=False)
+    monkeypatch.setenv('SESSION_DB_PATH', str(tmp_path / 'sessions.db'))
+    if concurrency is None:
+        monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+    else:
+        monkeypatch.setenv('WEB_CONCURRENCY', concurrency)
+    assert build_store().kind == expected
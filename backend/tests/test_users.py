@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app import predictor as predictor_module
+from app.users import PasswordHasher, UserStore, UserStoreBusy
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UserStore(str(tmp_path / 'users.db'), hasher=PasswordHasher(iterations=1000), seed_demo=False)
+    yield store
+    store.close()
+
+
+def test_async_signup_and_login_match_sync(store):
+    async def scenario():
+        assert await store.signup_async('Ada', 'ada@example.com', 'secret')
+        with pytest.raises(ValueError):
+            await store.signup_async('Ada', 'ada@example.com', 'other')
+        return (await store.login_async('ada@example.com', 'secret'),
+                await store.login_async('ada@example.com', 'wrong'),
+                await store.login_async('nobody@example.com', 'secret'))
+
+    assert asyncio.run(scenario()) == ({'email': 'ada@example.com', 'username': 'Ada'}, None, None)
+    assert store.login('ada@example.com', 'secret') == {'email': 'ada@example.com', 'username': 'Ada'}
+
+
+def test_async_hash_fails_fast_without_a_slot():
+    hasher = PasswordHasher(iterations=1000, workers=1, max_pending=1)
+    release = threading.Event()
+
+    def blocked(*args):
+        release.wait()
+        return b''
+
+    hasher._derive = blocked
+
+    async def scenario():
+        first = asyncio.ensure_future(hasher.hash_async('a'))
+        await asyncio.sleep(0.05)
+        with pytest.raises(UserStoreBusy):
+            await hasher.hash_async('b')
+        release.set()
+        await first
+
+    asyncio.run(scenario())
+    hasher.close()
+
+
+async def call_asgi(app, method, path, body):
+    raw = json.dumps(body).encode()
+    messages = [{'type': 'http.request', 'body': raw, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+             'headers': [(b'content-type', b'application/json')]}
+    await app(scope, receive, send)
+    return sent[0]['status'], json.loads(sent[1]['body'])
+
+
+def test_asgi_logins_waiting_on_hashes_hold_no_executor_thread(store, monkeypatch):
+    asgi_server = pytest.importorskip('asgi_server')
+    from concurrent.futures import ThreadPoolExecutor
+
+    store.signup('Ada', 'ada@example.com', 'secret')
+    monkeypatch.setattr(predictor_module, '_user_store', store)
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(asgi_server, 'executor', executor)
+    release = threading.Event()
+    derive = store.hasher._derive
+
+    def blocked(*args):
+        release.wait()
+        return derive(*args)
+
+    store.hasher._derive = blocked
+
+    async def scenario():
+        logins = [asyncio.ensure_future(call_asgi(asgi_server.app, 'POST', '/api/login',
+                                                  {'username': 'ada@example.com', 'password': 'secret'}))
+                  for _ in range(8)]
+        await asyncio.sleep(0.1)
+        # Every login is waiting for its hash, yet the single executor thread is free
+        analysis = await asyncio.wait_for(
+            call_asgi(asgi_server.app, 'POST', '/api/analyze', {'symptoms': 'itching, skin rash, nodal skin eruptions'}),
+            timeout=10)
+        assert not any(login.done() for login in logins)
+        release.set()
+        return analysis, await asyncio.gather(*logins)
+
+    analysis, logins = asyncio.run(scenario())
+    executor.shutdown()
+    assert analysis[0] == 200
+    assert {status for status, _ in logins} == {200}